@@ -9,24 +9,35 @@ Retinal AMD — Klinik Karar Destek Paneli v3.1
 import streamlit as st
 import numpy as np
 import torch
-from PIL import Image as PILImage
 from datetime import datetime, timezone, timedelta
 
 # ── Proje Modülleri ──
 import utils.preprocessing as preprocessing
-from utils.gradcam import generate_gradcam, overlay_gradcam
+from utils.gradcam import COLORMAPS, OnnxGradCAM, normalize_raw_cams, overlay_gradcam
+from utils.batch_analysis import analyze_images
+from utils.volume_analysis import analyze_volume, count_frames
+from utils.result_cache import ResultCache, make_cache_key, DEFAULT_MAX_MB, DEFAULT_DISK_MAX_MB
+from utils.inference_scheduler import (
+    MicroBatchScheduler, DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS, DEFAULT_RESULT_TIMEOUT,
+)
+from utils.inference_pool import InferenceWorkerPool
 from utils.reporting import generate_clinical_report
 from utils.pdf_export import generate_pdf_report, generate_comparative_pdf
 from utils.llm_reporting import (
     is_llm_available, generate_llm_report, generate_llm_comparative_report,
     get_available_models, get_model_display_name,
 )
-from models import load_model, get_classes, get_target_layer
+from models import (
+    load_explainer, load_onnx_session, get_classes, get_model_version, INFERENCE_BACKENDS,
+)
 from utils.database import (
-    is_db_available, save_analysis, get_patient_analyses,
-    image_to_base64, base64_to_image,
-    search_patients, add_patient, get_all_patients,
+    is_db_available, save_analysis, get_patient_analysis_summaries, get_patient_analysis_stats,
+    get_patient_analyses_page, get_patient_analysis_count,
+    get_analysis_details, get_analysis_image, render_analysis_gradcam, with_analysis_details,
+    image_to_base64,
+    search_patients_page, add_patient,
 )
+from utils.ui_components import page_cursor, render_pager
 
 TZ_TR = timezone(timedelta(hours=3))
 MODEL_KEY = "efficientnet_b4"
@@ -115,12 +126,125 @@ p,span,label,li{color:var(--t2)!important}
 """, unsafe_allow_html=True)
 
 # ── Session ──
-for k, v in {"selected_patient": None, "current_result": None, "compare_selections": []}.items():
+for k, v in {"selected_patient": None, "current_result": None, "compare_selections": [],
+             "batch_results": []}.items():
     if k not in st.session_state:
         st.session_state[k] = v
 
 db_ok = is_db_available()
 
+
+def _secrets_section(name: str) -> dict:
+    """`.streamlit/secrets.toml` içindeki isteğe bağlı bölümü (yoksa boş) döndürür."""
+    try:
+        return dict(st.secrets.get(name, {}))
+    except Exception:
+        return {}
+
+
+@st.cache_resource
+def load_scheduler(backend: str, model_key: str):
+    """
+    Arka uç + model başına tek, tüm oturumların paylaştığı mikro-batch
+    zamanlayıcısı oluşturur. İsteğe bağlı `[scheduler]` bölümü
+    (`max_batch_size`, `max_wait_ms`, `result_timeout`) ile ayarlanır.
+
+    Returns:
+        (MicroBatchScheduler, is_demo_mode) tuple'ı
+    """
+    is_demo = False
+    if backend == "onnx":
+        device, explainer = torch.device("cpu"), OnnxGradCAM(load_onnx_session(model_key))
+    else:
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        explainer, model, is_demo = load_explainer(model_key, str(device))
+        # INT8 varyantı her zaman CPU'ya yüklenir — girişler modelin cihazına gitmeli
+        device = next(model.parameters()).device
+    cfg = _secrets_section("scheduler")
+    scheduler = MicroBatchScheduler(
+        explainer, device,
+        max_batch_size=int(cfg.get("max_batch_size", DEFAULT_MAX_BATCH_SIZE)),
+        max_wait_ms=float(cfg.get("max_wait_ms", DEFAULT_MAX_WAIT_MS)),
+        result_timeout=float(cfg.get("result_timeout", DEFAULT_RESULT_TIMEOUT)),
+    )
+    return scheduler, is_demo
+
+
+def get_backend() -> str:
+    """Seçili ve kullanılabilir çıkarım arka ucunu döndürür."""
+    if st.session_state.get("inference_backend") == "onnx" and load_onnx_session(MODEL_KEY) is not None:
+        return "onnx"
+    return "torch"
+
+
+@st.cache_resource
+def load_worker_pool(backend: str, model_key: str, num_workers: int):
+    """
+    Modeli ayrı süreçlerde tutan çıkarım işçi havuzunu başlatır
+    (`[inference_pool]` bölümünde `workers` > 0 ise kullanılır).
+
+    Returns:
+        (InferenceWorkerPool, is_demo_mode) tuple'ı; başlatılamazsa (None, False)
+    """
+    cfg = _secrets_section("scheduler")
+    try:
+        pool = InferenceWorkerPool(
+            model_key, backend, num_workers,
+            max_batch_size=int(cfg.get("max_batch_size", DEFAULT_MAX_BATCH_SIZE)),
+            max_wait_ms=float(cfg.get("max_wait_ms", DEFAULT_MAX_WAIT_MS)),
+            result_timeout=float(cfg.get("result_timeout", DEFAULT_RESULT_TIMEOUT)),
+        )
+    except Exception as e:
+        st.warning(f"⚠️ Çıkarım işçi havuzu başlatılamadı, süreç içi çıkarıma dönülüyor: {e}")
+        return None, False
+    if pool.is_demo:
+        st.warning(pool.message)
+    else:
+        st.success(pool.message)
+    return pool, pool.is_demo
+
+
+def get_inference_service():
+    """
+    Yapılandırmaya göre paylaşılan çıkarım servisini döndürür: işçi süreç
+    havuzu veya süreç içi mikro-batch zamanlayıcısı.
+
+    Returns:
+        (servis, is_demo_mode) tuple'ı
+    """
+    backend = get_backend()
+    num_workers = int(_secrets_section("inference_pool").get("workers", 0))
+    if num_workers > 0:
+        pool, is_demo = load_worker_pool(backend, MODEL_KEY, num_workers)
+        if pool is not None:
+            return pool, is_demo
+    return load_scheduler(backend, MODEL_KEY)
+
+
+def get_explainer():
+    """
+    Seçili çıkarım arka ucuna göre (cihaz, açıklayıcı, demo_modu) döndürür.
+    Açıklayıcı, tüm oturumların isteklerini birleştiren paylaşılan çıkarım
+    servisidir; tek forward pass ile olasılık + Grad-CAM üretir.
+    """
+    service, is_demo = get_inference_service()
+    return service.device, service, is_demo
+
+
+@st.cache_resource
+def load_result_cache() -> ResultCache:
+    """
+    Oturumlar arasında paylaşılan sonuç önbelleğini oluşturur.
+    `.streamlit/secrets.toml` içindeki isteğe bağlı `[cache]` bölümü
+    (`max_mb`, `dir`, `disk_max_mb`) ile bellek bütçesi ve disk katmanı ayarlanır.
+    """
+    cfg = _secrets_section("cache")
+    max_mb = int(cfg.get("max_mb", DEFAULT_MAX_MB))
+    disk_max_mb = int(cfg.get("disk_max_mb", DEFAULT_DISK_MAX_MB))
+    return ResultCache(max_bytes=max_mb * 1024 * 1024, disk_dir=cfg.get("dir"),
+                       disk_max_bytes=disk_max_mb * 1024 * 1024)
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # SIDEBAR — Aktif Hasta & Hızlı Seçim
 # ══════════════════════════════════════════════════════════════════════════════
@@ -155,20 +279,39 @@ with st.sidebar:
 
     st.markdown("---")
 
+    # Çıkarım motoru — ONNX artefaktı mevcutsa seçilebilir
+    if load_onnx_session(MODEL_KEY) is not None:
+        backend_label = st.radio("⚙️ Çıkarım motoru", list(INFERENCE_BACKENDS), horizontal=True)
+        st.session_state["inference_backend"] = INFERENCE_BACKENDS[backend_label]
+        st.markdown("---")
+
+    # Grad-CAM görünümü — kayıtlar ham ızgara sakladığından yeniden analiz gerekmez
+    cam_alpha = st.slider("🔥 Grad-CAM opaklığı", 0.1, 0.9, 0.5, 0.05, key="cam_alpha")
+    cam_colormap = COLORMAPS[st.selectbox("🎨 Renk haritası", list(COLORMAPS), key="cam_colormap")]
+
+    # Paylaşılan çıkarım kuyruğu metrikleri
+    service, _ = get_inference_service()
+    m = service.metrics()
+    workers = f" · {m['workers']} işçi süreç" if "workers" in m else ""
+    st.caption(f"⚙️ Kuyruk: {m['queue_depth']} bekleyen · {m['requests']} istek · "
+               f"ort. batch {m['avg_batch_size']:.1f}{workers}")
+    st.markdown("---")
+
     # Hızlı arama
     if db_ok:
         st.markdown("**🔍 Hızlı Hasta Ara**")
         qq = st.text_input("Ad, soyad veya dosya no", placeholder="Örn: Mehmet veya 12345",
                            label_visibility="collapsed", key="sidebar_q")
         if qq:
-            found = search_patients(qq)
-            for p in found[:5]:
+            found, next_found = search_patients_page(qq, cursor=page_cursor("sidebar_q", qq), limit=5)
+            for p in found:
                 if st.button(f"👤 {p['ad']} {p['soyad']} · {p['dosya_no']}", key=f"sq_{p['id']}",
                              use_container_width=True):
                     st.session_state["selected_patient"] = p
                     st.session_state["current_result"] = None
                     st.session_state["compare_selections"] = []
                     st.rerun()
+            render_pager("sidebar_q", next_found)
 
 # ══════════════════════════════════════════════════════════════════════════════
 # ANA SEKMELER
@@ -203,7 +346,7 @@ with tab_analysis:
                 st.session_state["show_patient_picker"] = True
 
             if st.session_state.get("show_patient_picker"):
-                all_p = get_all_patients()
+                all_p, next_p = search_patients_page(cursor=page_cursor("inline_pick"))
                 if all_p:
                     opts = {f"{p['ad']} {p['soyad']} · {p['dosya_no']}": p for p in all_p}
                     chosen = st.selectbox("Hasta seçin:", [""] + list(opts.keys()), key="inline_pick")
@@ -213,6 +356,7 @@ with tab_analysis:
                         st.session_state["compare_selections"] = []
                         st.session_state["show_patient_picker"] = False
                         st.rerun()
+                    render_pager("inline_pick", next_p)
                 else:
                     st.caption("Henüz kayıtlı hasta yok. '🏥 Hasta Yönetimi' sekmesinden ekleyin.")
 
@@ -223,43 +367,210 @@ with tab_analysis:
     with col_left:
         st.markdown('<p class="sec-title">📤 OCT Analizi</p>', unsafe_allow_html=True)
 
-        uploaded = st.file_uploader("Görüntü", type=["jpg", "jpeg", "png", "bmp", "tiff"],
-                                    label_visibility="collapsed")
+        batch_mode = st.toggle("📚 Seri analiz (çoklu görüntü)", key="batch_mode")
+
+        if batch_mode:
+            uploaded = None
+            batch_files = st.file_uploader("Görüntüler", type=["jpg", "jpeg", "png", "bmp", "tiff"],
+                                           accept_multiple_files=True, label_visibility="collapsed")
+            max_bs = st.slider("Maksimum batch boyutu", 1, 32, DEFAULT_MAX_BATCH_SIZE, key="batch_max_bs")
+
+            if batch_files and st.button(f"🚀 {len(batch_files)} Görüntüyü Analiz Et",
+                                         type="primary", use_container_width=True):
+                with st.spinner("Seri analiz ediliyor…"):
+                    device, explainer, is_demo = get_explainer()
+                    if is_demo:
+                        st.warning("⚠️ Demo modu — ağırlıklar yüklenmedi.")
+
+                    decoded_files, decoded_images = [], []
+                    for f in batch_files:
+                        try:
+                            decoded_images.append(preprocessing.decode_image(f))
+                            decoded_files.append(f)
+                        except ValueError as e:
+                            st.error(f"❌ {f.name}: {e}")
+
+                    try:
+                        batch_results = analyze_images(
+                            explainer,
+                            decoded_images,
+                            device,
+                            get_classes(MODEL_KEY),
+                            max_batch_size=max_bs,
+                        )
+                    except RuntimeError as e:
+                        st.error(f"❌ Çıkarım başarısız: {e}")
+                        st.stop()
+
+                    for f, r in zip(decoded_files, batch_results):
+                        r["file_name"] = f.name
+                        r["report_text"] = generate_clinical_report(
+                            model_name=MODEL_DISPLAY,
+                            predicted_class=r["predicted_class"],
+                            confidence=r["confidence"],
+                            is_swin_v2=False,
+                        )
+                        if patient and db_ok:
+                            save_analysis(
+                                patient_id=patient["id"],
+                                predicted_class=r["predicted_class"],
+                                confidence=r["confidence"],
+                                probabilities=r["probabilities"],
+                                model_name=MODEL_DISPLAY,
+                                original_image=r["display_image"],
+                                gradcam_cam=r["heatmap"],
+                                report_text=r["report_text"],
+                            )
+
+                    st.session_state["batch_results"] = batch_results
+
+            batch_results = st.session_state.get("batch_results") or []
+            if batch_results:
+                if patient and db_ok:
+                    st.success(f"💾 {len(batch_results)} analiz kaydedildi.")
+                grid = st.columns(3)
+                for i, r in enumerate(batch_results):
+                    with grid[i % 3]:
+                        ok = r["predicted_class"] == "NORMAL"
+                        c = "#4ade80" if ok else "#f87171"
+                        st.markdown(f"""
+                        <div class="cmp-col">
+                            <span class="tag">{r.get('file_name', i + 1)}</span>
+                            <h4 style="color:{c};font-size:1.1rem">{r['predicted_class']}</h4>
+                            <p class="conf">%{r['confidence']*100:.1f}</p>
+                        </div>
+                        """, unsafe_allow_html=True)
+                        st.image(r["overlaid_image"], use_container_width=True)
+        else:
+            uploaded = st.file_uploader("Görüntü", type=["jpg", "jpeg", "png", "bmp", "tiff"],
+                                        label_visibility="collapsed")
 
         if uploaded:
-            pil_image = PILImage.open(uploaded).convert("RGB")
-            display_image = preprocessing.prepare_display_image(pil_image)
+            try:
+                # Tek çözme + tek yeniden boyutlandırma: model tensörü ve görüntüleme dizisi ortak
+                image_tensor, display_image = preprocessing.prepare_image(preprocessing.decode_image(uploaded))
+                # Çok sayfalı TIFF → OCT hacmi (yalnızca başlıklar okunur)
+                n_frames = count_frames(uploaded)
+            except ValueError as e:
+                st.error(f"❌ {e}")
+                uploaded = None
 
+        if uploaded:
             # Küçük önizleme + buton
             c_img, c_btn = st.columns([2, 1])
             with c_img:
-                st.image(display_image, width=180, caption="Yüklenen OCT")
+                caption = f"OCT hacmi · {n_frames} B-scan (ilk kare)" if n_frames > 1 else "Yüklenen OCT"
+                st.image(display_image, width=180, caption=caption)
             with c_btn:
                 st.markdown("<br>", unsafe_allow_html=True)
                 analyze_btn = st.button("🚀 Analiz Et", type="primary", use_container_width=True)
 
-            if analyze_btn:
+            if analyze_btn and n_frames > 1:
+                with st.spinner(f"{n_frames} B-scan analiz ediliyor…"):
+                    device, explainer, is_demo = get_explainer()
+                    if is_demo:
+                        st.warning("⚠️ Demo modu — ağırlıklar yüklenmedi.")
+
+                    class_names = get_classes(MODEL_KEY)
+                    try:
+                        volume = analyze_volume(explainer, uploaded, device, class_names)
+                    except (ValueError, RuntimeError) as e:
+                        st.error(f"❌ {e}")
+                        volume = None
+
+                if volume:
+                    # Kayıt ve görseller için en şüpheli B-scan temsilci olarak kullanılır
+                    lead = volume["top_frames"][0]
+                    report_text = generate_clinical_report(
+                        model_name=MODEL_DISPLAY,
+                        predicted_class=volume["predicted_class"],
+                        confidence=volume["confidence"],
+                        is_swin_v2=False,
+                    )
+
+                    saved_id = None
+                    if patient and db_ok:
+                        saved = save_analysis(
+                            patient_id=patient["id"],
+                            predicted_class=volume["predicted_class"],
+                            confidence=volume["confidence"],
+                            probabilities=volume["probabilities"],
+                            model_name=MODEL_DISPLAY,
+                            original_image=lead["display_image"],
+                            gradcam_cam=lead["heatmap"],
+                            report_text=report_text,
+                        )
+                        if saved:
+                            saved_id = saved.get("id")
+
+                    st.session_state["current_result"] = {
+                        "id": saved_id,
+                        "predicted_class": volume["predicted_class"],
+                        "confidence": volume["confidence"],
+                        "probabilities": volume["probabilities"],
+                        "model_name": MODEL_DISPLAY,
+                        "report_text": report_text,
+                        "display_image": lead["display_image"],
+                        "overlaid_image": lead["overlaid_image"],
+                        "heatmaps": None,
+                        "class_names": class_names,
+                        "analysis_date": datetime.now(TZ_TR).isoformat(),
+                        "volume": volume,
+                    }
+
+                    if patient and db_ok:
+                        past = get_patient_analysis_summaries(patient["id"], limit=2)
+                        if past and len(past) >= 2:
+                            st.session_state["compare_selections"] = [past[1]["id"]]
+                        else:
+                            st.session_state["compare_selections"] = []
+
+            elif analyze_btn:
                 with st.spinner("Analiz ediliyor…"):
-                    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-                    model, is_demo = load_model(MODEL_KEY, str(device))
-                    target_layer = get_target_layer(model, MODEL_KEY)
+                    device, explainer, is_demo = get_explainer()
 
                     if is_demo:
                         st.warning("⚠️ Demo modu — ağırlıklar yüklenmedi.")
 
-                    input_tensor = preprocessing.preprocess_image(pil_image, device)
-                    with torch.no_grad():
-                        outputs = model(input_tensor)
-                        probs = torch.nn.functional.softmax(outputs, dim=1)[0].cpu().numpy()
+                    # Aynı tarama + aynı model sürümü → önbellekten (demo modunda önbellek yok)
+                    result_cache = load_result_cache()
+                    model_version = get_model_version(MODEL_KEY, get_backend())
+                    cache_key = None
+                    if not is_demo and model_version is not None:
+                        cache_key = make_cache_key(
+                            uploaded.getvalue(), MODEL_KEY, model_version,
+                            get_backend(),
+                        )
+                    cached = result_cache.get(cache_key) if cache_key else None
 
+                    if cached is not None:
+                        probs = cached["probabilities"]
+                        raw_cams = cached["raw_cams"]
+                        display_image = cached["display_image"]
+                    else:
+                        input_tensor = image_tensor.unsqueeze(0).to(device)
+                        # Tek forward pass: olasılıklar + tüm sınıfların ham (düşük
+                        # çözünürlüklü) analitik Grad-CAM ızgaraları
+                        try:
+                            _, probs, raw_cams = explainer.predict_all(input_tensor, raw=True)
+                        except RuntimeError as e:
+                            st.error(f"❌ Çıkarım başarısız: {e}")
+                            st.stop()
+                        if cache_key:
+                            result_cache.put(cache_key, {
+                                "probabilities": probs,
+                                "raw_cams": raw_cams,
+                                "display_image": display_image,
+                            })
                     idx = int(np.argmax(probs))
+
+                    heatmaps = normalize_raw_cams(raw_cams)
+                    overlaid = overlay_gradcam(display_image, heatmaps[idx])
+
                     class_names = get_classes(MODEL_KEY)
                     predicted_class = class_names[idx]
                     confidence = float(probs[idx])
 
-                    cam = generate_gradcam(model, input_tensor, None, target_layer)
-                    overlaid = overlay_gradcam(display_image, cam)
-
                     report_text = generate_clinical_report(
                         model_name=MODEL_DISPLAY,
                         predicted_class=predicted_class,
@@ -276,8 +587,8 @@ with tab_analysis:
                             probabilities=probs.tolist(),
                             model_name=MODEL_DISPLAY,
                             original_image=display_image,
-                            gradcam_image=overlaid,
                             report_text=report_text,
+                            gradcam_cam=raw_cams[idx],
                         )
                         if saved:
                             saved_id = saved.get("id")
@@ -292,12 +603,13 @@ with tab_analysis:
                         "report_text": report_text,
                         "display_image": display_image,
                         "overlaid_image": overlaid,
+                        "heatmaps": heatmaps,
                         "class_names": class_names,
                         "analysis_date": now_str,
                     }
 
                     if patient and db_ok:
-                        past = get_patient_analyses(patient["id"])
+                        past = get_patient_analysis_summaries(patient["id"], limit=2)
                         if past and len(past) >= 2:
                             st.session_state["compare_selections"] = [past[1]["id"]]
                         else:
@@ -323,7 +635,34 @@ with tab_analysis:
 
             # Grad-CAM — küçük göster, tıkla büyüt
             with st.expander("🔥 Grad-CAM Dikkat Haritası (büyütmek için tıklayın)", expanded=True):
-                st.image(result["overlaid_image"], width=280, caption="Grad-CAM Aktivasyonu")
+                shown_image = result["overlaid_image"]
+                shown_class = result["predicted_class"]
+                if result.get("heatmaps") is not None:
+                    # Tüm sınıf haritaları hazır — model yeniden çalıştırılmaz
+                    shown_class = st.radio(
+                        "Sınıf", result["class_names"],
+                        index=result["class_names"].index(result["predicted_class"]),
+                        horizontal=True, label_visibility="collapsed",
+                        key=f"cam_cls_{result['analysis_date']}",
+                    )
+                    cls_idx = result["class_names"].index(shown_class)
+                    shown_image = overlay_gradcam(
+                        result["display_image"], result["heatmaps"][cls_idx], cam_alpha, cam_colormap,
+                    )
+                st.image(shown_image, width=280, caption=f"Grad-CAM Aktivasyonu · {shown_class}")
+
+            volume = result.get("volume")
+            if volume:
+                with st.expander(f"🧊 Hacim Özeti · {volume['num_frames']} B-scan", expanded=True):
+                    st.caption("Hacim olasılığı karelerin ortalamasıdır; en yüksek kare olasılıkları: " + " · ".join(
+                        f"{c} %{p*100:.1f}" for c, p in zip(result["class_names"], volume["max_probabilities"])
+                    ))
+                    frame_cols = st.columns(len(volume["top_frames"]))
+                    for fc, frame in zip(frame_cols, volume["top_frames"]):
+                        with fc:
+                            st.image(frame["overlaid_image"], use_container_width=True,
+                                     caption=f"B-scan {frame['frame_index'] + 1} · {frame['predicted_class']} "
+                                             f"%{frame['confidence']*100:.1f}")
 
             # Olasılık çubukları
             import plotly.graph_objects as go
@@ -400,7 +739,7 @@ with tab_analysis:
 
             # PDF İndir
             try:
-                hist = get_patient_analyses(patient["id"]) if patient and db_ok else None
+                hist = get_patient_analysis_summaries(patient["id"], limit=5) if patient and db_ok else None
                 report_for_pdf = st.session_state.get("llm_single_report") or result["report_text"]
                 pdf_bytes = generate_pdf_report(
                     original_image=result["display_image"],
@@ -426,10 +765,12 @@ with tab_analysis:
     with col_right:
         if patient and db_ok:
             st.markdown('<p class="sec-title">📋 Geçmiş Analizler</p>', unsafe_allow_html=True)
-            analyses = get_patient_analyses(patient["id"])
+            analyses, next_analyses = get_patient_analyses_page(
+                patient["id"], cursor=page_cursor(f"history_{patient['id']}"))
 
             if analyses:
-                st.caption(f"{len(analyses)} kayıt · Karşılaştırmak için ☑️ seçin (max 3)")
+                st.caption(f"{get_patient_analysis_count(patient['id'])} kayıt · "
+                           f"Karşılaştırmak için ☑️ seçin (max 3)")
 
                 current_sels = list(st.session_state.get("compare_selections", []))
                 EMO = {"CNV": "🔴", "DME": "🟡", "DRUSEN": "🟣", "NORMAL": "🟢", "AMD": "🩷"}
@@ -455,19 +796,23 @@ with tab_analysis:
                         with st.expander(f"{emo} **{cls}** — %{conf:.0f}  ·  {d} {t}", expanded=False):
                             st.caption(f"**Tanı:** {cls}  ·  **Güven:** %{conf:.1f}")
                             st.caption(f"**Model:** {a.get('model_name', '—')}  ·  **Tarih:** {d} {t}")
-                            if a.get("gradcam_image_b64"):
-                                st.image(base64_to_image(a["gradcam_image_b64"]),
-                                         width=180, caption="Grad-CAM")
-                            elif a.get("original_image_b64"):
-                                st.image(base64_to_image(a["original_image_b64"]),
-                                         width=180, caption="Orijinal")
-                            if a.get("report_text"):
-                                txt = a["report_text"]
-                                st.markdown(f"<p style='font-size:.78rem;color:#94a3b8;margin-top:.3rem'>"
-                                            f"{txt[:300]}{'…' if len(txt) > 300 else ''}</p>",
-                                            unsafe_allow_html=True)
+                            # Kapalı expander içeriği de çalıştırıldığından görüntü ve rapor
+                            # yalnızca istendiğinde bu analiz için ayrıca okunur
+                            if st.toggle("🖼️ Görüntü ve rapor", key=f"det_{a_id}"):
+                                a = with_analysis_details(a)
+                                shown, caption = render_analysis_gradcam(a, cam_alpha, cam_colormap), "Grad-CAM"
+                                if shown is None:
+                                    shown, caption = get_analysis_image(a), "Orijinal"
+                                if shown is not None:
+                                    st.image(shown, width=180, caption=caption)
+                                if a.get("report_text"):
+                                    txt = a["report_text"]
+                                    st.markdown(f"<p style='font-size:.78rem;color:#94a3b8;margin-top:.3rem'>"
+                                                f"{txt[:300]}{'…' if len(txt) > 300 else ''}</p>",
+                                                unsafe_allow_html=True)
 
                 st.session_state["compare_selections"] = current_sels[:3]
+                render_pager(f"history_{patient['id']}", next_analyses)
 
                 # Trend
                 if len(analyses) >= 2:
@@ -515,12 +860,12 @@ with tab_analysis:
         })
 
     if compare_ids and patient and db_ok:
-        all_h = get_patient_analyses(patient["id"])
-        hm = {a["id"]: a for a in all_h} if all_h else {}
+        # Yalnızca seçilen analizlerin görüntü ve raporları okunur
+        hm = get_analysis_details(compare_ids)
         for cid in compare_ids:
             a = hm.get(cid)
             if a:
-                gimg = base64_to_image(a["gradcam_image_b64"]) if a.get("gradcam_image_b64") else None
+                gimg = render_analysis_gradcam(a, cam_alpha, cam_colormap)
                 items.append({
                     "label": f"📅 {a.get('analysis_date', '?')[:10]}",
                     "predicted_class": a.get("predicted_class", "?"),
@@ -636,9 +981,8 @@ with tab_patients:
         # ── Liste ──
         with pt_sub1:
             st.markdown('<p class="sec-title">📋 Kayıtlı Hastalar</p>', unsafe_allow_html=True)
-            all_patients = get_all_patients()
+            all_patients, next_patients = search_patients_page(cursor=page_cursor("patient_list"))
             if all_patients:
-                st.caption(f"Toplam {len(all_patients)} hasta")
                 for p in all_patients:
                     c_info, c_act = st.columns([5, 1])
                     with c_info:
@@ -658,6 +1002,7 @@ with tab_patients:
                             st.session_state["current_result"] = None
                             st.session_state["compare_selections"] = []
                             st.rerun()
+                render_pager("patient_list", next_patients)
             else:
                 st.markdown('<div class="empty-box"><div class="ic">📭</div><p>Henüz hasta kaydı yok.</p></div>',
                             unsafe_allow_html=True)
@@ -674,18 +1019,22 @@ with tab_patients:
 
             sq = s_name or s_dosya or ""
             if sq:
-                results = search_patients(sq)
+                results, next_results = search_patients_page(sq, cursor=page_cursor("patient_search", sq))
                 if results:
-                    st.success(f"{len(results)} sonuç bulundu")
+                    st.success(f"{len(results)}{'+' if next_results else ''} sonuç bulundu")
+                    # Tüm sonuçların analiz sayıları tek sorguda
+                    an_stats = get_patient_analysis_stats([p["id"] for p in results]) if db_ok else {}
                     for p in results:
                         c_i, c_a = st.columns([5, 1])
                         with c_i:
-                            an_count = len(get_patient_analyses(p["id"])) if db_ok else 0
+                            ps = an_stats.get(p["id"]) or {"count": 0}
+                            last = (f" · 🕒 {ps['last_analysis_date'][:10]} {ps['last_class']}"
+                                    if ps.get("last_analysis_date") else "")
                             st.markdown(f"""
                             <div class="pt-card">
                                 <div>
                                     <span class="nm">👤 {p['ad']} {p['soyad']}</span><br>
-                                    <span class="no">📁 {p['dosya_no']} · 📊 {an_count} analiz</span>
+                                    <span class="no">📁 {p['dosya_no']} · 📊 {ps['count']} analiz{last}</span>
                                 </div>
                             </div>
                             """, unsafe_allow_html=True)
@@ -695,6 +1044,7 @@ with tab_patients:
                                 st.session_state["current_result"] = None
                                 st.session_state["compare_selections"] = []
                                 st.rerun()
+                    render_pager("patient_search", next_results)
                 else:
                     st.info("Sonuç bulunamadı.")
 
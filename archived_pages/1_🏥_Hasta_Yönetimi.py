@@ -108,11 +108,12 @@ st.markdown("""
 
 # ── Import veritabanı modülü ──
 from utils.database import (
-    is_db_available, add_patient, search_patients,
+    is_db_available, add_patient, search_patients_page,
     get_patient, update_patient, delete_patient,
-    get_patient_analyses, get_patient_analysis_count,
-    base64_to_image,
+    get_patient_analyses_page, get_patient_analysis_count, get_patient_analysis_stats,
+    get_analysis_image, render_analysis_gradcam, with_analysis_details,
 )
+from utils.ui_components import page_cursor, render_pager
 
 # ── Sayfa Başlığı ──
 st.markdown("""
@@ -186,12 +187,15 @@ with tab_search:
         label_visibility="collapsed",
     )
 
-    patients = search_patients(search_query)
+    patients, next_patients = search_patients_page(search_query, cursor=page_cursor("patient_list", search_query))
 
     if patients:
         st.markdown(f"**{len(patients)}** hasta bulundu")
+        # Tüm hastaların analiz istatistikleri tek sorguda
+        analysis_stats = get_patient_analysis_stats([p["id"] for p in patients])
         for p in patients:
-            analysis_count = get_patient_analysis_count(p["id"])
+            p_stats = analysis_stats[p["id"]]
+            analysis_count = p_stats["count"]
             col_info, col_action = st.columns([4, 1])
             with col_info:
                 created = ""
@@ -209,6 +213,7 @@ with tab_search:
                         📁 {p['dosya_no']}
                         {'· 📱 ' + p['telefon'] if p.get('telefon') else ''}
                         · 🔬 {analysis_count} analiz
+                        {'· 🩺 ' + p_stats['last_class'] if p_stats['last_class'] else ''}
                         · 📅 {created}
                     </p>
                 </div>
@@ -218,6 +223,7 @@ with tab_search:
                     st.session_state["selected_patient_id"] = p["id"]
                     st.session_state["active_tab"] = "profile"
                     st.rerun()
+        render_pager("patient_list", next_patients)
     elif search_query:
         st.info("🔍 Aramanızla eşleşen hasta bulunamadı.")
     else:
@@ -235,7 +241,7 @@ with tab_profile:
     """, unsafe_allow_html=True)
 
     # Hasta seçimi
-    all_patients = search_patients("")
+    all_patients, next_profiles = search_patients_page(cursor=page_cursor("profile_select"))
     if not all_patients:
         st.info("📋 Henüz kayıtlı hasta bulunmamaktadır.")
     else:
@@ -256,6 +262,7 @@ with tab_profile:
             "Hasta Seçin", options=list(patient_options.keys()),
             index=default_idx, label_visibility="visible",
         )
+        render_pager("profile_select", next_profiles)
         selected_id = patient_options[selected_label]
         patient = get_patient(selected_id)
 
@@ -316,7 +323,8 @@ with tab_profile:
             </div>
             """, unsafe_allow_html=True)
 
-            analyses = get_patient_analyses(patient["id"])
+            analyses, next_analyses = get_patient_analyses_page(
+                patient["id"], cursor=page_cursor(f"analyses_{patient['id']}"))
             if analyses:
                 for a in analyses:
                     try:
@@ -339,23 +347,29 @@ with tab_profile:
 
                     # Görüntüleri göster
                     with st.expander(f"📸 Görüntüler — {date_str}", expanded=False):
-                        img_c1, img_c2 = st.columns(2)
-                        with img_c1:
-                            if a.get("original_image_b64"):
-                                st.image(
-                                    base64_to_image(a["original_image_b64"]),
-                                    caption="Orijinal", use_container_width=True,
-                                )
-                            else:
-                                st.info("Görüntü kaydedilmemiş")
-                        with img_c2:
-                            if a.get("gradcam_image_b64"):
-                                st.image(
-                                    base64_to_image(a["gradcam_image_b64"]),
-                                    caption="Grad-CAM", use_container_width=True,
-                                )
-                            else:
-                                st.info("Grad-CAM kaydedilmemiş")
+                        # Görüntüler yalnızca istendiğinde bu analiz için okunur
+                        if st.toggle("Görüntüleri yükle", key=f"img_{a['id']}"):
+                            a = with_analysis_details(a)
+                            img_c1, img_c2 = st.columns(2)
+                            with img_c1:
+                                original_img = get_analysis_image(a)
+                                if original_img is not None:
+                                    st.image(
+                                        original_img,
+                                        caption="Orijinal", use_container_width=True,
+                                    )
+                                else:
+                                    st.info("Görüntü kaydedilmemiş")
+                            with img_c2:
+                                gradcam_img = render_analysis_gradcam(a)
+                                if gradcam_img is not None:
+                                    st.image(
+                                        gradcam_img,
+                                        caption="Grad-CAM", use_container_width=True,
+                                    )
+                                else:
+                                    st.info("Grad-CAM kaydedilmemiş")
+                render_pager(f"analyses_{patient['id']}", next_analyses)
             else:
                 st.info("🔬 Bu hasta için henüz analiz kaydı bulunmamaktadır. Ana sayfadan analiz yaparak kayıt oluşturabilirsiniz.")
 
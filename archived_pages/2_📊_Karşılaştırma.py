@@ -83,9 +83,11 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 from utils.database import (
-    is_db_available, search_patients,
-    get_patient_analyses, base64_to_image,
+    is_db_available, search_patients_page,
+    get_patient_analyses_page, get_patient_analysis_count, get_analysis_details,
+    get_analysis_image, render_analysis_gradcam,
 )
+from utils.ui_components import page_cursor, render_pager
 
 # ── Sayfa Başlığı ──
 st.markdown("""
@@ -100,7 +102,7 @@ if not is_db_available():
     st.stop()
 
 # ── Hasta Seçimi ──
-all_patients = search_patients("")
+all_patients, next_patients = search_patients_page(cursor=page_cursor("compare_patients"))
 if not all_patients:
     st.info("📋 Henüz kayıtlı hasta bulunmamaktadır.")
     st.stop()
@@ -111,15 +113,25 @@ patient_options = {
 }
 
 selected_label = st.selectbox("Hasta Seçin", options=list(patient_options.keys()))
+render_pager("compare_patients", next_patients)
 selected_id = patient_options[selected_label]
 
-analyses = get_patient_analyses(selected_id)
+# Trend ve karşılaştırma, geçmişin sayfalanmış bir penceresi üzerinde yapılır
+analysis_cursor = page_cursor(f"compare_analyses_{selected_id}")
+analyses, next_analyses = get_patient_analyses_page(selected_id, cursor=analysis_cursor)
 
 if not analyses:
     st.info("🔬 Bu hasta için henüz analiz kaydı bulunmamaktadır.")
     st.stop()
 
-if len(analyses) < 2:
+if analysis_cursor is not None or next_analyses is not None:
+    st.caption(
+        f"Toplam {get_patient_analysis_count(selected_id)} analizden {len(analyses)} tanesi "
+        "gösteriliyor; daha eski analizler için sayfa düğmelerini kullanın."
+    )
+    render_pager(f"compare_analyses_{selected_id}", next_analyses)
+
+if len(analyses) < 2 and analysis_cursor is None:
     st.warning("⚠️ Karşılaştırma yapabilmek için en az 2 analiz kaydı gereklidir. Şu an **1** analiz mevcut.")
 
 # ── Sınıf renk haritası ──
@@ -300,6 +312,9 @@ if len(analyses_chrono) >= 2:
 
     a1 = analyses_chrono[idx1]
     a2 = analyses_chrono[idx2]
+    # Görüntüler yalnızca seçilen iki analiz için okunur
+    details = get_analysis_details([a1["id"], a2["id"]])
+    a1, a2 = details.get(a1["id"], a1), details.get(a2["id"], a2)
 
     # Orijinal görüntüler
     st.markdown("#### 🖼️ Orijinal Görüntüler")
@@ -310,8 +325,9 @@ if len(analyses_chrono) >= 2:
         except Exception:
             dt1 = "?"
         st.markdown(f'<div class="image-card"><div class="image-card-title">📅 {dt1} · {a1["predicted_class"]}</div></div>', unsafe_allow_html=True)
-        if a1.get("original_image_b64"):
-            st.image(base64_to_image(a1["original_image_b64"]), use_container_width=True)
+        orig_a1 = get_analysis_image(a1)
+        if orig_a1 is not None:
+            st.image(orig_a1, use_container_width=True)
         else:
             st.info("Görüntü mevcut değil")
     with col_img2:
@@ -320,8 +336,9 @@ if len(analyses_chrono) >= 2:
         except Exception:
             dt2 = "?"
         st.markdown(f'<div class="image-card"><div class="image-card-title">📅 {dt2} · {a2["predicted_class"]}</div></div>', unsafe_allow_html=True)
-        if a2.get("original_image_b64"):
-            st.image(base64_to_image(a2["original_image_b64"]), use_container_width=True)
+        orig_a2 = get_analysis_image(a2)
+        if orig_a2 is not None:
+            st.image(orig_a2, use_container_width=True)
         else:
             st.info("Görüntü mevcut değil")
 
@@ -330,14 +347,16 @@ if len(analyses_chrono) >= 2:
     col_gc1, col_gc2 = st.columns(2)
     with col_gc1:
         st.markdown(f'<div class="image-card"><div class="image-card-title">🔥 Grad-CAM · {dt1}</div></div>', unsafe_allow_html=True)
-        if a1.get("gradcam_image_b64"):
-            st.image(base64_to_image(a1["gradcam_image_b64"]), use_container_width=True)
+        gc_a1 = render_analysis_gradcam(a1)
+        if gc_a1 is not None:
+            st.image(gc_a1, use_container_width=True)
         else:
             st.info("Grad-CAM mevcut değil")
     with col_gc2:
         st.markdown(f'<div class="image-card"><div class="image-card-title">🔥 Grad-CAM · {dt2}</div></div>', unsafe_allow_html=True)
-        if a2.get("gradcam_image_b64"):
-            st.image(base64_to_image(a2["gradcam_image_b64"]), use_container_width=True)
+        gc_a2 = render_analysis_gradcam(a2)
+        if gc_a2 is not None:
+            st.image(gc_a2, use_container_width=True)
         else:
             st.info("Grad-CAM mevcut değil")
 
@@ -3,181 +3,107 @@ Retinal AMD — Model Katmanı
 ============================
 EfficientNet-B4 model mimarisinin tanımlanması,
 oluşturulması ve ağırlık dosyalarından yüklenmesi.
-"""
-
-import os
-import torch
-import torch.nn as nn
-import torchvision.models as models
-import streamlit as st
-from typing import Tuple, List, Optional
 
-# ============================================================================
-# Model dosya yolları — eğitim tamamlandığında buradan güncelleyebilirsiniz
-# ============================================================================
-MODEL_V1_PATH = os.path.join(os.path.dirname(__file__), "sota_99acc.pth")
-MODEL_V2_PATH = os.path.join(os.path.dirname(__file__), "supcon_swin_v2_best_sota.pth")
-
-# ============================================================================
-# Sınıf eşlemeleri
-# ============================================================================
-CLASSES_V1: List[str] = ["CNV", "DME", "DRUSEN", "NORMAL"]
-CLASSES_V2: List[str] = ["AMD", "DME", "NORMAL"]
-
-# Model seçenekleri (sidebar için)
-MODEL_OPTIONS = {
-    "EfficientNet-B4 (Yüksek Hız/Kararlılık)": "efficientnet_b4",
-    "🔒 Swin-V2 + SupCon (Yakında)": "swin_v2",
-}
+Model oluşturma kodu Streamlit'e bağımlı olmayan models.builders
+modülündedir; bu paket onu yeniden dışa aktarır ve arayüz için
+st.cache_resource ile önbelleğe alınan yükleyicileri ekler. Streamlit
+yalnızca bir yükleyici çağrıldığında içe aktarılır; böylece komut satırı
+araçları paketi Streamlit kurulu olmadan da kullanabilir.
+"""
 
-# Pasif (henüz ağırlığı olmayan) modeller
-DISABLED_MODELS = {"swin_v2"}
+import functools
+from typing import Tuple, Optional
 
+import torch.nn as nn
 
-def create_efficientnet_b4(num_classes: int = 4) -> nn.Module:
-    """
-    EfficientNet-B4 modelini oluşturur ve son sınıflandırıcı katmanını
-    belirtilen sınıf sayısına göre konfigüre eder.
+from models.onnx_backend import OnnxSession, export_onnx, is_onnxruntime_available
+from models.builders import (
+    MODEL_V1_PATH, MODEL_V2_PATH, TORCHSCRIPT_SUFFIX, ONNX_SUFFIX,
+    CLASSES_V1, CLASSES_V2, MODEL_OPTIONS, DISABLED_MODELS, QUANTIZED_MODELS, INFERENCE_BACKENDS,
+    StagedClassifier,
+    create_efficientnet_b4, create_swin_v2,
+    get_target_layer, split_model, get_classes, get_base_model_type,
+    get_weight_path, get_int8_path, get_torchscript_path, get_onnx_path, get_model_version,
+    export_torchscript, load_torchscript,
+    build_model, build_explainer, build_onnx_session,
+)
+from utils.gradcam import HeadGradCAM
 
-    Args:
-        num_classes: Çıkış sınıf sayısı (varsayılan: 4 — CNV, DME, DRUSEN, NORMAL)
 
-    Returns:
-        Konfigüre edilmiş EfficientNet-B4 modeli
-    """
-    # Önceden eğitilmiş ağırlıklar olmadan model oluştur
-    model = models.efficientnet_b4(weights=None)
+def _cache_resource(func):
+    """st.cache_resource'u ilk çağrıda uygular (Streamlit'i geç içe aktarır)."""
+    cached = None
 
-    # Son sınıflandırıcı katmanını hedef sınıf sayısına göre değiştir
-    # Kaydedilen .pth dosyasındaki yapı: classifier.1.1 (iç içe Sequential)
-    in_features = model.classifier[1].in_features
-    model.classifier[1] = nn.Sequential(
-        nn.Dropout(p=0.4, inplace=True),
-        nn.Linear(in_features, num_classes),
-    )
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        nonlocal cached
+        if cached is None:
+            import streamlit as st
+            cached = st.cache_resource(func)
+        return cached(*args, **kwargs)
 
-    return model
+    return wrapper
 
 
-def create_swin_v2(num_classes: int = 3) -> nn.Module:
+@_cache_resource
+def load_model(model_type: str, device_str: str) -> Tuple[nn.Module, bool]:
     """
-    Swin-V2-B modelini oluşturur. Omurgayı (backbone) dondurur ve
-    son katmanı belirtilen sınıf sayısına göre konfigüre eder.
+    Belirtilen model tipini yükler. Ağırlık dosyası mevcutsa diskten yükler,
+    yoksa demo modunda (rastgele ağırlıklarla) çalışır.
 
-    Not: Bu modelde CNV ve DRUSEN, "AMD" başlığı altında birleştirilmiştir.
+    st.cache_resource ile sarmalanarak tekrar tekrar yükleme engellenir.
 
     Args:
-        num_classes: Çıkış sınıf sayısı (varsayılan: 3 — AMD, DME, NORMAL)
+        model_type: Model tipi ("efficientnet_b4" veya "swin_v2")
+        device_str: Hedef cihaz string'i ("cuda" veya "cpu")
 
     Returns:
-        Konfigüre edilmiş ve omurgası dondurulmuş Swin-V2-B modeli
-    """
-    # Önceden eğitilmiş ağırlıklar olmadan model oluştur
-    model = models.swin_v2_b(weights=None)
-
-    # Omurgayı dondur — sadece head eğitilebilir
-    for param in model.parameters():
-        param.requires_grad = False
-
-    # Son sınıflandırıcı katmanını değiştir
-    in_features = model.head.in_features
-    model.head = nn.Linear(in_features, num_classes)
-
-    # Head katmanını eğitilebilir yap
-    for param in model.head.parameters():
-        param.requires_grad = True
-
-    return model
-
-
-def get_target_layer(model: nn.Module, model_type: str) -> nn.Module:
+        (model, is_demo_mode) tuple'ı
     """
-    Grad-CAM için hedef katmanı döndürür.
+    import streamlit as st
 
-    Args:
-        model: PyTorch modeli
-        model_type: Model tipi ("efficientnet_b4" veya "swin_v2")
+    model, is_demo_mode, message = build_model(model_type, device_str)
 
-    Returns:
-        Grad-CAM için hedef katman modülü
-    """
-    if model_type == "efficientnet_b4":
-        # EfficientNet'in son özellik çıkarma bloğu
-        return model.features[-1]
+    if is_demo_mode:
+        st.warning(message)
     else:
-        # Swin-V2'nin normalizasyon katmanı
-        return model.norm
+        st.success(message)
+
+    return model, is_demo_mode
 
 
-def get_classes(model_type: str) -> List[str]:
+@_cache_resource
+def load_explainer(model_type: str, device_str: str) -> Tuple[HeadGradCAM, nn.Module, bool]:
     """
-    Model tipine göre sınıf isimlerini döndürür.
+    load_model ile önbelleğe alınmış modelin kalıcı açıklayıcısını döndürür
+    (st.cache_resource ile model başına bir kez oluşturulur).
 
     Args:
         model_type: Model tipi ("efficientnet_b4" veya "swin_v2")
+        device_str: Hedef cihaz string'i ("cuda" veya "cpu")
 
     Returns:
-        Sınıf isimlerinin listesi
+        (açıklayıcı, model, is_demo_mode) tuple'ı
     """
-    if model_type == "efficientnet_b4":
-        return CLASSES_V1
-    return CLASSES_V2
+    model, is_demo_mode = load_model(model_type, device_str)
+    return build_explainer(model, model_type), model, is_demo_mode
 
 
-@st.cache_resource
-def load_model(model_type: str, device_str: str) -> Tuple[nn.Module, bool]:
+@_cache_resource
+def load_onnx_session(model_type: str) -> Optional[OnnxSession]:
     """
-    Belirtilen model tipini yükler. Ağırlık dosyası mevcutsa diskten yükler,
-    yoksa demo modunda (rastgele ağırlıklarla) çalışır.
-
-    st.cache_resource ile sarmalanarak tekrar tekrar yükleme engellenir.
+    ONNX Runtime oturumunu yükler (st.cache_resource ile bir kez).
 
     Args:
         model_type: Model tipi ("efficientnet_b4" veya "swin_v2")
-        device_str: Hedef cihaz string'i ("cuda" veya "cpu")
 
     Returns:
-        (model, is_demo_mode) tuple'ı
+        OnnxSession veya None (artefakt/onnxruntime yoksa)
     """
-    device = torch.device(device_str)
-    is_demo_mode = False
+    import streamlit as st
 
-    # Model mimarisini oluştur
-    if model_type == "efficientnet_b4":
-        model = create_efficientnet_b4(num_classes=4)
-        weight_path = MODEL_V1_PATH
-    else:
-        model = create_swin_v2(num_classes=3)
-        weight_path = MODEL_V2_PATH
-
-    # Ağırlık dosyasını yüklemeye çalış
-    if os.path.exists(weight_path):
-        try:
-            state_dict = torch.load(weight_path, map_location=device, weights_only=True)
-
-            # Eğer state_dict bir dict içinde sarmalanmışsa çöz
-            if "model_state_dict" in state_dict:
-                state_dict = state_dict["model_state_dict"]
-            elif "state_dict" in state_dict:
-                state_dict = state_dict["state_dict"]
-
-            model.load_state_dict(state_dict, strict=False)
-            st.success(f"✅ Model ağırlıkları başarıyla yüklendi: `{weight_path}`")
-        except Exception as e:
-            st.warning(
-                f"⚠️ Model ağırlıkları yüklenirken hata oluştu: {e}\n"
-                f"Demo modunda devam ediliyor."
-            )
-            is_demo_mode = True
-    else:
-        st.warning(
-            f"⚠️ Model dosyası bulunamadı: `{weight_path}`\n"
-            f"Demo modunda (rastgele ağırlıklarla) devam ediliyor."
-        )
-        is_demo_mode = True
-
-    # Modeli değerlendirme moduna al ve cihaza taşı
-    model = model.to(device)
-    model.eval()
-
-    return model, is_demo_mode
+    try:
+        return build_onnx_session(model_type)
+    except Exception as e:
+        st.warning(f"⚠️ ONNX Runtime oturumu oluşturulamadı: {e}")
+        return None
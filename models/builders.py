@@ -0,0 +1,495 @@
+"""
+Retinal AMD — Model Oluşturma
+===============================
+EfficientNet-B4 / Swin-V2 mimarilerinin tanımlanması, ağırlık dosyalarından
+ve dışa aktarılmış artefaktlardan (TorchScript, INT8, ONNX) yüklenmesi.
+Streamlit'e bağımlı değildir; komut satırı araçları ve çıkarım işçileri
+doğrudan bu modülü kullanır. Arayüzün önbellekli yükleyicileri için
+bkz. models (paket).
+"""
+
+import os
+import torch
+import torch.nn as nn
+import torchvision.models as models
+from typing import Tuple, List, Optional
+
+from models.onnx_backend import OnnxSession, is_onnxruntime_available
+from utils.gradcam import HeadGradCAM
+
+# ============================================================================
+# Model dosya yolları — eğitim tamamlandığında buradan güncelleyebilirsiniz
+# ============================================================================
+MODEL_V1_PATH = os.path.join(os.path.dirname(__file__), "sota_99acc.pth")
+MODEL_V2_PATH = os.path.join(os.path.dirname(__file__), "supcon_swin_v2_best_sota.pth")
+
+# Dondurulmuş TorchScript artefaktı ağırlık dosyasının yanında tutulur:
+# sota_99acc.pth → sota_99acc.torchscript.pt (bkz. scripts/export_torchscript.py)
+TORCHSCRIPT_SUFFIX = ".torchscript.pt"
+# ONNX Runtime arka ucu için: sota_99acc.pth → sota_99acc.onnx (bkz. scripts/export_onnx.py)
+ONNX_SUFFIX = ".onnx"
+
+# ============================================================================
+# Sınıf eşlemeleri
+# ============================================================================
+CLASSES_V1: List[str] = ["CNV", "DME", "DRUSEN", "NORMAL"]
+CLASSES_V2: List[str] = ["AMD", "DME", "NORMAL"]
+
+# Model seçenekleri (sidebar için)
+MODEL_OPTIONS = {
+    "EfficientNet-B4 (Yüksek Hız/Kararlılık)": "efficientnet_b4",
+    "EfficientNet-B4 INT8 (CPU Hızlı)": "efficientnet_b4_int8",
+    "🔒 Swin-V2 + SupCon (Yakında)": "swin_v2",
+}
+
+# Pasif (henüz ağırlığı olmayan) modeller
+DISABLED_MODELS = {"swin_v2"}
+
+# Nicemlenmiş (INT8) varyantlar → temel mimari
+# Artefakt: sota_99acc.pth → sota_99acc.int8.torchscript.pt (bkz. scripts/quantize_int8.py)
+QUANTIZED_MODELS = {"efficientnet_b4_int8": "efficientnet_b4"}
+INT8_SUFFIX = ".int8.torchscript.pt"
+
+# Çıkarım arka uçları (sidebar için)
+INFERENCE_BACKENDS = {
+    "PyTorch": "torch",
+    "ONNX Runtime (CPU)": "onnx",
+}
+
+
+def create_efficientnet_b4(num_classes: int = 4) -> nn.Module:
+    """
+    EfficientNet-B4 modelini oluşturur ve son sınıflandırıcı katmanını
+    belirtilen sınıf sayısına göre konfigüre eder.
+
+    Args:
+        num_classes: Çıkış sınıf sayısı (varsayılan: 4 — CNV, DME, DRUSEN, NORMAL)
+
+    Returns:
+        Konfigüre edilmiş EfficientNet-B4 modeli
+    """
+    # Önceden eğitilmiş ağırlıklar olmadan model oluştur
+    model = models.efficientnet_b4(weights=None)
+
+    # Son sınıflandırıcı katmanını hedef sınıf sayısına göre değiştir
+    # Kaydedilen .pth dosyasındaki yapı: classifier.1.1 (iç içe Sequential)
+    in_features = model.classifier[1].in_features
+    model.classifier[1] = nn.Sequential(
+        nn.Dropout(p=0.4, inplace=True),
+        nn.Linear(in_features, num_classes),
+    )
+
+    return model
+
+
+def create_swin_v2(num_classes: int = 3) -> nn.Module:
+    """
+    Swin-V2-B modelini oluşturur. Omurgayı (backbone) dondurur ve
+    son katmanı belirtilen sınıf sayısına göre konfigüre eder.
+
+    Not: Bu modelde CNV ve DRUSEN, "AMD" başlığı altında birleştirilmiştir.
+
+    Args:
+        num_classes: Çıkış sınıf sayısı (varsayılan: 3 — AMD, DME, NORMAL)
+
+    Returns:
+        Konfigüre edilmiş ve omurgası dondurulmuş Swin-V2-B modeli
+    """
+    # Önceden eğitilmiş ağırlıklar olmadan model oluştur
+    model = models.swin_v2_b(weights=None)
+
+    # Omurgayı dondur — sadece head eğitilebilir
+    for param in model.parameters():
+        param.requires_grad = False
+
+    # Son sınıflandırıcı katmanını değiştir
+    in_features = model.head.in_features
+    model.head = nn.Linear(in_features, num_classes)
+
+    # Head katmanını eğitilebilir yap
+    for param in model.head.parameters():
+        param.requires_grad = True
+
+    return model
+
+
+class StagedClassifier(nn.Module):
+    """
+    Özellik çıkarıcı → global average pooling → doğrusal head zinciri.
+
+    Dışa aktarılmış (TorchScript) modeller bu sarmalayıcı ile yüklenir:
+    ağır özellik çıkarıcı dondurulmuş bir ScriptModule, küçük head ise
+    eager nn.Linear olarak tutulur. Böylece analitik Grad-CAM
+    (bkz. split_model) dışa aktarılmış modelde de aynen çalışır.
+    """
+
+    def __init__(self, features: nn.Module, head: nn.Linear) -> None:
+        super().__init__()
+        self.features = features
+        self.head = head
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.head(self.features(x).mean(dim=(2, 3)))
+
+
+class _FeatureExport(nn.Module):
+    """TorchScript dışa aktarımı için özellik çıkarıcı + head ağırlıkları (buffer olarak)."""
+
+    def __init__(self, features: nn.Module, head: nn.Linear) -> None:
+        super().__init__()
+        self.features = features
+        self.register_buffer("head_weight", head.weight.detach().clone())
+        self.register_buffer("head_bias", head.bias.detach().clone())
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.features(x)
+
+
+def get_target_layer(model: nn.Module, model_type: str) -> nn.Module:
+    """
+    Grad-CAM için hedef katmanı döndürür.
+
+    Args:
+        model: PyTorch modeli
+        model_type: Model tipi ("efficientnet_b4" veya "swin_v2")
+
+    Returns:
+        Grad-CAM için hedef katman modülü
+    """
+    if isinstance(model, StagedClassifier):
+        # Dışa aktarılmış model — özellik çıkarıcının çıktısı
+        return model.features
+    model_type = get_base_model_type(model_type)
+    if model_type == "efficientnet_b4":
+        # EfficientNet'in son özellik çıkarma bloğu
+        return model.features[-1]
+    else:
+        # Swin-V2'nin normalizasyon katmanı
+        return model.norm
+
+
+def split_model(model: nn.Module, model_type: str) -> Tuple[nn.Module, nn.Linear]:
+    """
+    Modeli özellik çıkarıcı (features) ve doğrusal sınıflandırıcı (head)
+    olarak iki aşamaya ayırır. Aradaki tek işlem global average pooling'dir;
+    bu sayede Grad-CAM kanal ağırlıkları head ağırlıklarından kapalı formda
+    hesaplanabilir (bkz. utils.gradcam.HeadGradCAM).
+
+    Args:
+        model: PyTorch modeli
+        model_type: Model tipi ("efficientnet_b4" veya "swin_v2")
+
+    Returns:
+        ([B, 3, H, W] → [B, C, h, w] özellik modülü, nn.Linear head) tuple'ı
+    """
+    if isinstance(model, StagedClassifier):
+        return model.features, model.head
+    model_type = get_base_model_type(model_type)
+    if model_type == "efficientnet_b4":
+        # features → avgpool → flatten → classifier[Dropout, Sequential(Dropout, Linear)]
+        # Dropout katmanları eval modunda etkisizdir
+        return model.features, model.classifier[1][-1]
+    else:
+        # features → norm → permute ([B, H, W, C] → [B, C, H, W]) → avgpool → head
+        return nn.Sequential(model.features, model.norm, model.permute), model.head
+
+
+def get_classes(model_type: str) -> List[str]:
+    """
+    Model tipine göre sınıf isimlerini döndürür.
+
+    Args:
+        model_type: Model tipi ("efficientnet_b4" veya "swin_v2")
+
+    Returns:
+        Sınıf isimlerinin listesi
+    """
+    if get_base_model_type(model_type) == "efficientnet_b4":
+        return CLASSES_V1
+    return CLASSES_V2
+
+
+def get_base_model_type(model_type: str) -> str:
+    """Nicemlenmiş varyantlar için temel mimari tipini, diğerleri için kendisini döndürür."""
+    return QUANTIZED_MODELS.get(model_type, model_type)
+
+
+def get_weight_path(model_type: str) -> str:
+    """Model tipine göre .pth ağırlık dosyasının yolunu döndürür."""
+    return MODEL_V1_PATH if get_base_model_type(model_type) == "efficientnet_b4" else MODEL_V2_PATH
+
+
+def get_int8_path(model_type: str) -> str:
+    """Model tipine göre INT8 nicemlenmiş TorchScript artefaktının yolunu döndürür."""
+    return os.path.splitext(get_weight_path(model_type))[0] + INT8_SUFFIX
+
+
+def get_torchscript_path(model_type: str) -> str:
+    """Model tipine göre dondurulmuş TorchScript artefaktının yolunu döndürür."""
+    return os.path.splitext(get_weight_path(model_type))[0] + TORCHSCRIPT_SUFFIX
+
+
+def get_onnx_path(model_type: str) -> str:
+    """Model tipine göre ONNX artefaktının yolunu döndürür."""
+    return os.path.splitext(get_weight_path(model_type))[0] + ONNX_SUFFIX
+
+
+def _file_version(path: str) -> str:
+    st_ = os.stat(path)
+    return f"{st_.st_size}-{st_.st_mtime_ns}"
+
+
+def get_model_version(model_type: str, backend: str = "torch") -> Optional[str]:
+    """
+    Çıkarımda kullanılacak ağırlıkları ve artefaktı tanımlayan sürüm dizgesini
+    döndürür (dosya boyutu ve değişiklik zamanı). Ağırlık dosyasının yanında
+    fiilen yüklenecek artefakt (TorchScript, INT8 veya ONNX) da sürüme
+    katılır; böylece yalnızca artefakt yeniden üretildiğinde de eski sonuçlar
+    kendiliğinden geçersiz kalır. Sonuç önbelleği anahtarında kullanılır.
+
+    Args:
+        model_type: Model tipi
+        backend: Çıkarım arka ucu ("torch" veya "onnx")
+
+    Returns:
+        Sürüm dizgesi veya None (ağırlık dosyası yoksa — demo modu)
+    """
+    weight_path = get_weight_path(model_type)
+    if not os.path.exists(weight_path):
+        return None
+    version = _file_version(weight_path)
+
+    # build_model / build_onnx_session ile aynı artefakt seçimi
+    if backend == "onnx":
+        onnx_path = get_onnx_path(model_type)
+        return f"{version}/onnx:{_file_version(onnx_path)}" if _is_artifact_fresh(onnx_path, weight_path) else None
+    if model_type in QUANTIZED_MODELS:
+        int8_path = get_int8_path(model_type)
+        if _is_artifact_fresh(int8_path, weight_path):
+            return f"{version}/int8:{_file_version(int8_path)}"
+        model_type = get_base_model_type(model_type)
+    ts_path = get_torchscript_path(model_type)
+    if _is_artifact_fresh(ts_path, weight_path):
+        return f"{version}/ts:{_file_version(ts_path)}"
+    return f"{version}/eager"
+
+
+def export_torchscript(model: nn.Module, model_type: str, path: str) -> None:
+    """
+    Modeli dondurulmuş (frozen) TorchScript artefaktı olarak dışa aktarır.
+
+    Özellik çıkarıcı trace edilip `torch.jit.freeze` ile dondurulur; bu adım
+    parametreleri sabite çevirir ve Conv→BatchNorm çiftlerini tek Conv'a
+    katlar. Head ağırlıkları artefakt içinde korunmuş attribute olarak saklanır.
+
+    Args:
+        model: Eval modundaki eager PyTorch modeli
+        model_type: Model tipi ("efficientnet_b4" veya "swin_v2")
+        path: Artefaktın yazılacağı dosya yolu
+    """
+    features, head = split_model(model, model_type)
+    wrapper = _FeatureExport(features, head).eval()
+    device = next(model.parameters()).device
+    example = torch.randn(1, 3, 224, 224, device=device)
+
+    with torch.no_grad():
+        traced = torch.jit.trace(wrapper, example)
+    frozen = torch.jit.freeze(traced, preserved_attrs=["head_weight", "head_bias"])
+    torch.jit.save(frozen, path)
+
+
+def load_torchscript(path: str, device: torch.device) -> StagedClassifier:
+    """
+    Dondurulmuş TorchScript artefaktını StagedClassifier olarak yükler.
+
+    Args:
+        path: export_torchscript ile üretilmiş artefakt yolu
+        device: Hedef cihaz
+
+    Returns:
+        Eval modunda StagedClassifier
+    """
+    features = torch.jit.load(path, map_location=device)
+    weight, bias = features.head_weight, features.head_bias
+    head = nn.Linear(weight.shape[1], weight.shape[0])
+    head.load_state_dict({"weight": weight, "bias": bias})
+
+    model = StagedClassifier(features, head).to(device)
+    model.eval()
+    return model
+
+
+def _is_artifact_fresh(artifact_path: str, weight_path: str) -> bool:
+    """Artefakt mevcut ve ağırlık dosyasından daha eski değilse True döner."""
+    if not os.path.exists(artifact_path):
+        return False
+    if not os.path.exists(weight_path):
+        return True
+    return os.path.getmtime(artifact_path) >= os.path.getmtime(weight_path)
+
+
+def _create_model(model_type: str) -> nn.Module:
+    """Model tipine göre mimariyi (rastgele ağırlıklarla) oluşturur."""
+    if model_type == "efficientnet_b4":
+        return create_efficientnet_b4(num_classes=4)
+    return create_swin_v2(num_classes=3)
+
+
+def _load_state_dict(weight_path: str, device: torch.device) -> dict:
+    """
+    Checkpoint'i bellek eşlemeli (mmap) olarak okur: tensörler dosya sayfalarına
+    işaret eder, RAM'e ikinci bir tam kopya alınmaz. mmap desteklenmiyorsa
+    (eski serileştirme formatı) normal okumaya düşer.
+    """
+    try:
+        state_dict = torch.load(weight_path, map_location=device, weights_only=True, mmap=True)
+    except RuntimeError:
+        state_dict = torch.load(weight_path, map_location=device, weights_only=True)
+
+    # Eğer state_dict bir dict içinde sarmalanmışsa çöz
+    if "model_state_dict" in state_dict:
+        state_dict = state_dict["model_state_dict"]
+    elif "state_dict" in state_dict:
+        state_dict = state_dict["state_dict"]
+    return state_dict
+
+
+def _load_checkpoint_model(model_type: str, weight_path: str, device: torch.device) -> nn.Module:
+    """
+    Modeli meta cihazda (bellek ayırmadan) kurar ve checkpoint tensörlerini
+    `assign=True` ile doğrudan parametre olarak bağlar. Böylece yükleme
+    sırasında tepe bellek kullanımı ağırlıkların yaklaşık tek bir kopyası
+    düzeyinde kalır.
+
+    Checkpoint'te bulunmayan tensör kalırsa (strict=False), model gerçek
+    bellekte kurulup ağırlıklar kopyalanır.
+    """
+    state_dict = _load_state_dict(weight_path, device)
+
+    with torch.device("meta"):
+        model = _create_model(model_type)
+    model.load_state_dict(state_dict, strict=False, assign=True)
+
+    if any(t.is_meta for t in list(model.parameters()) + list(model.buffers())):
+        model = _create_model(model_type)
+        model.load_state_dict(state_dict, strict=False)
+
+    return model
+
+
+def build_model(
+    model_type: str,
+    device_str: str,
+    prefer_torchscript: bool = True,
+) -> Tuple[nn.Module, bool, str]:
+    """
+    Belirtilen model tipini oluşturur ve ağırlık dosyası mevcutsa diskten yükler.
+    Streamlit'e bağımlı değildir; komut satırı araçları doğrudan bunu kullanır.
+
+    Ağırlık dosyasının yanında güncel bir dondurulmuş TorchScript artefaktı
+    varsa, Python'da mimari kurup state_dict kopyalamak yerine o yüklenir.
+
+    Args:
+        model_type: Model tipi ("efficientnet_b4" veya "swin_v2")
+        device_str: Hedef cihaz string'i ("cuda" veya "cpu")
+        prefer_torchscript: TorchScript artefaktı varsa onu tercih et
+
+    Returns:
+        (model, is_demo_mode, message) tuple'ı — message kullanıcıya gösterilecek durum metnidir
+    """
+    if model_type in QUANTIZED_MODELS:
+        return _build_quantized_model(model_type, device_str)
+
+    device = torch.device(device_str)
+    is_demo_mode = False
+    weight_path = get_weight_path(model_type)
+
+    # Dondurulmuş TorchScript artefaktı — hızlı soğuk başlangıç
+    ts_path = get_torchscript_path(model_type)
+    if prefer_torchscript and _is_artifact_fresh(ts_path, weight_path):
+        try:
+            model = load_torchscript(ts_path, device)
+            return model, False, f"✅ Dondurulmuş TorchScript modeli yüklendi: `{ts_path}`"
+        except Exception:
+            # Bozuk/uyumsuz artefakt — eager yola düş
+            pass
+
+    # Ağırlık dosyasını yüklemeye çalış
+    if os.path.exists(weight_path):
+        try:
+            model = _load_checkpoint_model(model_type, weight_path, device)
+            message = f"✅ Model ağırlıkları başarıyla yüklendi: `{weight_path}`"
+        except Exception as e:
+            model = _create_model(model_type)
+            message = (
+                f"⚠️ Model ağırlıkları yüklenirken hata oluştu: {e}\n"
+                f"Demo modunda devam ediliyor."
+            )
+            is_demo_mode = True
+    else:
+        model = _create_model(model_type)
+        message = (
+            f"⚠️ Model dosyası bulunamadı: `{weight_path}`\n"
+            f"Demo modunda (rastgele ağırlıklarla) devam ediliyor."
+        )
+        is_demo_mode = True
+
+    # Modeli değerlendirme moduna al ve cihaza taşı
+    model = model.to(device)
+    model.eval()
+
+    return model, is_demo_mode, message
+
+
+def _build_quantized_model(model_type: str, device_str: str) -> Tuple[nn.Module, bool, str]:
+    """
+    INT8 artefaktını yükler. Nicemlenmiş çekirdekler yalnızca CPU'da çalıştığından
+    model her zaman CPU'ya yüklenir. Artefakt yoksa FP32 temel modele geri döner.
+    """
+    int8_path = get_int8_path(model_type)
+    if _is_artifact_fresh(int8_path, get_weight_path(model_type)):
+        try:
+            model = load_torchscript(int8_path, torch.device("cpu"))
+            return model, False, f"✅ INT8 nicemlenmiş model yüklendi: `{int8_path}`"
+        except Exception as e:
+            reason = f"⚠️ INT8 artefaktı yüklenemedi: {e}"
+    else:
+        reason = f"⚠️ INT8 artefaktı bulunamadı: `{int8_path}`"
+
+    model, is_demo_mode, message = build_model(get_base_model_type(model_type), device_str)
+    return model, is_demo_mode, f"{reason} — FP32 modele geri dönüldü.\n{message}"
+
+
+def build_explainer(model: nn.Module, model_type: str) -> HeadGradCAM:
+    """
+    Model ömrü boyunca yeniden kullanılacak açıklayıcıyı oluşturur.
+    Analitik Grad-CAM hook kaydı, `zero_grad()` ve autograd grafiği
+    gerektirmediğinden tek nesne tüm çağrılar ve iş parçacıkları arasında
+    paylaşılabilir. Streamlit'e bağımlı değildir.
+
+    Args:
+        model: Yüklenmiş model (bkz. build_model)
+        model_type: Model tipi ("efficientnet_b4" veya "swin_v2")
+
+    Returns:
+        HeadGradCAM açıklayıcısı
+    """
+    return HeadGradCAM(*split_model(model, model_type))
+
+
+def build_onnx_session(model_type: str, num_threads: Optional[int] = None) -> Optional[OnnxSession]:
+    """
+    Güncel bir ONNX artefaktı ve onnxruntime mevcutsa CPU oturumu oluşturur.
+    Streamlit'e bağımlı değildir.
+
+    Args:
+        model_type: Model tipi ("efficientnet_b4" veya "swin_v2")
+        num_threads: intra-op iş parçacığı sayısı (None → onnxruntime varsayılanı)
+
+    Returns:
+        OnnxSession veya None (artefakt/onnxruntime yoksa)
+    """
+    onnx_path = get_onnx_path(model_type)
+    if not is_onnxruntime_available() or not _is_artifact_fresh(onnx_path, get_weight_path(model_type)):
+        return None
+    return OnnxSession(onnx_path, num_threads)
@@ -0,0 +1,114 @@
+"""
+Retinal AMD — ONNX Runtime Çıkarım Arka Ucu
+=============================================
+Modelleri ONNX'e dışa aktarır ve onnxruntime CPU execution provider'ı
+(tüm graf optimizasyonları açık) üzerinden çalıştırır.
+
+Dışa aktarılan graf iki çıktı üretir:
+  - logits: [N, C] sınıf skorları
+  - cams:   [N, C, h, w] tüm sınıfların ham (normalize edilmemiş) Grad-CAM
+            haritaları — head ağırlıkları × son özellik haritası
+Böylece Grad-CAM, ayrı bir backward ya da PyTorch modeli gerektirmeden
+aynı çıkarım çağrısından elde edilir (bkz. utils.gradcam.OnnxGradCAM).
+
+onnxruntime isteğe bağlı bir bağımlılıktır; yalnızca bu arka uç
+kullanıldığında import edilir.
+"""
+
+import importlib.util
+import inspect
+from typing import Optional, Tuple
+
+import torch
+import torch.nn as nn
+
+ONNX_OPSET = 17
+
+
+class _OnnxExport(nn.Module):
+    """ONNX dışa aktarımı için (logits, tüm sınıf ham CAM'leri) döndüren sarmalayıcı."""
+
+    def __init__(self, features: nn.Module, head: nn.Linear) -> None:
+        super().__init__()
+        self.features = features
+        self.head = head
+
+    def forward(self, x: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        activations = self.features(x)                                      # [N, K, h, w]
+        logits = self.head(activations.mean(dim=(2, 3)))                    # [N, C]
+        cams = torch.einsum("ck,nkhw->nchw", self.head.weight, activations)  # [N, C, h, w]
+        return logits, cams
+
+
+def is_onnxruntime_available() -> bool:
+    """onnxruntime paketinin kurulu olup olmadığını kontrol eder."""
+    return importlib.util.find_spec("onnxruntime") is not None
+
+
+def export_onnx(features: nn.Module, head: nn.Linear, path: str) -> None:
+    """
+    (features, head) çiftini dinamik batch boyutlu ONNX grafiği olarak dışa aktarır.
+
+    Args:
+        features: Özellik çıkarıcı aşama (bkz. models.split_model)
+        head: Doğrusal sınıflandırıcı katman
+        path: .onnx dosyasının yazılacağı yol
+    """
+    wrapper = _OnnxExport(features, head).eval()
+    device = head.weight.device
+    example = torch.randn(1, 3, 224, 224, device=device)
+
+    # torch>=2.5 varsayılan olarak dynamo exporter'ı kullanır; TorchScript tabanlı
+    # exporter ek bağımlılık (onnxscript) gerektirmez
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False
+
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper, (example,), path,
+            input_names=["input"],
+            output_names=["logits", "cams"],
+            dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}, "cams": {0: "batch"}},
+            opset_version=ONNX_OPSET,
+            **kwargs,
+        )
+
+
+class OnnxSession:
+    """
+    onnxruntime CPU oturumu. `run` çağrısı PyTorch tensörü alır ve
+    (logits, cams) tensörlerini döndürür.
+
+    Attributes:
+        path: Yüklenen .onnx dosyasının yolu
+    """
+
+    def __init__(self, path: str, num_threads: Optional[int] = None) -> None:
+        """
+        Args:
+            path: export_onnx ile üretilmiş .onnx dosyası
+            num_threads: intra-op iş parçacığı sayısı (None → onnxruntime varsayılanı)
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.path = path
+        self._session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def run(self, input_tensor: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Args:
+            input_tensor: [N, 3, 224, 224] boyutunda giriş tensörü
+
+        Returns:
+            ([N, C] logits, [N, C, h, w] ham CAM'ler) tuple'ı (CPU tensörleri)
+        """
+        array = input_tensor.detach().cpu().contiguous().numpy()
+        logits, cams = self._session.run(None, {"input": array})
+        return torch.from_numpy(logits), torch.from_numpy(cams)
+
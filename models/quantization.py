@@ -0,0 +1,68 @@
+"""
+Retinal AMD — INT8 Nicemleme (Quantization)
+=============================================
+EfficientNet-B4 özellik çıkarıcısı için kalibrasyon setiyle eğitim sonrası
+statik nicemleme (FX graph mode, per-channel ağırlık + histogram gözlemcili
+aktivasyonlar). Head katmanı FP32 bırakılır; böylece analitik Grad-CAM
+(bkz. utils.gradcam.HeadGradCAM) nicemlenmiş modelde de değişmeden çalışır.
+
+Üretilen model `models.export_torchscript` ile artefakta yazılır ve
+`load_model("efficientnet_b4_int8", ...)` tarafından yüklenir.
+"""
+
+import copy
+from typing import Iterable, Optional
+
+import torch
+import torch.nn as nn
+
+from models.builders import StagedClassifier, split_model, get_base_model_type
+
+
+def get_quantization_engine() -> str:
+    """Platformda desteklenen en uygun nicemleme motorunu döndürür (x86 > fbgemm > qnnpack)."""
+    supported = torch.backends.quantized.supported_engines
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in supported:
+            return engine
+    raise RuntimeError("Bu platformda PyTorch nicemleme motoru bulunamadı.")
+
+
+def quantize_static(
+    model: nn.Module,
+    model_type: str,
+    calibration_batches: Iterable[torch.Tensor],
+    engine: Optional[str] = None,
+) -> StagedClassifier:
+    """
+    Modelin özellik çıkarıcısını eğitim sonrası statik INT8 nicemlemeden geçirir.
+
+    Args:
+        model: Eval modundaki FP32 model (CPU üzerinde)
+        model_type: Model tipi (ör. "efficientnet_b4")
+        calibration_batches: Ön işlenmiş [N, 3, 224, 224] OCT görüntü batch'leri;
+                             aktivasyon aralıkları bunlardan ölçülür
+        engine: Nicemleme motoru (None → get_quantization_engine())
+
+    Returns:
+        INT8 özellik çıkarıcı + FP32 head'den oluşan StagedClassifier
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    engine = engine or get_quantization_engine()
+    torch.backends.quantized.engine = engine
+
+    features, head = split_model(model, get_base_model_type(model_type))
+    features = copy.deepcopy(features).cpu().eval()
+    example = torch.randn(1, 3, 224, 224)
+
+    prepared = prepare_fx(features, get_default_qconfig_mapping(engine), (example,))
+    with torch.no_grad():
+        for batch in calibration_batches:
+            prepared(batch.cpu())
+    quantized = convert_fx(prepared)
+
+    model = StagedClassifier(quantized, copy.deepcopy(head).cpu())
+    model.eval()
+    return model
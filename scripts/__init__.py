@@ -0,0 +1,5 @@
+"""
+Retinal AMD — Komut Satırı Araçları
+Streamlit arayüzü dışında çalışan toplu işlem ve bakım betikleri.
+Depo kök dizininden `python -m scripts.<betik>` şeklinde çalıştırılır.
+"""
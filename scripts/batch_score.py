@@ -0,0 +1,294 @@
+"""
+Retinal AMD — Başsız (Headless) Toplu Skorlama
+================================================
+Bir dizin ağacındaki veya dosya listesindeki OCT görüntülerini Streamlit
+olmadan skorlar. Görüntüler bir iş parçacığı havuzunda çözülüp ön işlenir,
+batch halinde modele verilir ve sonuçlar CSV/JSONL dosyasına akıtılır.
+
+Çıktı dosyası zaten varsa, içinde kayıtlı görüntüler atlanarak kalınan
+yerden devam edilir.
+
+Kullanım:
+    python -m scripts.batch_score taramalar/ -o sonuclar.csv
+    python -m scripts.batch_score --file-list liste.txt -o sonuclar.jsonl --overlay-dir overlays/
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+from models.builders import (
+    MODEL_OPTIONS, INFERENCE_BACKENDS, build_explainer, build_model, build_onnx_session, get_classes,
+)
+from utils.preprocessing import (
+    DEFAULT_NUM_WORKERS, PREPROCESS_BACKENDS, PinnedBatchBuffer, decode_image, prepare_display_image, prepare_image,
+)
+from utils.gradcam import OnnxGradCAM, overlay_gradcam
+from utils.inference_scheduler import DEFAULT_MAX_BATCH_SIZE
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
+
+# Çözülmüş görüntü: (yol, model tensörü, görüntüleme dizisi, hata mesajı)
+Decoded = Tuple[str, Optional[torch.Tensor], Optional[np.ndarray], Optional[str]]
+
+
+def collect_paths(inputs: Sequence[str], file_list: Optional[str] = None) -> List[str]:
+    """
+    Girdi dizinlerini özyinelemeli tarar ve desteklenen görüntü yollarını
+    deterministik (sıralı) bir liste olarak döndürür.
+
+    Args:
+        inputs: Dizin veya dosya yolları
+        file_list: Her satırında bir görüntü yolu bulunan metin dosyası
+
+    Returns:
+        Mutlak görüntü yolları listesi
+    """
+    paths: List[str] = []
+    if file_list:
+        with open(file_list, encoding="utf-8") as f:
+            paths.extend(line.strip() for line in f if line.strip())
+
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                for name in sorted(files):
+                    if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                        paths.append(os.path.join(root, name))
+        else:
+            paths.append(item)
+
+    # Tekrarları at, sırayı koru
+    seen: Set[str] = set()
+    unique = []
+    for p in paths:
+        p = os.path.abspath(p)
+        if p not in seen:
+            seen.add(p)
+            unique.append(p)
+    return unique
+
+
+def load_done_paths(output_path: str) -> Set[str]:
+    """
+    Mevcut çıktı dosyasından daha önce başarıyla skorlanmış görüntü yollarını
+    okur. Hata satırları (`error` dolu) sayılmaz; bu görüntüler devam edilen
+    çalıştırmada yeniden denenir. Yarıda kesilmiş (bozuk) son satır sessizce atlanır.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, encoding="utf-8", newline="") as f:
+        if output_path.endswith(".jsonl"):
+            for line in f:
+                try:
+                    row = json.loads(line)
+                    if not row.get("error"):
+                        done.add(row["path"])
+                except (ValueError, KeyError, AttributeError):
+                    continue
+        else:
+            for row in csv.DictReader(f):
+                if row.get("path") and not row.get("error"):
+                    done.add(row["path"])
+    return done
+
+
+def _decode(path: str, preprocess_backend: str = "pil") -> Decoded:
+    """
+    Görüntüyü diskten çözer ve model girişine hazırlar (iş parçacığında çalışır).
+    "cv2" arka ucunda yalnızca kırpılmış dizi üretilir; normalizasyon ana
+    iş parçacığında doğrudan batch tamponuna yazılır.
+    """
+    try:
+        image = decode_image(path)
+        if preprocess_backend == "cv2":
+            return path, None, prepare_display_image(image, "cv2"), None
+        tensor, display_image = prepare_image(image)
+        return path, tensor, display_image, None
+    except Exception as e:
+        return path, None, None, str(e)
+
+
+def iter_decoded_batches(
+    paths: Sequence[str],
+    pool: ThreadPoolExecutor,
+    batch_size: int,
+    preprocess_backend: str = "pil",
+) -> Iterator[List[Decoded]]:
+    """
+    Görüntüleri batch'ler halinde çözer. Bir sonraki batch, mevcut batch
+    model üzerinde işlenirken arka planda çözülmeye başlar.
+    """
+    chunks = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+    pending: Optional[List[Future]] = None
+    for chunk in chunks:
+        submitted = [pool.submit(_decode, p, preprocess_backend) for p in chunk]
+        if pending is not None:
+            yield [f.result() for f in pending]
+        pending = submitted
+    if pending is not None:
+        yield [f.result() for f in pending]
+
+
+class ResultWriter:
+    """Sonuçları CSV veya JSONL dosyasına satır satır ekleyen yazıcı."""
+
+    def __init__(self, output_path: str, class_names: List[str]) -> None:
+        self.is_jsonl = output_path.endswith(".jsonl")
+        self.class_names = class_names
+        is_new = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self._file = open(output_path, "a", encoding="utf-8", newline="")
+        self._csv: Optional[csv.DictWriter] = None
+        if not self.is_jsonl:
+            fields = ["path", "predicted_class", "confidence"]
+            fields += [f"prob_{c}" for c in class_names] + ["model", "error"]
+            self._csv = csv.DictWriter(self._file, fieldnames=fields)
+            if is_new:
+                self._csv.writeheader()
+
+    def write(self, row: Dict) -> None:
+        """Tek bir sonuç satırını yazar."""
+        if self.is_jsonl:
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        else:
+            flat = {k: row.get(k, "") for k in ("path", "predicted_class", "confidence", "model", "error")}
+            for c, p in (row.get("probabilities") or {}).items():
+                flat[f"prob_{c}"] = p
+            self._csv.writerow(flat)
+
+    def flush(self) -> None:
+        """Tampon belleği diske yazar (kesinti sonrası devam için)."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def overlay_filename(path: str) -> str:
+    """Görüntü yolundan çakışmayan bir overlay PNG dosya adı türetir."""
+    stem = os.path.splitext(os.path.splitdrive(path)[1])[0].strip(os.sep)
+    return stem.replace(os.sep, "__") + "_gradcam.png"
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="OCT görüntülerini Streamlit olmadan toplu skorlar.")
+    parser.add_argument("inputs", nargs="*", help="Görüntü dosyaları veya dizinleri")
+    parser.add_argument("--file-list", help="Her satırında bir görüntü yolu olan metin dosyası")
+    parser.add_argument("-o", "--output", required=True, help="Çıktı dosyası (.csv veya .jsonl)")
+    parser.add_argument("--model", default="efficientnet_b4", choices=sorted(set(MODEL_OPTIONS.values())))
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--backend", default="torch", choices=sorted(INFERENCE_BACKENDS.values()),
+                        help="Çıkarım arka ucu (onnx: scripts.export_onnx ile üretilmiş artefakt gerekir)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_NUM_WORKERS,
+                        help="Çözme/ön işleme iş parçacığı sayısı")
+    parser.add_argument("--preprocess", default="pil", choices=PREPROCESS_BACKENDS,
+                        help="Ön işleme arka ucu (cv2: vektörel cv2/NumPy + önceden ayrılmış batch tamponu)")
+    parser.add_argument("--overlay-dir", help="Grad-CAM overlay PNG'lerinin yazılacağı dizin")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Mevcut çıktı dosyasını yok sayıp baştan başla")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+
+    paths = collect_paths(args.inputs, args.file_list)
+    if not paths:
+        print("Skorlanacak görüntü bulunamadı.", file=sys.stderr)
+        return 1
+
+    if args.no_resume and os.path.exists(args.output):
+        os.remove(args.output)
+    done = load_done_paths(args.output)
+    todo = [p for p in paths if p not in done]
+    print(f"{len(paths)} görüntü bulundu, {len(done)} tanesi daha önce skorlanmış, "
+          f"{len(todo)} tanesi işlenecek.", file=sys.stderr)
+    if not todo:
+        return 0
+
+    device = torch.device(args.device)
+    class_names = get_classes(args.model)
+    if args.backend == "onnx":
+        session = build_onnx_session(args.model)
+        if session is None:
+            print("❌ ONNX artefaktı veya onnxruntime bulunamadı "
+                  "(önce `python -m scripts.export_onnx` çalıştırın).", file=sys.stderr)
+            return 1
+        device = torch.device("cpu")
+        explainer = OnnxGradCAM(session)
+        print(f"✅ ONNX Runtime oturumu yüklendi: `{session.path}`", file=sys.stderr)
+    else:
+        model, is_demo, message = build_model(args.model, str(device))
+        print(message, file=sys.stderr)
+        if is_demo:
+            print("⚠️ Demo modu — sonuçlar rastgele ağırlıklarla üretilecek.", file=sys.stderr)
+        # INT8 varyantı her zaman CPU'ya yüklenir — girişler modelin cihazına gitmeli
+        device = next(model.parameters()).device
+        explainer = build_explainer(model, args.model)
+
+    if args.overlay_dir:
+        os.makedirs(args.overlay_dir, exist_ok=True)
+
+    buffer = PinnedBatchBuffer(args.batch_size) if args.preprocess == "cv2" else None
+
+    writer = ResultWriter(args.output, class_names)
+    processed = 0
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            for batch in iter_decoded_batches(todo, pool, max(1, args.batch_size), args.preprocess):
+                ok = [b for b in batch if b[3] is None]
+                for path, _, _, error in batch:
+                    if error is not None:
+                        writer.write({"path": path, "model": args.model, "error": error})
+
+                if ok:
+                    if buffer is not None:
+                        inputs = buffer.load_arrays([b[2] for b in ok]).to(device, non_blocking=buffer.pinned)
+                    else:
+                        inputs = torch.stack([b[1] for b in ok]).to(device)
+                    _, probs, heatmaps = explainer.predict_batch(inputs)
+                    for (path, _, display_image, _), p, cam in zip(ok, probs, heatmaps):
+                        idx = int(np.argmax(p))
+                        writer.write({
+                            "path": path,
+                            "predicted_class": class_names[idx],
+                            "confidence": round(float(p[idx]), 6),
+                            "probabilities": {c: round(float(v), 6) for c, v in zip(class_names, p)},
+                            "model": args.model,
+                            "error": "",
+                        })
+                        if args.overlay_dir:
+                            overlaid = overlay_gradcam(display_image, cam)
+                            cv2.imwrite(os.path.join(args.overlay_dir, overlay_filename(path)),
+                                        cv2.cvtColor(overlaid, cv2.COLOR_RGB2BGR))
+
+                writer.flush()
+                processed += len(batch)
+                elapsed = time.perf_counter() - started
+                print(f"[{processed}/{len(todo)}] {processed / elapsed:.2f} görüntü/sn", file=sys.stderr)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Tamamlandı: {processed} görüntü, {elapsed:.1f} sn, "
+          f"{processed / elapsed:.2f} görüntü/sn", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Retinal AMD — Ön İşleme Mikro-Benchmark'ı
+===========================================
+"pil" (torchvision) ve "cv2" (vektörel cv2/NumPy + önceden ayrılmış batch
+tamponu) ön işleme arka uçlarını tek görüntü ve batch girişleri için
+görüntü başına maliyet açısından karşılaştırır; iki arka ucun çıktı farkını
+da raporlar. Veri verilmezse tipik OCT boyutlarında sentetik görüntüler
+kullanılır.
+
+Kullanım:
+    python -m scripts.bench_preprocessing
+    python -m scripts.bench_preprocessing --data OCT2017/test --limit 64 --batch-size 16
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+import torch
+from PIL import Image
+
+from utils.preprocessing import (
+    DEFAULT_NUM_WORKERS, PinnedBatchBuffer, decode_image, preprocess_images,
+)
+from scripts.batch_score import collect_paths
+
+# Sentetik görüntü boyutları (G x Y) — farklı cihazların B-scan çıktıları
+SYNTHETIC_SIZES = [(512, 496), (768, 496), (1024, 512), (384, 496)]
+
+
+def _synthetic_images(count: int) -> List[Image.Image]:
+    """Yumuşak dokulu (gerçekçi yeniden örnekleme maliyeti için) sentetik görüntüler."""
+    rng = np.random.default_rng(0)
+    images = []
+    for i in range(count):
+        w, h = SYNTHETIC_SIZES[i % len(SYNTHETIC_SIZES)]
+        coarse = Image.fromarray(rng.integers(0, 256, (h // 16, w // 16), dtype=np.uint8))
+        images.append(coarse.resize((w, h), Image.BICUBIC).convert("RGB"))
+    return images
+
+
+def _per_image_us(fn: Callable[[], None], n_images: int, repeats: int) -> float:
+    """Medyan çağrı süresinden görüntü başına maliyet (µs); ilk çağrı ısınma için atılır."""
+    fn()
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) / n_images * 1e6
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="PIL ve cv2 ön işleme arka uçlarını karşılaştırır.")
+    parser.add_argument("--data", nargs="*", default=[], help="Görüntüler / dizinler (boşsa sentetik)")
+    parser.add_argument("--limit", type=int, default=32, help="En fazla bu kadar görüntü kullan")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=DEFAULT_NUM_WORKERS,
+                        help="Batch ön işleme iş parçacığı sayısı")
+    parser.add_argument("--repeats", type=int, default=20)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    cpu = torch.device("cpu")
+
+    if args.data:
+        images = [decode_image(p) for p in collect_paths(args.data)[:args.limit]]
+    else:
+        images = _synthetic_images(args.limit)
+    if not images:
+        print("❌ Görüntü bulunamadı.", file=sys.stderr)
+        return 1
+
+    batch = images[:args.batch_size]
+    buffer = PinnedBatchBuffer(len(batch))
+    single_buffer = PinnedBatchBuffer(1)
+
+    # Çıktı eşdeğerliği (aynı geometri, farklı yeniden örnekleme çekirdekleri)
+    ref, _ = preprocess_images(batch, cpu, backend="pil")
+    out, _ = preprocess_images(batch, cpu, backend="cv2", buffer=buffer)
+    diff = (ref - out).abs()
+    print(f"{len(batch)} görüntü — PIL/cv2 çıktı farkı: ortalama {diff.mean().item():.5f} · "
+          f"maks. {diff.max().item():.5f} (normalize birimde)")
+
+    cases = {
+        "Tek görüntü": (
+            lambda: preprocess_images(batch[:1], cpu, num_workers=1, backend="pil"),
+            lambda: preprocess_images(batch[:1], cpu, num_workers=1, backend="cv2", buffer=single_buffer),
+            1,
+        ),
+        f"Batch {len(batch)} (1 iş parçacığı)": (
+            lambda: preprocess_images(batch, cpu, num_workers=1, backend="pil"),
+            lambda: preprocess_images(batch, cpu, num_workers=1, backend="cv2", buffer=buffer),
+            len(batch),
+        ),
+        f"Batch {len(batch)} ({args.workers} iş parçacığı)": (
+            lambda: preprocess_images(batch, cpu, num_workers=args.workers, backend="pil"),
+            lambda: preprocess_images(batch, cpu, num_workers=args.workers, backend="cv2", buffer=buffer),
+            len(batch),
+        ),
+    }
+
+    print(f"\n{'Durum':<28}{'pil (µs/görüntü)':>20}{'cv2 (µs/görüntü)':>20}{'hızlanma':>12}")
+    for name, (pil_fn, cv2_fn, n) in cases.items():
+        pil_us = _per_image_us(pil_fn, n, args.repeats)
+        cv2_us = _per_image_us(cv2_fn, n, args.repeats)
+        print(f"{name:<28}{pil_us:>20.0f}{cv2_us:>20.0f}{pil_us / cv2_us:>11.2f}×")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
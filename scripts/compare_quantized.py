@@ -0,0 +1,118 @@
+"""
+Retinal AMD — FP32 / INT8 Karşılaştırması
+===========================================
+FP32 `sota_99acc.pth` modeli ile INT8 nicemlenmiş varyantı aynı OCT seti
+üzerinde doğruluk, tahmin uyumu, olasılık farkı ve CPU gecikmesi açısından
+karşılaştırır. Veri dizini sınıf alt klasörleri içeriyorsa
+(ör. test/CNV/*.jpeg, test/NORMAL/*.jpeg) etiketli doğruluk da hesaplanır.
+
+Kullanım:
+    python -m scripts.compare_quantized --data OCT2017/test --limit 400
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+from PIL import Image
+
+from models.builders import QUANTIZED_MODELS, StagedClassifier, build_model, get_classes, get_base_model_type
+from utils.preprocessing import preprocess_images
+from scripts.batch_score import collect_paths
+
+
+def _predict(model: torch.nn.Module, paths: List[str], batch_size: int) -> np.ndarray:
+    """Görüntülerin softmax olasılıklarını [N, C] dizisi olarak döndürür."""
+    outputs = []
+    with torch.no_grad():
+        for start in range(0, len(paths), batch_size):
+            images = [Image.open(p) for p in paths[start:start + batch_size]]
+            batch = preprocess_images(images, torch.device("cpu"))[0]
+            outputs.append(torch.softmax(model(batch), dim=1).numpy())
+    return np.concatenate(outputs)
+
+
+def _latency_ms(model: torch.nn.Module, batch: torch.Tensor, repeats: int) -> float:
+    """Medyan forward gecikmesi (ms); ilk çağrı ısınma için atılır."""
+    timings = []
+    with torch.no_grad():
+        model(batch)
+        for _ in range(repeats):
+            started = time.perf_counter()
+            model(batch)
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="FP32 ve INT8 modellerini karşılaştırır.")
+    parser.add_argument("--model", default="efficientnet_b4_int8", choices=sorted(QUANTIZED_MODELS))
+    parser.add_argument("--data", nargs="+", required=True, help="Değerlendirme görüntüleri / dizinleri")
+    parser.add_argument("--limit", type=int, default=0, help="En fazla bu kadar görüntü kullan (0 = hepsi)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=20, help="Gecikme ölçümü tekrar sayısı")
+    parser.add_argument("--threads", type=int, default=0, help="torch iş parçacığı sayısı (0 = varsayılan)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    paths = collect_paths(args.data)
+    if args.limit:
+        paths = paths[:args.limit]
+    if not paths:
+        print("❌ Değerlendirme görüntüsü bulunamadı.", file=sys.stderr)
+        return 1
+
+    base_type = get_base_model_type(args.model)
+    fp32, is_demo, message = build_model(base_type, "cpu", prefer_torchscript=False)
+    print(message, file=sys.stderr)
+    int8, _, message = build_model(args.model, "cpu")
+    print(message, file=sys.stderr)
+    if not isinstance(int8, StagedClassifier):
+        print("❌ INT8 artefaktı yüklenemedi; önce `python -m scripts.quantize_int8` çalıştırın.",
+              file=sys.stderr)
+        return 1
+    if is_demo:
+        print("⚠️ Demo modu — FP32 ağırlıkları yüklenmedi, doğruluk anlamsızdır.", file=sys.stderr)
+
+    class_names = get_classes(base_type)
+    probs_fp32 = _predict(fp32, paths, args.batch_size)
+    probs_int8 = _predict(int8, paths, args.batch_size)
+    pred_fp32, pred_int8 = probs_fp32.argmax(1), probs_int8.argmax(1)
+
+    # Üst klasör adı sınıf ismiyse etiket olarak kullan
+    labels = [os.path.basename(os.path.dirname(p)).upper() for p in paths]
+    labeled = [i for i, lbl in enumerate(labels) if lbl in class_names]
+    y = np.array([class_names.index(labels[i]) for i in labeled])
+
+    single = torch.randn(1, 3, 224, 224)
+    batch = torch.randn(args.batch_size, 3, 224, 224)
+    rows: Dict[str, List[str]] = {"": ["FP32", "INT8"]}
+    if labeled:
+        rows["Doğruluk"] = [f"%{(pred[labeled] == y).mean() * 100:.2f}" for pred in (pred_fp32, pred_int8)]
+    lat_single = [_latency_ms(m, single, args.repeats) for m in (fp32, int8)]
+    lat_batch = [_latency_ms(m, batch, max(3, args.repeats // 4)) for m in (fp32, int8)]
+    rows["Gecikme (1 görüntü)"] = [f"{v:.1f} ms" for v in lat_single]
+    rows[f"Verim (batch {args.batch_size})"] = [f"{args.batch_size / v * 1000:.1f} görüntü/sn" for v in lat_batch]
+
+    print(f"\n{len(paths)} görüntü ({len(labeled)} etiketli)")
+    for name, values in rows.items():
+        print(f"{name:<26}{values[0]:>18}{values[1]:>18}")
+    print(f"\nTahmin uyumu: %{(pred_fp32 == pred_int8).mean() * 100:.2f}")
+    diff = np.abs(probs_fp32 - probs_int8)
+    print(f"Olasılık farkı — ortalama: {diff.mean():.4f} · maks.: {diff.max():.4f}")
+    print(f"Hızlanma (1 görüntü): {lat_single[0] / lat_single[1]:.2f}×")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Retinal AMD — ONNX Dışa Aktarımı
+==================================
+Eğitilmiş .pth ağırlıklarından ONNX Runtime arka ucu için .onnx artefaktı
+üretir; olasılıkların ve Grad-CAM haritalarının PyTorch yolu ile tolerans
+içinde aynı olduğunu doğrular ve CPU gecikmesini karşılaştırır.
+
+Kullanım:
+    python -m scripts.export_onnx
+    python -m scripts.export_onnx --model swin_v2 --images ornek_taramalar/
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Optional, Sequence
+
+import numpy as np
+import torch
+from PIL import Image
+
+from models.builders import MODEL_OPTIONS, build_model, split_model, get_onnx_path
+from models.onnx_backend import OnnxSession, export_onnx
+from utils.gradcam import HeadGradCAM, OnnxGradCAM
+from utils.preprocessing import preprocess_images
+from scripts.batch_score import collect_paths
+
+
+def _time_call(fn, batch: torch.Tensor, repeats: int = 5) -> float:
+    """Ortalama çağrı süresini (sn) ölçer; ilk çağrı ısınma için atılır."""
+    fn(batch)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn(batch)
+    return (time.perf_counter() - started) / repeats
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="ONNX artefaktı üretir ve PyTorch ile karşılaştırır.")
+    parser.add_argument("--model", default="efficientnet_b4", choices=sorted(set(MODEL_OPTIONS.values())))
+    parser.add_argument("--output", help="Artefakt yolu (varsayılan: ağırlık dosyasının yanı)")
+    parser.add_argument("--images", nargs="*", default=[],
+                        help="Doğrulamada kullanılacak gerçek OCT görüntüleri / dizinleri")
+    parser.add_argument("--samples", type=int, default=8, help="Rastgele doğrulama girişi sayısı")
+    parser.add_argument("--atol", type=float, default=1e-4, help="Olasılıklarda izin verilen maksimum fark")
+    parser.add_argument("--cam-atol", type=float, default=1e-3, help="Isı haritalarında izin verilen maksimum fark")
+    parser.add_argument("--allow-demo", action="store_true",
+                        help="Ağırlık dosyası yoksa rastgele ağırlıklarla dışa aktarmaya izin ver")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    output = args.output or get_onnx_path(args.model)
+
+    model, is_demo, message = build_model(args.model, "cpu", prefer_torchscript=False)
+    print(message, file=sys.stderr)
+    if is_demo and not args.allow_demo:
+        print("❌ Ağırlık dosyası yüklenemedi; dışa aktarım iptal edildi.", file=sys.stderr)
+        return 1
+
+    tmp_path = output + ".tmp"
+    export_onnx(*split_model(model, args.model), tmp_path)
+
+    torch_explainer = HeadGradCAM(*split_model(model, args.model))
+    onnx_explainer = OnnxGradCAM(OnnxSession(tmp_path))
+
+    batches = [torch.randn(args.samples, 3, 224, 224)]
+    paths = collect_paths(args.images)
+    if paths:
+        batches.append(preprocess_images([Image.open(p) for p in paths], torch.device("cpu"))[0])
+
+    max_prob_diff = max_cam_diff = 0.0
+    argmax_mismatch = 0
+    for batch in batches:
+        _, ref_probs, ref_cams = torch_explainer.predict_batch(batch)
+        _, probs, cams = onnx_explainer.predict_batch(batch)
+        max_prob_diff = max(max_prob_diff, float(np.abs(ref_probs - probs).max()))
+        max_cam_diff = max(max_cam_diff, float(np.abs(ref_cams - cams).max()))
+        argmax_mismatch += int((ref_probs.argmax(1) != probs.argmax(1)).sum())
+
+    print(f"Maks. olasılık farkı: {max_prob_diff:.3e} · maks. Grad-CAM farkı: {max_cam_diff:.3e} · "
+          f"argmax uyuşmazlığı: {argmax_mismatch}", file=sys.stderr)
+    if max_prob_diff > args.atol or max_cam_diff > args.cam_atol or argmax_mismatch:
+        os.remove(tmp_path)
+        print("❌ Eşdeğerlik doğrulaması başarısız; artefakt yazılmadı.", file=sys.stderr)
+        return 1
+
+    os.replace(tmp_path, output)
+
+    single = batches[0][:1]
+    print(f"Tek görüntü (tahmin + Grad-CAM) — PyTorch: {_time_call(torch_explainer.predict, single) * 1000:.1f} ms · "
+          f"ONNX Runtime: {_time_call(onnx_explainer.predict, single) * 1000:.1f} ms", file=sys.stderr)
+    print(f"✅ Artefakt yazıldı: {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Retinal AMD — TorchScript Dışa Aktarımı
+=========================================
+Eğitilmiş .pth ağırlıklarından dondurulmuş (BatchNorm katlanmış) TorchScript
+artefaktı üretir ve eager model ile sayısal eşdeğerliğini doğrular.
+Artefakt ağırlık dosyasının yanına yazılır; `models.build_model` (ve dolayısıyla
+`load_model`) mevcut olduğunda onu tercih eder.
+
+Kullanım:
+    python -m scripts.export_torchscript
+    python -m scripts.export_torchscript --images ornek_taramalar/ --atol 1e-4
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Optional, Sequence
+
+import torch
+import torch.nn.functional as F
+from PIL import Image
+
+from models.builders import (
+    MODEL_OPTIONS, build_model, export_torchscript, load_torchscript, get_torchscript_path,
+)
+from utils.preprocessing import preprocess_images
+from scripts.batch_score import collect_paths
+
+
+def _time_forward(model: torch.nn.Module, batch: torch.Tensor, repeats: int = 5) -> float:
+    """Ortalama forward süresini (sn) ölçer; ilk çağrı ısınma için atılır."""
+    with torch.no_grad():
+        model(batch)
+        started = time.perf_counter()
+        for _ in range(repeats):
+            model(batch)
+    return (time.perf_counter() - started) / repeats
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Dondurulmuş TorchScript artefaktı üretir ve doğrular.")
+    parser.add_argument("--model", default="efficientnet_b4", choices=sorted(set(MODEL_OPTIONS.values())))
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--output", help="Artefakt yolu (varsayılan: ağırlık dosyasının yanı)")
+    parser.add_argument("--images", nargs="*", default=[],
+                        help="Doğrulamada kullanılacak gerçek OCT görüntüleri / dizinleri")
+    parser.add_argument("--samples", type=int, default=8, help="Rastgele doğrulama girişi sayısı")
+    parser.add_argument("--atol", type=float, default=1e-4, help="Olasılıklarda izin verilen maksimum fark")
+    parser.add_argument("--allow-demo", action="store_true",
+                        help="Ağırlık dosyası yoksa rastgele ağırlıklarla dışa aktarmaya izin ver")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    device = torch.device(args.device)
+    output = args.output or get_torchscript_path(args.model)
+
+    started = time.perf_counter()
+    eager, is_demo, message = build_model(args.model, str(device), prefer_torchscript=False)
+    eager_load = time.perf_counter() - started
+    print(message, file=sys.stderr)
+    if is_demo and not args.allow_demo:
+        print("❌ Ağırlık dosyası yüklenemedi; dışa aktarım iptal edildi.", file=sys.stderr)
+        return 1
+
+    tmp_path = output + ".tmp"
+    export_torchscript(eager, args.model, tmp_path)
+
+    started = time.perf_counter()
+    frozen = load_torchscript(tmp_path, device)
+    frozen_load = time.perf_counter() - started
+
+    # Doğrulama girişleri: rastgele tensörler + (varsa) gerçek görüntüler
+    batches = [torch.randn(args.samples, 3, 224, 224, device=device)]
+    paths = collect_paths(args.images)
+    if paths:
+        images = [Image.open(p) for p in paths]
+        batches.append(preprocess_images(images, device)[0])
+
+    max_logit_diff = max_prob_diff = 0.0
+    argmax_mismatch = 0
+    with torch.no_grad():
+        for batch in batches:
+            ref, out = eager(batch), frozen(batch)
+            max_logit_diff = max(max_logit_diff, (ref - out).abs().max().item())
+            max_prob_diff = max(max_prob_diff, (F.softmax(ref, 1) - F.softmax(out, 1)).abs().max().item())
+            argmax_mismatch += int((ref.argmax(1) != out.argmax(1)).sum().item())
+
+    print(f"Maks. logit farkı: {max_logit_diff:.3e} · maks. olasılık farkı: {max_prob_diff:.3e} · "
+          f"argmax uyuşmazlığı: {argmax_mismatch}", file=sys.stderr)
+    if max_prob_diff > args.atol or argmax_mismatch:
+        os.remove(tmp_path)
+        print(f"❌ Eşdeğerlik doğrulaması başarısız (atol={args.atol}); artefakt yazılmadı.", file=sys.stderr)
+        return 1
+
+    os.replace(tmp_path, output)
+
+    latency_batch = batches[0][:1]
+    print(f"Yükleme süresi — eager: {eager_load:.2f} sn · TorchScript: {frozen_load:.2f} sn", file=sys.stderr)
+    print(f"Tek görüntü gecikmesi — eager: {_time_forward(eager, latency_batch) * 1000:.1f} ms · "
+          f"TorchScript: {_time_forward(frozen, latency_batch) * 1000:.1f} ms", file=sys.stderr)
+    print(f"✅ Artefakt yazıldı: {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Retinal AMD — Görüntü Taşıma
+==============================
+Eski analiz satırlarındaki base64 görüntüleri (`original_image_b64`,
+`gradcam_image_b64`) içerik adresli görüntü deposuna taşır ve satırlara
+yalnızca anahtarı yazar. Bağlantı ve depo ayarları
+`.streamlit/secrets.toml` içindeki `[supabase]` ve `[storage]`
+bölümlerinden okunur. Yarıda kesilirse tekrar çalıştırılabilir.
+
+Kullanım:
+    python -m scripts.migrate_images
+    python -m scripts.migrate_images --batch-size 100 --limit 1000
+"""
+
+import argparse
+import sys
+from typing import Optional, Sequence
+
+from utils.database import migrate_inline_images
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Satır içi analiz görüntülerini görüntü deposuna taşır.")
+    parser.add_argument("--batch-size", type=int, default=50, help="Tek sorguda işlenecek satır sayısı")
+    parser.add_argument("--limit", type=int, default=None, help="En fazla bu kadar satır taşı")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    try:
+        stats = migrate_inline_images(batch_size=args.batch_size, limit=args.limit)
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    print(f"✅ {stats['migrated']} satır taşındı · satırlardan {stats['freed_bytes'] / 1e6:.1f} MB "
+          f"base64 kaldırıldı", file=sys.stderr)
+    if stats["failed"]:
+        print(f"⚠️ {stats['failed']} satır taşınamadı; tekrar çalıştırın.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Retinal AMD — INT8 Nicemlenmiş Model Üretimi
+==============================================
+Bir OCT kalibrasyon setiyle eğitim sonrası statik nicemleme yapar ve
+sonucu `load_model("efficientnet_b4_int8", ...)` tarafından yüklenen
+TorchScript artefaktı olarak ağırlık dosyasının yanına yazar.
+
+Kullanım:
+    python -m scripts.quantize_int8 --calibration kalibrasyon_taramalari/ --num-images 256
+"""
+
+import argparse
+import random
+import sys
+from typing import Iterator, List, Optional, Sequence
+
+import torch
+from PIL import Image
+
+from models.builders import QUANTIZED_MODELS, build_model, export_torchscript, get_int8_path, get_base_model_type
+from models.quantization import quantize_static, get_quantization_engine
+from utils.preprocessing import preprocess_images
+from scripts.batch_score import collect_paths
+
+
+def iter_calibration_batches(paths: List[str], batch_size: int) -> Iterator[torch.Tensor]:
+    """Kalibrasyon görüntülerini batch'ler halinde ön işleyerek üretir."""
+    for start in range(0, len(paths), batch_size):
+        images = [Image.open(p) for p in paths[start:start + batch_size]]
+        yield preprocess_images(images, torch.device("cpu"))[0]
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Kalibrasyonlu INT8 statik nicemleme.")
+    parser.add_argument("--model", default="efficientnet_b4_int8", choices=sorted(QUANTIZED_MODELS))
+    parser.add_argument("--calibration", nargs="+", required=True,
+                        help="Kalibrasyon OCT görüntüleri / dizinleri")
+    parser.add_argument("--num-images", type=int, default=256, help="Kullanılacak kalibrasyon görüntüsü sayısı")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--engine", default=None, help="x86 / fbgemm / qnnpack (varsayılan: otomatik)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--allow-demo", action="store_true",
+                        help="Ağırlık dosyası yoksa rastgele ağırlıklarla nicemlemeye izin ver")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+
+    paths = collect_paths(args.calibration)
+    if not paths:
+        print("❌ Kalibrasyon görüntüsü bulunamadı.", file=sys.stderr)
+        return 1
+    random.Random(args.seed).shuffle(paths)
+    paths = paths[:args.num_images]
+
+    base_type = get_base_model_type(args.model)
+    model, is_demo, message = build_model(base_type, "cpu", prefer_torchscript=False)
+    print(message, file=sys.stderr)
+    if is_demo and not args.allow_demo:
+        print("❌ Ağırlık dosyası yüklenemedi; nicemleme iptal edildi.", file=sys.stderr)
+        return 1
+
+    engine = args.engine or get_quantization_engine()
+    print(f"{len(paths)} kalibrasyon görüntüsü · motor: {engine}", file=sys.stderr)
+    quantized = quantize_static(model, base_type, iter_calibration_batches(paths, args.batch_size), engine)
+
+    output = get_int8_path(args.model)
+    export_torchscript(quantized, base_type, output)
+    print(f"✅ INT8 artefaktı yazıldı: {output}", file=sys.stderr)
+    print("Doğruluk/gecikme karşılaştırması için: python -m scripts.compare_quantized --data <dizin>",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+İçerik adresli görüntü deposu (LocalBlobStore) gidiş-dönüşü.
+"""
+
+import os
+
+import pytest
+
+from utils.blob_store import BlobStore, LocalBlobStore, content_key
+
+
+def test_blob_store_is_abstract():
+    with pytest.raises(TypeError):
+        BlobStore()
+
+
+def test_local_round_trip_deduplicates(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    data = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+
+    key = store.put(data)
+    assert store.put(data) == key == content_key(data)
+    assert store.get(key) == data
+
+    stored = [name for _, _, files in os.walk(tmp_path) for name in files]
+    assert stored == [key]
+
+
+def test_local_distinct_content_gets_distinct_keys(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    assert store.put(b"a") != store.put(b"b")
+    assert store.put(b"a", extension="jpg").endswith(".jpg")
+
+
+def test_local_get_missing_key_returns_none(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    assert store.get(content_key(b"yok")) is None
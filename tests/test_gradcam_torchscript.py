@@ -0,0 +1,132 @@
+"""
+Dışa aktarılmış (TorchScript) modellerde Grad-CAM giriş noktaları.
+
+Dondurulmuş özellik çıkarıcıya hook kaydedilemez; hook tabanlı yardımcıların
+analitik moda (HeadGradCAM) geçmesi ve eager modelle aynı sonucu vermesi
+beklenir.
+"""
+
+import numpy as np
+import pytest
+import torch
+import torch.nn as nn
+
+from models.builders import StagedClassifier, export_torchscript, get_target_layer, load_torchscript, split_model
+from utils.gradcam import (
+    GradCAM,
+    HeadGradCAM,
+    generate_gradcam,
+    get_gradcam,
+    predict_and_explain,
+    predict_and_explain_all,
+    predict_and_explain_batch,
+)
+
+MODEL_TYPE = "efficientnet_b4"
+NUM_CLASSES = 4
+
+
+class _TinyEfficientNet(nn.Module):
+    """EfficientNet-B4 ile aynı features → avgpool → classifier[1][-1] düzenine sahip küçük model."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.features = nn.Sequential(
+            nn.Conv2d(3, 8, 3, stride=4, padding=1),
+            nn.BatchNorm2d(8),
+            nn.ReLU(),
+            nn.Conv2d(8, 16, 3, stride=2, padding=1),
+            nn.ReLU(),
+        )
+        self.avgpool = nn.AdaptiveAvgPool2d(1)
+        self.classifier = nn.Sequential(
+            nn.Dropout(0.2),
+            nn.Sequential(nn.Dropout(0.2), nn.Linear(16, NUM_CLASSES)),
+        )
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.classifier(torch.flatten(self.avgpool(self.features(x)), 1))
+
+
+@pytest.fixture(scope="module")
+def models(tmp_path_factory):
+    torch.manual_seed(0)
+    eager = _TinyEfficientNet().eval()
+    path = str(tmp_path_factory.mktemp("export") / "model.pt")
+    export_torchscript(eager, MODEL_TYPE, path)
+    traced = load_torchscript(path, torch.device("cpu"))
+    return eager, traced
+
+
+@pytest.fixture(scope="module")
+def inputs():
+    torch.manual_seed(1)
+    return torch.randn(3, 3, 224, 224)
+
+
+def test_loaded_artifact_is_script_module(models):
+    _, traced = models
+    assert isinstance(traced, StagedClassifier)
+    assert isinstance(get_target_layer(traced, MODEL_TYPE), torch.jit.ScriptModule)
+
+
+def test_generate_gradcam(models, inputs):
+    eager, traced = models
+    x = inputs[:1]
+    expected = HeadGradCAM(*split_model(eager, MODEL_TYPE)).predict(x, 2)[2]
+    heatmap = generate_gradcam(traced, x, 2, get_target_layer(traced, MODEL_TYPE))
+    assert heatmap.shape == (224, 224)
+    np.testing.assert_allclose(heatmap, expected, atol=1e-4)
+
+
+def test_predict_and_explain(models, inputs):
+    eager, traced = models
+    x = inputs[:1]
+    expected = HeadGradCAM(*split_model(eager, MODEL_TYPE)).predict(x)
+    result = predict_and_explain(traced, x, get_target_layer(traced, MODEL_TYPE))
+    for got, want in zip(result, expected):
+        np.testing.assert_allclose(got, want, atol=1e-4)
+
+
+def test_predict_and_explain_all(models, inputs):
+    eager, traced = models
+    x = inputs[:1]
+    expected = HeadGradCAM(*split_model(eager, MODEL_TYPE)).predict_all(x)
+    result = predict_and_explain_all(traced, x, get_target_layer(traced, MODEL_TYPE))
+    assert result[2].shape == (NUM_CLASSES, 224, 224)
+    for got, want in zip(result, expected):
+        np.testing.assert_allclose(got, want, atol=1e-4)
+
+
+def test_predict_and_explain_batch(models, inputs):
+    eager, traced = models
+    expected = HeadGradCAM(*split_model(eager, MODEL_TYPE)).predict_batch(inputs)
+    result = predict_and_explain_batch(traced, inputs, get_target_layer(traced, MODEL_TYPE))
+    assert result[2].shape == (len(inputs), 224, 224)
+    for got, want in zip(result, expected):
+        np.testing.assert_allclose(got, want, atol=1e-4)
+
+
+def test_head_split_entry_points(models, inputs):
+    _, traced = models
+    explainer = HeadGradCAM(*split_model(traced, MODEL_TYPE))
+    assert explainer.predict(inputs[:1])[2].shape == (224, 224)
+    assert explainer.predict_all(inputs[:1])[2].shape == (NUM_CLASSES, 224, 224)
+    assert explainer.predict_batch(inputs)[2].shape == (len(inputs), 224, 224)
+    assert explainer.predict_all_batch(inputs, raw=True)[2].shape[:2] == (len(inputs), NUM_CLASSES)
+
+
+def test_hook_based_gradcam_rejects_script_module(models):
+    _, traced = models
+    target_layer = get_target_layer(traced, MODEL_TYPE)
+    with pytest.raises(TypeError):
+        GradCAM(traced, target_layer)
+    with pytest.raises(TypeError):
+        get_gradcam(traced, target_layer)
+
+
+def test_script_target_without_head_raises(models, inputs):
+    _, traced = models
+    wrapper = nn.Sequential(traced.features)
+    with pytest.raises(TypeError):
+        predict_and_explain(wrapper, inputs[:1], traced.features)
@@ -0,0 +1,146 @@
+"""
+Mikro-batch çıkarım zamanlayıcısı (MicroBatchScheduler).
+
+Eşzamanlı isteklerin toplama penceresinde tek batch'te birleştirilmesi,
+her sonucun doğru çağırana dönmesi, zaman aşımı ve açıklayıcı hatalarının
+Future'lara aktarılması sınanır.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pytest
+import torch
+
+from utils.inference_scheduler import FutureExplainer, MicroBatchScheduler
+
+NUM_CLASSES = 4
+
+
+class _FakeExplainer:
+    """Her görüntünün sabit değerini logitlere ve CAM ızgaralarına yansıtan açıklayıcı."""
+
+    def __init__(self, gate: Optional[threading.Event] = None, error: Optional[Exception] = None) -> None:
+        self.batch_sizes = []
+        self.gate = gate
+        self.error = error
+
+    def predict_all_batch(self, inputs: torch.Tensor, raw: bool = False):
+        if self.gate is not None:
+            self.gate.wait()
+        if self.error is not None:
+            raise self.error
+        self.batch_sizes.append(len(inputs))
+        values = inputs[:, 0, 0, 0].numpy()
+        logits = np.zeros((len(inputs), NUM_CLASSES), dtype=np.float32)
+        logits[:, 0] = values
+        probs = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+        grid = np.arange(49, dtype=np.float32).reshape(7, 7)
+        cams = np.broadcast_to(values[:, None, None, None] + grid, (len(inputs), NUM_CLASSES, 7, 7)).copy()
+        return logits, probs, cams
+
+
+def _image(value: float) -> torch.Tensor:
+    return torch.full((3, 8, 8), value)
+
+
+@pytest.fixture
+def make_scheduler():
+    schedulers = []
+
+    def make(explainer, **kwargs):
+        scheduler = MicroBatchScheduler(explainer, torch.device("cpu"), **kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.close(timeout=5)
+
+
+def test_future_explainer_is_abstract():
+    with pytest.raises(TypeError):
+        FutureExplainer()
+
+
+def test_concurrent_requests_are_batched_and_routed(make_scheduler):
+    explainer = _FakeExplainer()
+    scheduler = make_scheduler(explainer, max_batch_size=8, max_wait_ms=500)
+    barrier = threading.Barrier(8)
+
+    def call(value):
+        barrier.wait()
+        return value, scheduler.predict_all(_image(value).unsqueeze(0))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(call, [float(i) for i in range(8)]))
+
+    assert sum(explainer.batch_sizes) == 8
+    assert len(explainer.batch_sizes) < 8
+    for value, (logits, probs, heatmaps) in results:
+        assert logits[0] == value
+        assert probs.shape == (NUM_CLASSES,)
+        assert heatmaps.shape == (NUM_CLASSES, 224, 224)
+    assert scheduler.metrics()["requests"] == 8
+
+
+def test_batches_respect_max_batch_size(make_scheduler):
+    explainer = _FakeExplainer()
+    scheduler = make_scheduler(explainer, max_batch_size=3, max_wait_ms=200)
+
+    logits, _, heatmaps = scheduler.predict_batch(torch.stack([_image(float(i)) for i in range(7)]))
+
+    assert max(explainer.batch_sizes) <= 3
+    assert sum(explainer.batch_sizes) == 7
+    np.testing.assert_array_equal(logits[:, 0], np.arange(7, dtype=np.float32))
+    assert heatmaps.shape == (7, 224, 224)
+
+
+def test_requests_after_collect_window_form_new_batch(make_scheduler):
+    explainer = _FakeExplainer()
+    scheduler = make_scheduler(explainer, max_batch_size=8, max_wait_ms=0)
+
+    scheduler.predict_all(_image(1.0).unsqueeze(0))
+    scheduler.predict_all(_image(2.0).unsqueeze(0))
+
+    assert explainer.batch_sizes == [1, 1]
+    assert scheduler.metrics()["batches"] == 2
+
+
+def test_raw_requests_return_grids(make_scheduler):
+    scheduler = make_scheduler(_FakeExplainer(), max_wait_ms=0)
+    _, _, cams = scheduler.predict_all(_image(3.0).unsqueeze(0), raw=True)
+    assert cams.shape == (NUM_CLASSES, 7, 7)
+
+
+def test_explainer_error_propagates_to_every_future(make_scheduler):
+    gate = threading.Event()
+    scheduler = make_scheduler(_FakeExplainer(gate=gate, error=ValueError("bozuk girdi")),
+                               max_batch_size=4, max_wait_ms=200)
+
+    futures = [scheduler.submit(_image(float(i))) for i in range(3)]
+    gate.set()
+
+    for future in futures:
+        with pytest.raises(ValueError, match="bozuk girdi"):
+            future.result(timeout=5)
+    assert scheduler.metrics()["errors"] == 3
+
+
+def test_result_timeout_raises_runtime_error(make_scheduler):
+    gate = threading.Event()
+    scheduler = make_scheduler(_FakeExplainer(gate=gate), max_wait_ms=0, result_timeout=0.05)
+    try:
+        with pytest.raises(RuntimeError):
+            scheduler.predict_all(_image(1.0).unsqueeze(0))
+    finally:
+        gate.set()
+
+
+def test_submit_after_close_raises(make_scheduler):
+    scheduler = make_scheduler(_FakeExplainer(), max_wait_ms=0)
+    scheduler.close(timeout=5)
+    with pytest.raises(RuntimeError):
+        scheduler.submit(_image(1.0))
@@ -0,0 +1,29 @@
+"""
+get_transforms ile uygulamanın ön işleme yolunun (prepare_image) eşdeğerliği.
+"""
+
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+from utils.preprocessing import decode_image, get_transforms, prepare_image
+
+
+@pytest.mark.parametrize("size", [(224, 224), (640, 496), (512, 1024), (300, 250)])
+def test_get_transforms_matches_prepare_image(size):
+    rng = np.random.default_rng(0)
+    image = Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+
+    expected, _ = prepare_image(image)
+    result = get_transforms()(image)
+
+    assert result.shape == expected.shape == (3, 224, 224)
+    torch.testing.assert_close(result, expected, atol=1e-5, rtol=0)
+
+
+def test_get_transforms_matches_prepare_image_after_decode():
+    rng = np.random.default_rng(1)
+    image = decode_image(Image.fromarray(rng.integers(0, 256, (1024, 768), dtype=np.uint8)))
+
+    torch.testing.assert_close(get_transforms()(image), prepare_image(image)[0], atol=1e-5, rtol=0)
@@ -0,0 +1,70 @@
+"""
+Retinal AMD — Toplu Analiz Modülü
+===================================
+Bir ziyaret serisindeki birden fazla OCT görüntüsünü paralel ön işleme ve
+batch halinde tek forward pass ile analiz eden motor.
+Streamlit'e bağımlı değildir; hem arayüz hem de komut satırı araçları kullanır.
+"""
+
+import numpy as np
+import torch
+from PIL import Image
+from typing import Any, Dict, List, Sequence
+
+from utils.preprocessing import preprocess_images, PinnedBatchBuffer, DEFAULT_NUM_WORKERS
+from utils.gradcam import overlay_gradcam
+from utils.inference_scheduler import DEFAULT_MAX_BATCH_SIZE
+
+
+def analyze_images(
+    explainer: Any,
+    images: Sequence[Image.Image],
+    device: torch.device,
+    class_names: List[str],
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    num_workers: int = DEFAULT_NUM_WORKERS,
+    preprocess_backend: str = "pil",
+) -> List[Dict[str, Any]]:
+    """
+    N görüntüyü en fazla `max_batch_size` büyüklüğündeki batch'ler halinde
+    analiz eder; her batch paralel ön işlenir ve tek forward pass ile
+    olasılıklar ve Grad-CAM haritaları üretilir.
+
+    Args:
+        explainer: `predict_batch` metoduna sahip açıklayıcı
+                   (HeadGradCAM, OnnxGradCAM vb. — bkz. utils.gradcam)
+        images: PIL formatında giriş görüntüleri
+        device: Hedef hesaplama cihazı (CPU/CUDA)
+        class_names: Modelin sınıf isimleri (bkz. models.get_classes)
+        max_batch_size: Tek forward pass'teki maksimum görüntü sayısı
+        num_workers: Paralel ön işleme iş parçacığı sayısı
+        preprocess_backend: Ön işleme arka ucu ("pil" veya "cv2");
+                            "cv2" tüm batch'ler için tek bir tampon kullanır
+
+    Returns:
+        Giriş sırasıyla, her görüntü için sonuç sözlüklerinin listesi
+        (predicted_class, confidence, probabilities, display_image, heatmap, overlaid_image)
+    """
+    max_batch_size = max(1, int(max_batch_size))
+    results: List[Dict[str, Any]] = []
+    buffer = None
+    if preprocess_backend == "cv2" and images:
+        buffer = PinnedBatchBuffer(min(max_batch_size, len(images)))
+
+    for start in range(0, len(images), max_batch_size):
+        chunk = images[start:start + max_batch_size]
+        batch, display_images = preprocess_images(chunk, device, num_workers, preprocess_backend, buffer)
+        _, probs, heatmaps = explainer.predict_batch(batch)
+
+        for p, cam, display_image in zip(probs, heatmaps, display_images):
+            idx = int(np.argmax(p))
+            results.append({
+                "predicted_class": class_names[idx],
+                "confidence": float(p[idx]),
+                "probabilities": p.tolist(),
+                "display_image": display_image,
+                "heatmap": cam,
+                "overlaid_image": overlay_gradcam(display_image, cam),
+            })
+
+    return results
@@ -0,0 +1,164 @@
+"""
+Retinal AMD — İçerik Adresli Görüntü Deposu
+=============================================
+Analiz görüntülerini tablo satırları yerine bir nesne deposunda saklar.
+Her görüntü içeriğinin SHA-256 özetiyle anahtarlanır; aynı görüntü bir kez
+yazılır (tekilleştirme) ve satırlar yalnızca anahtarı tutar. İçerik
+değişmez olduğundan okunan görüntüler süresiz önbelleğe alınabilir.
+
+- SupabaseBlobStore: Supabase Storage kovası
+- LocalBlobStore: yerel dosya sistemi (geliştirme/test ve Supabase'siz kurulumlar)
+
+Streamlit'e bağımlı değildir.
+"""
+
+import abc
+import hashlib
+import os
+import threading
+from typing import Optional
+
+# Varsayılan Supabase Storage kovası
+DEFAULT_BUCKET = "analysis-images"
+
+
+def content_key(data: bytes, extension: str = "png") -> str:
+    """
+    Baytların içerik anahtarını üretir.
+
+    Args:
+        data: Saklanacak ham baytlar
+        extension: Dosya uzantısı
+
+    Returns:
+        `"<sha256>.<uzantı>"` biçiminde anahtar
+    """
+    return f"{hashlib.sha256(data).hexdigest()}.{extension}"
+
+
+def _object_path(key: str) -> str:
+    """Anahtarı iki karakterlik ön ek dizinine dağıtır: ab/abcdef….png"""
+    return f"{key[:2]}/{key}"
+
+
+def _is_not_found(error: Exception) -> bool:
+    """Supabase Storage hatasının "nesne bulunamadı" yanıtı olup olmadığını döndürür."""
+    details = error.args[0] if error.args and isinstance(error.args[0], dict) else {}
+    status = str(details.get("statusCode") or getattr(error, "status", "") or "")
+    message = str(details.get("message") or details.get("error") or error).lower()
+    return status == "404" or "not found" in message or "not_found" in message
+
+
+class BlobStore(abc.ABC):
+    """İçerik adresli depo arayüzü: `put(data) -> key`, `get(key) -> bytes`."""
+
+    @abc.abstractmethod
+    def put(self, data: bytes, extension: str = "png") -> str:
+        """
+        Baytları saklar; aynı içerik zaten varsa yeniden yazmaz.
+
+        Args:
+            data: Saklanacak ham baytlar
+            extension: Dosya uzantısı
+
+        Returns:
+            İçerik anahtarı (bkz. content_key)
+        """
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Anahtara karşılık gelen baytları okur.
+
+        Args:
+            key: put ile dönen içerik anahtarı
+
+        Returns:
+            Ham baytlar veya None (nesne yoksa)
+
+        Raises:
+            Exception: Depoya ulaşılamazsa (ağ, yetki vb.); geçici hatalar
+                       "bulunamadı" olarak bildirilmez
+        """
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Yerel dosya sistemi deposu. Yazma geçici dosya + `os.replace` ile
+    atomiktir; eşzamanlı oturumlar aynı içeriği güvenle yazabilir.
+
+    Attributes:
+        root: Nesnelerin saklandığı kök dizin
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *_object_path(key).split("/"))
+
+    def put(self, data: bytes, extension: str = "png") -> str:
+        key = content_key(data, extension)
+        path = self._path(key)
+        if os.path.exists(path):
+            return key
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Önce geçici dosyaya yaz, sonra atomik olarak yeniden adlandır
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return key
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class SupabaseBlobStore(BlobStore):
+    """
+    Supabase Storage deposu. Kova önceden oluşturulmalıdır (bkz. README).
+
+    Attributes:
+        bucket: Supabase Storage kova adı
+    """
+
+    def __init__(self, client, bucket: str = DEFAULT_BUCKET) -> None:
+        """
+        Args:
+            client: supabase Client nesnesi
+            bucket: Kova adı
+        """
+        self.bucket = bucket
+        self._bucket = client.storage.from_(bucket)
+
+    def put(self, data: bytes, extension: str = "png") -> str:
+        key = content_key(data, extension)
+        try:
+            self._bucket.upload(
+                _object_path(key), data,
+                file_options={"content-type": f"image/{extension}", "upsert": "false"},
+            )
+        except Exception as e:
+            # Aynı içerik daha önce yüklenmiş — tekilleştirme
+            message = str(e).lower()
+            if "exists" not in message and "duplicate" not in message and "409" not in message:
+                raise
+        return key
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self._bucket.download(_object_path(key))
+        except Exception as e:
+            # Yalnızca "nesne yok" yanıtı None'a çevrilir; diğer hatalar iletilir
+            if _is_not_found(e):
+                return None
+            raise
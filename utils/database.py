@@ -7,16 +7,45 @@ Streamlit Secrets ile bağlantı yönetimi.
 
 import base64
 import io
+import os
+import zlib
+import cv2
 import numpy as np
 from PIL import Image as PILImage
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple
 
 import streamlit as st
 
+from utils.gradcam import normalize_raw_cams, overlay_gradcam
+from utils.blob_store import BlobStore, LocalBlobStore, SupabaseBlobStore, DEFAULT_BUCKET
+from utils.query_cache import (
+    QueryCache, TagVersions, cached_read,
+    DEFAULT_TTL_SECONDS, DEFAULT_SESSION_TTL_SECONDS, DEFAULT_MAX_ENTRIES,
+)
+
 # Türkiye saat dilimi (GMT+3)
 TZ_TR = timezone(timedelta(hours=3))
 
+# Liste, trend ve sayaç görünümleri için yalnızca meta veri (görüntü/rapor yok)
+ANALYSIS_SUMMARY_COLUMNS = "id, patient_id, analysis_date, predicted_class, confidence, probabilities, model_name"
+# Görüntü ve rapor sütunları — yalnızca gösterildikleri anda okunur
+ANALYSIS_DETAIL_COLUMNS = (
+    "report_text, gradcam_cam, original_image_key, gradcam_image_key, "
+    "original_image_b64, gradcam_image_b64"
+)
+
+# Sayfalı sorguların varsayılan sayfa boyutları (sunucu tarafı limit)
+PATIENT_PAGE_SIZE = 20
+ANALYSIS_PAGE_SIZE = 20
+
+# Tüm eşleşen satırların sayfa sayfa okunduğu sorgularda (PostgREST `max_rows`
+# sınırına takılmamak için) sayfa boyutu
+SCAN_PAGE_SIZE = 500
+
+# Anahtar kümesi (keyset) imleci: sayfanın son satırının (sıralama değeri, id) çifti
+Cursor = Tuple[str, str]
+
 
 # ============================================================================
 # Supabase Bağlantısı
@@ -47,9 +76,139 @@ def is_db_available() -> bool:
     return client is not None
 
 
+@st.cache_resource
+def get_blob_store() -> Optional[BlobStore]:
+    """
+    Analiz görüntüleri için içerik adresli depoyu oluşturur. İsteğe bağlı
+    `[storage]` bölümü ile ayarlanır:
+    - backend = "supabase" (varsayılan): Supabase Storage, `bucket` kovası
+    - backend = "local": yerel dizin (`dir`, varsayılan `.cache/blobs`)
+    - backend = "inline": depo yok, görüntüler satırda base64 olarak saklanır
+
+    Returns:
+        BlobStore nesnesi veya None (inline / bağlantı yok)
+    """
+    try:
+        cfg = dict(st.secrets.get("storage", {}))
+    except Exception:
+        cfg = {}
+    backend = cfg.get("backend", "supabase")
+    if backend == "local":
+        return LocalBlobStore(cfg.get("dir", os.path.join(".cache", "blobs")))
+    if backend == "supabase":
+        client = init_supabase()
+        return SupabaseBlobStore(client, cfg.get("bucket", DEFAULT_BUCKET)) if client else None
+    return None
+
+
+# ============================================================================
+# Sorgu Önbelleği
+# ============================================================================
+def _query_cache_config() -> Dict:
+    try:
+        return dict(st.secrets.get("query_cache", {}))
+    except Exception:
+        return {}
+
+
+@st.cache_resource
+def load_query_cache() -> QueryCache:
+    """
+    Okuma sorguları için oturumlar arasında paylaşılan önbelleği oluşturur.
+    İsteğe bağlı `[query_cache]` bölümü ile ayarlanır: `ttl_seconds`
+    (paylaşılan katman), `session_ttl_seconds` (oturum katmanı),
+    `max_entries`; süre 0 ise ilgili katman kapalıdır.
+
+    Returns:
+        Paylaşılan QueryCache nesnesi
+    """
+    cfg = _query_cache_config()
+    return QueryCache(
+        TagVersions(),
+        ttl_seconds=float(cfg.get("ttl_seconds", DEFAULT_TTL_SECONDS)),
+        max_entries=int(cfg.get("max_entries", DEFAULT_MAX_ENTRIES)),
+    )
+
+
+def _session_query_cache(shared: QueryCache) -> Optional[QueryCache]:
+    """Oturuma özel katman (aynı etiket sürümleriyle); oturum dışında None."""
+    try:
+        cache = st.session_state.get("query_cache")
+        if cache is None or cache.versions is not shared.versions:
+            ttl = float(_query_cache_config().get("session_ttl_seconds", DEFAULT_SESSION_TTL_SECONDS))
+            cache = QueryCache(shared.versions, ttl_seconds=ttl, max_entries=256)
+            st.session_state["query_cache"] = cache
+        return cache
+    except Exception:
+        return None
+
+
+def _cached_read(key: tuple, tags: List[str], fetch):
+    """
+    Okuma sorgusunu oturum ve paylaşılan önbellek üzerinden çalıştırır
+    (bkz. cached_read). Satır içi base64 görüntü taşıyan eski analiz
+    satırları bellek şişirmemek için önbelleğe alınmaz (bkz. migrate_inline_images).
+    """
+    shared = load_query_cache()
+    return cached_read(key, tags, fetch, shared, _session_query_cache(shared), cacheable=_has_no_inline_images)
+
+
+def _has_no_inline_images(value) -> bool:
+    rows = value if isinstance(value, list) else [value]
+    return not any(
+        isinstance(row, dict) and (row.get("original_image_b64") or row.get("gradcam_image_b64"))
+        for row in rows
+    )
+
+
+def invalidate_queries(*tags: str) -> None:
+    """
+    Yazma işleminden sonra etiketleri taşıyan önbellekteki sorgu sonuçlarını
+    tüm oturumlarda geçersiz kılar.
+
+    Args:
+        *tags: "patients", "patient:<id>", "analyses:<hasta_id>" veya "analysis:<id>"
+    """
+    load_query_cache().versions.bump(tags)
+
+
 # ============================================================================
 # Görüntü Dönüşüm Yardımcıları
 # ============================================================================
+def image_to_png(np_image: np.ndarray, max_size: int = 224) -> bytes:
+    """
+    Numpy dizisindeki görüntüyü saklamak için küçültülmüş boyutta PNG'ye encode eder.
+
+    Args:
+        np_image: [H, W, 3] boyutunda uint8 numpy görüntü
+        max_size: Maksimum kenar uzunluğu (piksel)
+
+    Returns:
+        PNG baytları
+    """
+    img = PILImage.fromarray(np_image)
+    # Boyut küçültme — ön işleme zaten 224x224 ürettiyse ek yeniden örnekleme yapılmaz
+    if max(img.size) > max_size:
+        img.thumbnail((max_size, max_size), PILImage.LANCZOS)
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def png_to_image(data: bytes) -> np.ndarray:
+    """
+    PNG (veya PIL'in okuyabildiği herhangi bir biçim) baytlarını numpy dizisine dönüştürür.
+
+    Args:
+        data: Görüntü baytları
+
+    Returns:
+        [H, W, 3] boyutunda uint8 numpy dizisi
+    """
+    img = PILImage.open(io.BytesIO(data))
+    return np.array(img.convert("RGB"))
+
+
 def image_to_base64(np_image: np.ndarray, max_size: int = 224) -> str:
     """
     Numpy dizisindeki görüntüyü base64 string'e dönüştürür.
@@ -62,12 +221,7 @@ def image_to_base64(np_image: np.ndarray, max_size: int = 224) -> str:
     Returns:
         Base64 encode edilmiş PNG string
     """
-    img = PILImage.fromarray(np_image)
-    # Boyut küçültme
-    img.thumbnail((max_size, max_size), PILImage.LANCZOS)
-    buffer = io.BytesIO()
-    img.save(buffer, format="PNG", optimize=True)
-    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+    return base64.b64encode(image_to_png(np_image, max_size)).decode("utf-8")
 
 
 def base64_to_image(b64_str: str) -> np.ndarray:
@@ -80,9 +234,152 @@ def base64_to_image(b64_str: str) -> np.ndarray:
     Returns:
         [H, W, 3] boyutunda uint8 numpy dizisi
     """
-    img_bytes = base64.b64decode(b64_str)
-    img = PILImage.open(io.BytesIO(img_bytes))
-    return np.array(img.convert("RGB"))
+    return png_to_image(base64.b64decode(b64_str))
+
+
+def store_image(np_image: np.ndarray) -> Optional[str]:
+    """
+    Görüntüyü içerik adresli depoya yazar (aynı içerik bir kez saklanır).
+
+    Args:
+        np_image: [H, W, 3] boyutunda uint8 numpy görüntü
+
+    Returns:
+        İçerik anahtarı veya None (depo yoksa / yazılamadıysa — çağıran
+        satır içi base64'e döner)
+    """
+    store = get_blob_store()
+    if store is None:
+        return None
+    try:
+        return store.put(image_to_png(np_image))
+    except Exception:
+        return None
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def load_image(key: str) -> Optional[np.ndarray]:
+    """
+    Depodaki görüntüyü okur. Anahtar içerikten türetildiği için kayıt
+    değişmez; sonuç süresiz önbelleğe alınır. Başarısız okumalar hata olarak
+    fırlatılır ve önbelleğe alınmaz; depo geçici olarak erişilemezse sonraki
+    çalıştırmada yeniden denenir.
+
+    Args:
+        key: store_image ile dönen içerik anahtarı
+
+    Returns:
+        [H, W, 3] uint8 görüntü
+
+    Raises:
+        FileNotFoundError: Depo yapılandırılmamışsa veya nesne yoksa
+        Exception: Depo okunamazsa (bkz. BlobStore.get)
+    """
+    store = get_blob_store()
+    data = store.get(key) if store is not None else None
+    if not data:
+        raise FileNotFoundError(key)
+    return png_to_image(data)
+
+
+def get_analysis_image(analysis: Dict, kind: str = "original") -> Optional[np.ndarray]:
+    """
+    Analiz satırının görüntüsünü yalnızca istendiğinde okur: önce depo
+    anahtarı (`<kind>_image_key`), yoksa eski satır içi base64 sütunu.
+    Meta veri satırı verilirse görüntü sütunları o analiz için ayrıca okunur.
+
+    Args:
+        analysis: analyses tablosu satırı (tam veya meta veri)
+        kind: "original" veya "gradcam"
+
+    Returns:
+        [H, W, 3] uint8 görüntü veya None
+    """
+    analysis = with_analysis_details(analysis)
+    key = analysis.get(f"{kind}_image_key")
+    if key:
+        try:
+            return load_image(key)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            st.warning(f"⚠️ Görüntü deposuna şu an ulaşılamıyor; görüntü gösterilemedi: {e}")
+            return None
+    b64 = analysis.get(f"{kind}_image_b64")
+    return base64_to_image(b64) if b64 else None
+
+
+def cam_to_base64(cam: np.ndarray, max_size: int = 64) -> str:
+    """
+    Ham Grad-CAM ızgarasını kompakt metne dönüştürür: ReLU + 0-1 min-max
+    sonrası uint8'e nicemlenir, zlib ile sıkıştırılır ve `"HxW:<base64>"`
+    biçiminde kodlanır (7×7 ızgara ≈ 80 karakter). Min-max normalizasyonu
+    yeniden boyutlandırmadan bağımsız olduğundan, çözülen ızgaradan üretilen
+    ısı haritası nicemleme hatası dışında aynıdır.
+
+    Args:
+        cam: [h, w] ham CAM ızgarası veya normalize ısı haritası
+        max_size: Maksimum kenar uzunluğu; daha büyük haritalar küçültülür
+
+    Returns:
+        Kodlanmış CAM string'i
+    """
+    cam = np.maximum(np.asarray(cam, dtype=np.float32), 0)
+    h, w = cam.shape
+    if max(h, w) > max_size:
+        scale = max_size / max(h, w)
+        cam = cv2.resize(cam, (max(1, round(w * scale)), max(1, round(h * scale))),
+                         interpolation=cv2.INTER_AREA)
+        h, w = cam.shape
+    lo, hi = float(cam.min()), float(cam.max())
+    if hi > lo:
+        q = np.round((cam - lo) / (hi - lo) * 255).astype(np.uint8)
+    else:
+        q = np.zeros((h, w), dtype=np.uint8)
+    payload = base64.b64encode(zlib.compress(q.tobytes(), 9)).decode("utf-8")
+    return f"{h}x{w}:{payload}"
+
+
+def base64_to_cam(cam_str: str) -> np.ndarray:
+    """
+    cam_to_base64 ile kodlanmış ızgarayı çözer.
+
+    Args:
+        cam_str: `"HxW:<base64>"` biçiminde CAM string'i
+
+    Returns:
+        [h, w] boyutunda 0-1 float32 ızgara (bkz. utils.gradcam.normalize_raw_cams)
+    """
+    shape, payload = cam_str.split(":", 1)
+    h, w = (int(v) for v in shape.split("x"))
+    q = np.frombuffer(zlib.decompress(base64.b64decode(payload)), dtype=np.uint8)
+    return q.reshape(h, w).astype(np.float32) / 255.0
+
+
+def render_analysis_gradcam(
+    analysis: Dict,
+    alpha: float = 0.5,
+    colormap: int = cv2.COLORMAP_JET,
+) -> Optional[np.ndarray]:
+    """
+    Kayıtlı analizin Grad-CAM bindirmesini ham ızgara + orijinal görüntüden
+    istek anında üretir; eski kayıtlarda saklanan bindirme görüntüsüne döner.
+
+    Args:
+        analysis: analyses tablosu satırı
+        alpha: Bindirme oranı
+        colormap: OpenCV renk haritası (bkz. utils.gradcam.COLORMAPS)
+
+    Returns:
+        [H, W, 3] uint8 bindirme görüntüsü veya None
+    """
+    analysis = with_analysis_details(analysis)
+    if analysis.get("gradcam_cam"):
+        original = get_analysis_image(analysis, "original")
+        if original is not None:
+            heatmap = normalize_raw_cams(base64_to_cam(analysis["gradcam_cam"]))
+            return overlay_gradcam(original, heatmap, alpha, colormap)
+    return get_analysis_image(analysis, "gradcam")
 
 
 # ============================================================================
@@ -132,51 +429,111 @@ def add_patient(
 
     try:
         result = client.table("patients").insert(data).execute()
+        invalidate_queries("patients")
         return result.data[0] if result.data else None
     except Exception as e:
         st.error(f"Hasta eklenirken hata: {e}")
         return None
 
 
-def search_patients(query: str = "") -> List[Dict]:
+def _quote_filter_value(value: Any) -> str:
     """
-    Hasta arama — ad, soyad veya dosya no ile filtreleme.
+    Değeri PostgREST filtresinde çift tırnak içine alır. Ayrılmış karakterler
+    (`,` `(` `)` `.` `:`) tırnak içinde düz metin sayılır; `"` ve `\\`
+    ters eğik çizgiyle kaçırılır.
+    """
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def _keyset_filter(sort_column: str, cursor: Optional[Cursor], match: Optional[str] = None) -> Optional[str]:
+    """
+    Azalan (sort_column, id) sıralamasında imleçten sonraki satırları seçen
+    PostgREST `or` filtresini üretir: sort_column < değer veya eşit değerde
+    id < son id. `match` (virgülle ayrılmış `or` koşulları) verilirse her
+    dala eklenir; imleç yoksa yalnızca `match` döner.
+    """
+    if cursor is None:
+        return match
+    value, last_id = (_quote_filter_value(v) for v in cursor)
+    branches = [f"{sort_column}.lt.{value}", f"{sort_column}.eq.{value},id.lt.{last_id}"]
+    if match:
+        branches = [f"or({match}),{b}" for b in branches]
+    return ",".join(f"and({b})" for b in branches)
+
+
+def _split_page(rows: List[Dict], limit: int, sort_column: str) -> Tuple[List[Dict], Optional[Cursor]]:
+    """limit + 1 satırlık sonucu sayfaya ve sonraki sayfanın imlecine ayırır."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1][sort_column], rows[-1]["id"])
+
+
+def search_patients_page(
+    query: str = "",
+    cursor: Optional[Cursor] = None,
+    limit: int = PATIENT_PAGE_SIZE,
+) -> Tuple[List[Dict], Optional[Cursor]]:
+    """
+    Hasta arama — ad, soyad veya dosya no ile filtreleme, anahtar kümesi
+    sayfalamasıyla (created_at + id, yeniden eskiye). Yanıt boyutu tablo
+    büyüdükçe sabit kalır.
 
     Args:
-        query: Arama metni (boş ise tüm hastalar döner)
+        query: Arama metni (boş ise tüm hastalar)
+        cursor: Önceki sayfanın döndürdüğü imleç (None: ilk sayfa)
+        limit: Sayfa boyutu
 
     Returns:
-        Eşleşen hasta listesi
+        (hasta listesi, sonraki sayfanın imleci veya None) tuple'ı
     """
     client = init_supabase()
     if not client:
-        return []
+        return [], None
+
+    q = query.strip()
+    match = None
+    if q:
+        # Arama metni tırnaklanır; "Yılmaz, A" veya "12(3)" filtreyi bozmaz
+        pattern = _quote_filter_value(f"%{q}%")
+        match = f"ad.ilike.{pattern},soyad.ilike.{pattern},dosya_no.ilike.{pattern}"
+
+    def fetch():
+        request = client.table("patients").select("*")
+        condition = _keyset_filter("created_at", cursor, match)
+        if condition:
+            request = request.or_(condition)
+        result = (
+            request
+            .order("created_at", desc=True)
+            .order("id", desc=True)
+            .limit(limit + 1)
+            .execute()
+        )
+        return result.data or []
 
     try:
-        if query.strip():
-            q = query.strip()
-            result = (
-                client.table("patients")
-                .select("*")
-                .or_(
-                    f"ad.ilike.%{q}%,"
-                    f"soyad.ilike.%{q}%,"
-                    f"dosya_no.ilike.%{q}%"
-                )
-                .order("created_at", desc=True)
-                .execute()
-            )
-        else:
-            result = (
-                client.table("patients")
-                .select("*")
-                .order("created_at", desc=True)
-                .execute()
-            )
-        return result.data or []
+        rows = _cached_read(("search_patients", q, cursor, limit), ["patients"], fetch)
+        return _split_page(rows, limit, "created_at")
     except Exception as e:
         st.error(f"Hasta aranırken hata: {e}")
-        return []
+        return [], None
+
+
+def search_patients(query: str = "", limit: int = PATIENT_PAGE_SIZE) -> List[Dict]:
+    """
+    Hasta arama — ad, soyad veya dosya no ile filtreleme.
+
+    Args:
+        query: Arama metni (boş ise tüm hastalar)
+        limit: En fazla döndürülecek hasta (sonraki sayfalar için
+               search_patients_page kullanılır)
+
+    Returns:
+        Eşleşen hastaların ilk sayfası (yeniden eskiye)
+    """
+    return search_patients_page(query, limit=limit)[0]
 
 
 def get_patient(patient_id: str) -> Optional[Dict]:
@@ -185,15 +542,17 @@ def get_patient(patient_id: str) -> Optional[Dict]:
     if not client:
         return None
 
-    try:
-        result = (
+    def fetch():
+        return (
             client.table("patients")
             .select("*")
             .eq("id", patient_id)
             .single()
             .execute()
-        )
-        return result.data
+        ).data
+
+    try:
+        return _cached_read(("get_patient", patient_id), [f"patient:{patient_id}"], fetch)
     except Exception as e:
         st.error(f"Hasta bilgisi alınırken hata: {e}")
         return None
@@ -219,12 +578,26 @@ def update_patient(patient_id: str, **kwargs) -> Optional[Dict]:
             .eq("id", patient_id)
             .execute()
         )
+        invalidate_queries("patients", f"patient:{patient_id}")
         return result.data[0] if result.data else None
     except Exception as e:
         st.error(f"Hasta güncellenirken hata: {e}")
         return None
 
 
+def _patient_analysis_ids(client, patient_id: str) -> List[str]:
+    """Hastanın tüm analiz id'lerini id sırasıyla sayfa sayfa okur (`max_rows` sınırına takılmaz)."""
+    ids: List[str] = []
+    while True:
+        request = client.table("analyses").select("id").eq("patient_id", patient_id)
+        if ids:
+            request = request.gt("id", ids[-1])
+        rows = request.order("id").limit(SCAN_PAGE_SIZE).execute().data or []
+        if not rows:
+            return ids
+        ids.extend(row["id"] for row in rows)
+
+
 def delete_patient(patient_id: str) -> bool:
     """Hastayı ve ilişkili analizlerini siler."""
     client = init_supabase()
@@ -232,18 +605,18 @@ def delete_patient(patient_id: str) -> bool:
         return False
 
     try:
+        # Analizler kademeli (cascade) silinir; önbellekteki kayıtlarını
+        # geçersiz kılabilmek için id'leri silmeden önce okunur
+        analysis_ids = _patient_analysis_ids(client, patient_id)
         client.table("patients").delete().eq("id", patient_id).execute()
+        invalidate_queries("patients", f"patient:{patient_id}", f"analyses:{patient_id}",
+                           *(f"analysis:{aid}" for aid in analysis_ids))
         return True
     except Exception as e:
         st.error(f"Hasta silinirken hata: {e}")
         return False
 
 
-def get_all_patients() -> List[Dict]:
-    """Tüm hastaları listeler (selectbox için)."""
-    return search_patients("")
-
-
 # ============================================================================
 # Analiz CRUD Operasyonları
 # ============================================================================
@@ -256,6 +629,7 @@ def save_analysis(
     original_image: Optional[np.ndarray] = None,
     gradcam_image: Optional[np.ndarray] = None,
     report_text: Optional[str] = None,
+    gradcam_cam: Optional[np.ndarray] = None,
 ) -> Optional[Dict]:
     """
     Analiz sonucunu veritabanına kaydeder.
@@ -267,8 +641,11 @@ def save_analysis(
         probabilities: Sınıf olasılıkları listesi
         model_name: Kullanılan model adı
         original_image: Orijinal görüntü (numpy)
-        gradcam_image: Grad-CAM görüntüsü (numpy)
+        gradcam_image: Grad-CAM bindirme görüntüsü (numpy) — yalnızca
+                       gradcam_cam verilmezse saklanır
         report_text: Klinik rapor metni
+        gradcam_cam: Tahmin sınıfının ham CAM ızgarası; bindirme yerine
+                     kompakt olarak saklanır (bkz. cam_to_base64)
 
     Returns:
         Kaydedilen analiz verisi veya None
@@ -286,47 +663,158 @@ def save_analysis(
         "analysis_date": datetime.now(TZ_TR).isoformat(),
     }
 
-    if original_image is not None:
-        data["original_image_b64"] = image_to_base64(original_image)
-    if gradcam_image is not None:
-        data["gradcam_image_b64"] = image_to_base64(gradcam_image)
+    # Görüntüler depoya, satıra yalnızca içerik anahtarı (depo yoksa base64)
+    images = {"original": original_image}
+    if gradcam_cam is not None:
+        data["gradcam_cam"] = cam_to_base64(gradcam_cam)
+    else:
+        images["gradcam"] = gradcam_image
+    for kind, image in images.items():
+        if image is None:
+            continue
+        key = store_image(image)
+        if key:
+            data[f"{kind}_image_key"] = key
+        else:
+            data[f"{kind}_image_b64"] = image_to_base64(image)
     if report_text:
         data["report_text"] = report_text
 
     try:
         result = client.table("analyses").insert(data).execute()
+        invalidate_queries(f"analyses:{patient_id}")
         return result.data[0] if result.data else None
     except Exception as e:
         st.error(f"Analiz kaydedilirken hata: {e}")
         return None
 
 
-def get_patient_analyses(patient_id: str) -> List[Dict]:
+def get_patient_analyses_page(
+    patient_id: str,
+    cursor: Optional[Cursor] = None,
+    limit: int = ANALYSIS_PAGE_SIZE,
+    columns: str = ANALYSIS_SUMMARY_COLUMNS,
+) -> Tuple[List[Dict], Optional[Cursor]]:
     """
-    Hastanın tüm analizlerini kronolojik sırayla getirir.
+    Hastanın analizlerini anahtar kümesi sayfalamasıyla (analysis_date + id,
+    yeniden eskiye) getirir.
 
     Args:
         patient_id: Hasta UUID
+        cursor: Önceki sayfanın döndürdüğü imleç (None: ilk sayfa)
+        limit: Sayfa boyutu
+        columns: Seçilecek sütunlar (varsayılan: yalnızca meta veri)
 
     Returns:
-        Analiz listesi (yeniden eskiye sıralı)
+        (analiz listesi, sonraki sayfanın imleci veya None) tuple'ı
     """
     client = init_supabase()
     if not client:
-        return []
+        return [], None
 
-    try:
+    def fetch():
+        request = client.table("analyses").select(columns).eq("patient_id", patient_id)
+        condition = _keyset_filter("analysis_date", cursor)
+        if condition:
+            request = request.or_(condition)
         result = (
-            client.table("analyses")
-            .select("*")
-            .eq("patient_id", patient_id)
+            request
             .order("analysis_date", desc=True)
+            .order("id", desc=True)
+            .limit(limit + 1)
             .execute()
         )
         return result.data or []
+
+    try:
+        rows = _cached_read(("patient_analyses", patient_id, cursor, limit, columns),
+                            [f"analyses:{patient_id}"], fetch)
+        return _split_page(rows, limit, "analysis_date")
     except Exception as e:
         st.error(f"Analiz geçmişi alınırken hata: {e}")
-        return []
+        return [], None
+
+
+def get_patient_analyses(patient_id: str, limit: int = ANALYSIS_PAGE_SIZE) -> List[Dict]:
+    """
+    Hastanın en yeni `limit` analizini tüm sütunlarıyla kronolojik sırayla
+    getirir. Tüm geçmiş gerekiyorsa get_patient_analyses_page ile sayfalanmalıdır.
+
+    Args:
+        patient_id: Hasta UUID
+        limit: En fazla döndürülecek analiz
+
+    Returns:
+        Analiz listesi (yeniden eskiye sıralı)
+    """
+    return get_patient_analyses_page(patient_id, limit=limit, columns="*")[0]
+
+
+def get_patient_analysis_summaries(patient_id: str, limit: int = ANALYSIS_PAGE_SIZE) -> List[Dict]:
+    """
+    Hastanın son analizlerini yalnızca meta veriyle (ANALYSIS_SUMMARY_COLUMNS)
+    kronolojik sırayla getirir. Liste, trend ve seçim görünümleri için
+    get_patient_analyses yerine kullanılır; görüntüler ve rapor indirilmez.
+    Yalnızca en yeni `limit` analiz döner; tüm geçmiş için
+    get_patient_analyses_page kullanılmalıdır.
+
+    Args:
+        patient_id: Hasta UUID
+        limit: En fazla döndürülecek analiz
+
+    Returns:
+        Meta veri listesi (yeniden eskiye sıralı)
+    """
+    return get_patient_analyses_page(patient_id, limit=limit)[0]
+
+
+def get_analysis_details(analysis_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Verilen analizlerin meta veri + görüntü/rapor sütunlarını tek sorguda getirir.
+
+    Args:
+        analysis_ids: Analiz UUID listesi
+
+    Returns:
+        {analysis_id: satır} sözlüğü
+    """
+    client = init_supabase()
+    if not client or not analysis_ids:
+        return {}
+
+    ids = sorted(set(analysis_ids))
+
+    def fetch():
+        return (
+            client.table("analyses")
+            .select(f"{ANALYSIS_SUMMARY_COLUMNS}, {ANALYSIS_DETAIL_COLUMNS}")
+            .in_("id", ids)
+            .execute()
+        ).data or []
+
+    try:
+        rows = _cached_read(("analysis_details", tuple(ids)), [f"analysis:{i}" for i in ids], fetch)
+        return {row["id"]: row for row in rows}
+    except Exception as e:
+        st.error(f"Analiz ayrıntıları alınırken hata: {e}")
+        return {}
+
+
+def with_analysis_details(analysis: Dict) -> Dict:
+    """
+    Meta veri satırını görüntü/rapor sütunlarıyla tamamlar; satır zaten
+    tamsa (veya kaydedilmemişse) olduğu gibi döndürür.
+
+    Args:
+        analysis: analyses tablosu satırı
+
+    Returns:
+        Görüntü/rapor sütunlarını içeren satır
+    """
+    if "gradcam_cam" in analysis or not analysis.get("id"):
+        return analysis
+    detail = get_analysis_details([analysis["id"]]).get(analysis["id"])
+    return {**analysis, **detail} if detail else analysis
 
 
 def get_analysis(analysis_id: str) -> Optional[Dict]:
@@ -335,15 +823,17 @@ def get_analysis(analysis_id: str) -> Optional[Dict]:
     if not client:
         return None
 
-    try:
-        result = (
+    def fetch():
+        return (
             client.table("analyses")
             .select("*")
             .eq("id", analysis_id)
             .single()
             .execute()
-        )
-        return result.data
+        ).data
+
+    try:
+        return _cached_read(("get_analysis", analysis_id), [f"analysis:{analysis_id}"], fetch)
     except Exception as e:
         st.error(f"Analiz bilgisi alınırken hata: {e}")
         return None
@@ -355,13 +845,154 @@ def get_patient_analysis_count(patient_id: str) -> int:
     if not client:
         return 0
 
-    try:
-        result = (
+    def fetch():
+        return (
             client.table("analyses")
             .select("id", count="exact")
             .eq("patient_id", patient_id)
             .execute()
-        )
-        return result.count or 0
+        ).count or 0
+
+    try:
+        return _cached_read(("analysis_count", patient_id), [f"analyses:{patient_id}"], fetch)
     except Exception:
         return 0
+
+
+def _is_missing_function(error: Exception) -> bool:
+    """PostgREST'in "fonksiyon bulunamadı" (PGRST202) hatası ise True döner."""
+    code = getattr(error, "code", None)
+    return code == "PGRST202" or "Could not find the function" in str(error)
+
+
+def get_patient_analysis_stats(patient_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Birden çok hastanın analiz sayısını, son analiz tarihini ve son tanısını
+    tek sorguda döndürür; hasta listelerinde hasta başına sayım sorgusu yerine
+    kullanılır. Önce `patient_analysis_stats` veritabanı fonksiyonu (bkz. README)
+    çağrılır; tanımlı değilse analizler dar projeksiyonla anahtar kümesi
+    sayfalamasıyla okunup istemci tarafında gruplanır (PostgREST `max_rows`
+    sınırı sonuçları kesemez). Diğer hatalar gösterilir.
+
+    Args:
+        patient_ids: Hasta UUID listesi
+
+    Returns:
+        {patient_id: {"count", "last_analysis_date", "last_class"}} sözlüğü;
+        analizi olmayan hastalar için count=0
+    """
+    def empty_stats() -> Dict[str, Dict]:
+        return {pid: {"count": 0, "last_analysis_date": None, "last_class": None} for pid in patient_ids}
+
+    client = init_supabase()
+    if not client or not patient_ids:
+        return empty_stats()
+
+    def fetch():
+        stats = empty_stats()
+        try:
+            result = client.rpc("patient_analysis_stats", {"patient_ids": list(stats)}).execute()
+        except Exception as e:
+            if not _is_missing_function(e):
+                raise
+        else:
+            for row in result.data or []:
+                stats[row["patient_id"]] = {
+                    "count": row["analysis_count"],
+                    "last_analysis_date": row["last_analysis_date"],
+                    "last_class": row["last_class"],
+                }
+            return stats
+
+        # Satırlar yeniden eskiye sıralı: hastanın ilk satırı son analizidir.
+        # Boş sayfa gelene kadar okunur; sunucu sayfayı kısaltsa da satır atlanmaz.
+        cursor = None
+        while True:
+            request = (
+                client.table("analyses")
+                .select("id, patient_id, analysis_date, predicted_class")
+                .in_("patient_id", list(stats))
+            )
+            keyset = _keyset_filter("analysis_date", cursor)
+            if keyset:
+                request = request.or_(keyset)
+            rows = (
+                request.order("analysis_date", desc=True)
+                .order("id", desc=True)
+                .limit(SCAN_PAGE_SIZE)
+                .execute()
+            ).data or []
+            if not rows:
+                return stats
+            for row in rows:
+                entry = stats.get(row["patient_id"])
+                if entry is None:
+                    continue
+                if entry["count"] == 0:
+                    entry["last_analysis_date"] = row["analysis_date"]
+                    entry["last_class"] = row["predicted_class"]
+                entry["count"] += 1
+            cursor = (rows[-1]["analysis_date"], rows[-1]["id"])
+
+    try:
+        return _cached_read(("analysis_stats", tuple(patient_ids)),
+                            [f"analyses:{pid}" for pid in patient_ids], fetch)
+    except Exception as e:
+        st.error(f"Analiz istatistikleri alınırken hata: {e}")
+        return empty_stats()
+
+
+# ============================================================================
+# Görüntü Taşıma (satır içi base64 → içerik adresli depo)
+# ============================================================================
+def migrate_inline_images(batch_size: int = 50, limit: Optional[int] = None) -> Dict[str, int]:
+    """
+    Eski analiz satırlarındaki base64 görüntüleri depoya taşır: PNG baytları
+    olduğu gibi yüklenir (yeni kayıtlarla aynı anahtar → tekilleştirme),
+    satıra anahtar yazılır ve base64 sütunu boşaltılır. Yarıda kesilirse
+    tekrar çalıştırılabilir; taşınmış satırlar yeniden seçilmez.
+
+    Args:
+        batch_size: Tek sorguda işlenecek satır sayısı
+        limit: En fazla taşınacak satır (None → hepsi)
+
+    Returns:
+        migrated, failed ve freed_bytes (satırlardan kaldırılan base64 baytı) sayaçları
+    """
+    stats = {"migrated": 0, "failed": 0, "freed_bytes": 0}
+    client = init_supabase()
+    store = get_blob_store()
+    if not client or store is None:
+        raise RuntimeError("Taşıma için Supabase bağlantısı ve görüntü deposu gerekli.")
+
+    failed_ids: List[str] = []
+    while limit is None or stats["migrated"] < limit:
+        query = (
+            client.table("analyses")
+            .select("id, original_image_b64, gradcam_image_b64")
+            .or_("original_image_b64.not.is.null,gradcam_image_b64.not.is.null")
+        )
+        if failed_ids:
+            query = query.not_.in_("id", failed_ids)
+        rows = query.limit(batch_size).execute().data or []
+        if not rows:
+            break
+
+        for row in rows:
+            update: Dict[str, Any] = {}
+            try:
+                for kind in ("original", "gradcam"):
+                    b64 = row.get(f"{kind}_image_b64")
+                    if b64:
+                        update[f"{kind}_image_key"] = store.put(base64.b64decode(b64))
+                        update[f"{kind}_image_b64"] = None
+                        stats["freed_bytes"] += len(b64)
+                client.table("analyses").update(update).eq("id", row["id"]).execute()
+                invalidate_queries(f"analysis:{row['id']}")
+                stats["migrated"] += 1
+            except Exception:
+                failed_ids.append(row["id"])
+                stats["failed"] += 1
+            if limit is not None and stats["migrated"] >= limit:
+                break
+    return stats
@@ -1,61 +1,219 @@
 """
 Retinal AMD — Grad-CAM Modülü
 ===============================
-Hook tabanlı saf PyTorch Grad-CAM implementasyonu.
+Hook tabanlı saf PyTorch Grad-CAM implementasyonu ve backbone'a geri
+yayılım gerektirmeyen analitik (head ağırlıklı) hızlı mod.
 Harici kütüphane bağımlılığı yoktur (pytorch-grad-cam vb. kullanılmaz).
 """
 
+import threading
+
 import cv2
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 import numpy as np
-from typing import Optional
+from typing import Optional, Tuple
+
+
+def _normalize_cams(cams: torch.Tensor) -> np.ndarray:
+    """
+    Ham CAM haritalarını ReLU → 224×224 bilinear → harita başına 0-1 min-max
+    adımlarından geçirir.
+
+    Args:
+        cams: [N, 1, h, w] boyutunda ağırlıklı aktivasyon toplamları
+
+    Returns:
+        [N, 224, 224] boyutunda 0-1 normalize ısı haritaları (numpy)
+    """
+    # ReLU — sadece pozitif katkılar
+    cams = F.relu(cams)
+
+    # Giriş boyutuna yeniden boyutlandır
+    cams = F.interpolate(cams, size=(224, 224), mode="bilinear", align_corners=False)
+
+    # Her haritayı kendi içinde 0-1 arasında normalize et
+    cams = cams[:, 0].cpu().numpy()
+    c_min = cams.min(axis=(1, 2), keepdims=True)
+    c_max = cams.max(axis=(1, 2), keepdims=True)
+    positive = (c_max > 0).reshape(-1)
+    cams[positive] = (cams[positive] - c_min[positive]) / (c_max[positive] - c_min[positive])
+
+    return cams
+
+
+def _normalize_cam_grid(cams: torch.Tensor) -> np.ndarray:
+    """[N, C, h, w] ham haritaları [N, C, 224, 224] normalize ısı haritalarına dönüştürür."""
+    n, c, h, w = cams.shape
+    return _normalize_cams(cams.reshape(n * c, 1, h, w)).reshape(n, c, 224, 224)
+
+
+def normalize_raw_cams(cams: np.ndarray) -> np.ndarray:
+    """
+    `raw=True` ile alınan düşük çözünürlüklü ham CAM ızgaralarını normalize
+    ısı haritalarına dönüştürür (ReLU → 224×224 bilinear → 0-1 min-max).
+    Önbellekte ve veritabanında saklanan ızgaralar için kullanılır.
+
+    Args:
+        cams: [..., h, w] boyutunda ham CAM ızgaraları
+
+    Returns:
+        [..., 224, 224] boyutunda 0-1 normalize ısı haritaları
+    """
+    cams = np.asarray(cams, dtype=np.float32)
+    *lead, h, w = cams.shape
+    maps = _normalize_cams(torch.from_numpy(np.ascontiguousarray(cams)).reshape(-1, 1, h, w))
+    return maps.reshape(*lead, 224, 224)
+
+
+def _normalize_cam(cam: torch.Tensor) -> np.ndarray:
+    """
+    Tek bir ham CAM haritasını normalize eder (bkz. `_normalize_cams`).
+
+    Args:
+        cam: [1, 1, h, w] boyutunda ağırlıklı aktivasyon toplamı
+
+    Returns:
+        [224, 224] boyutunda 0-1 normalize ısı haritası (numpy)
+    """
+    return _normalize_cams(cam)[0]
+
+
+def _weighted_cams(activations: torch.Tensor, gradients: torch.Tensor) -> torch.Tensor:
+    """
+    Gradyanların GAP'ı ile ağırlıklandırılmış aktivasyon toplamlarını hesaplar.
+
+    Args:
+        activations: [1, C, H, W] (CNN) veya [1, N, C] (Transformer) aktivasyonlar
+        gradients: Aktivasyonlarla aynı boyutta gradyanlar; ilk eksen birden
+                   fazla hedef sınıf için genişletilebilir ([K, ...])
+
+    Returns:
+        [K, 1, h, w] boyutunda ham CAM haritaları
+    """
+    # Global Average Pooling — gradyanlar üzerinde
+    weights = gradients.mean(dim=[2, 3] if gradients.dim() == 4 else [-1], keepdim=True)
+
+    # Ağırlıklı toplam — aktivasyonlar × ağırlıklar
+    if activations.dim() == 4:
+        # CNN tarzı çıktı: [B, C, H, W]
+        cam = (weights * activations).sum(dim=1, keepdim=True)
+    elif activations.dim() == 3:
+        # Transformer tarzı çıktı: [B, N, C]
+        cam = (weights * activations).sum(dim=-1, keepdim=True)
+        # Token dizisini 2D haritaya dönüştür
+        num_tokens = cam.shape[1]
+        h = w = int(num_tokens ** 0.5)
+        if h * w != num_tokens:
+            # CLS token varsa veya boyut uyuşmuyorsa en yakın kareyi al
+            h = w = int(np.ceil(num_tokens ** 0.5))
+            cam = cam[:, :h * w, :]
+        cam = cam.reshape(cam.shape[0], 1, h, w)
+
+    return cam
 
 
 class GradCAM:
     """
     Hook tabanlı Gradient-weighted Class Activation Mapping (Grad-CAM).
 
-    register_forward_hook ve register_full_backward_hook kullanarak
-    hedef katmandan aktivasyon ve gradyan bilgisi yakalar, ardından
-    sınıfa özgü ısı haritası üretir.
+    Hedef katmana tek bir forward hook kaydederek aktivasyonu yakalar;
+    gradyanlar backward hook ve `.backward()` yerine doğrudan bu çağrının
+    aktivasyon tensörüne göre `torch.autograd.grad` ile alınır ve autograd
+    grafiği hemen serbest bırakılır.
+
+    Nesne model ömrü boyunca yaşayacak şekilde tasarlanmıştır
+    (bkz. `get_gradcam`): hook bir kez kaydedilir, model bir kez eval moduna
+    alınır. Aynı (st.cache_resource ile paylaşılan) model üzerinde eşzamanlı
+    analizler güvenlidir:
+    - Çağrı durumu (aktivasyon, gradyan) iş parçacığına özeldir; hook
+      yalnızca o iş parçacığında bir Grad-CAM çağrısı sürerken kayıt yapar.
+    - `.backward()` / `zero_grad()` kullanılmadığından paylaşılan modelin
+      parametre `.grad` alanlarına hiç yazılmaz.
 
     Attributes:
         model: PyTorch modeli
         target_layer: Grad-CAM için hedef katman
-        activations: Forward pass'te yakalanan aktivasyonlar
-        gradients: Backward pass'te yakalanan gradyanlar
+        activations: Bu iş parçacığının son çağrısında yakalanan aktivasyonlar
+        gradients: Bu iş parçacığının son hesapladığı hedef sınıf gradyanları
     """
 
     def __init__(self, model: nn.Module, target_layer: nn.Module) -> None:
         """
-        GradCAM nesnesini oluşturur ve hook'ları kaydeder.
+        GradCAM nesnesini oluşturur ve hook'u kaydeder.
 
         Args:
-            model: Değerlendirme modundaki PyTorch modeli
-            target_layer: Aktivasyon ve gradyan yakalanacak katman
+            model: PyTorch modeli
+            target_layer: Aktivasyon yakalanacak katman
+
+        Raises:
+            TypeError: Hedef katman bir TorchScript modülüyse (hook desteklenmez;
+                       bkz. HeadGradCAM)
         """
-        self.model = model
+        if isinstance(target_layer, torch.jit.ScriptModule):
+            raise TypeError(
+                "Hook tabanlı Grad-CAM TorchScript modüllerinde çalışmaz; "
+                "dışa aktarılmış modeller için HeadGradCAM kullanın."
+            )
+        self.model = model.eval()
         self.target_layer = target_layer
-        self.activations: Optional[torch.Tensor] = None
-        self.gradients: Optional[torch.Tensor] = None
+        self._local = threading.local()
 
-        # Hook'ları kaydet
+        # Hook'u kaydet
         self._forward_hook = target_layer.register_forward_hook(self._save_activation)
-        self._backward_hook = target_layer.register_full_backward_hook(self._save_gradient)
 
-    def _save_activation(self, module: nn.Module, input: tuple, output: torch.Tensor) -> None:
-        """Forward hook: Aktivasyonları yakala ve kaydet."""
-        self.activations = output.detach()
+    @property
+    def activations(self) -> Optional[torch.Tensor]:
+        return getattr(self._local, "activations", None)
 
-    def _save_gradient(self, module: nn.Module, grad_input: tuple, grad_output: tuple) -> None:
-        """Backward hook: Gradyanları yakala ve kaydet."""
-        self.gradients = grad_output[0].detach()
+    @property
+    def gradients(self) -> Optional[torch.Tensor]:
+        return getattr(self._local, "gradients", None)
 
-    def generate(self, input_tensor: torch.Tensor, target_class: Optional[int] = None) -> np.ndarray:
+    @property
+    def _activation_output(self) -> Optional[torch.Tensor]:
+        return getattr(self._local, "activation_output", None)
+
+    def _save_activation(self, module: nn.Module, input: tuple, output: torch.Tensor) -> None:
+        """Forward hook: Yalnızca bu iş parçacığında süren Grad-CAM çağrısının aktivasyonlarını kaydet."""
+        if not getattr(self._local, "active", False):
+            return
+        self._local.activations = output.detach()
+        # Gradyanlar bu düğüme göre alınır (autograd.grad)
+        self._local.activation_output = output
+
+    def _forward(self, input_tensor: torch.Tensor) -> torch.Tensor:
+        """Gradyan grafiği açık forward; çağıranın tensörü değiştirilmez."""
+        self._local.activations = None
+        self._local.activation_output = None
+        self._local.gradients = None
+        self._local.active = True
+        try:
+            with torch.enable_grad():
+                return self.model(input_tensor.detach().requires_grad_(True))
+        finally:
+            self._local.active = False
+
+    def _gradients(self, output: torch.Tensor, grad_outputs: torch.Tensor, batched: bool = False) -> torch.Tensor:
+        """Çıktıdan bu çağrının hedef katman aktivasyonuna vector-Jacobian çarpımı."""
+        (gradients,) = torch.autograd.grad(
+            output, self._activation_output, grad_outputs=grad_outputs, is_grads_batched=batched,
+        )
+        # Grafiğe tutunan referansı bırak — retain_graph yok, grafik hemen serbest kalır
+        self._local.activation_output = None
+        return gradients
+
+    def predict(
+        self,
+        input_tensor: torch.Tensor,
+        target_class: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        Verilen giriş tensörü için Grad-CAM ısı haritası üretir.
+        Tek forward pass ile tahmin ve Grad-CAM ısı haritasını birlikte üretir.
+
+        Softmax olasılıkları, Grad-CAM için zaten yapılan forward pass'in
+        çıktısından hesaplanır; ayrı bir `torch.no_grad()` çıkarımına gerek kalmaz.
 
         Args:
             input_tensor: [1, 3, H, W] boyutunda giriş tensörü
@@ -63,65 +221,394 @@ class GradCAM:
                           olasılıklı sınıf kullanılır.
 
         Returns:
-            [H, W] boyutunda 0-1 arasında normalize edilmiş ısı haritası (numpy)
+            (logits, probabilities, heatmap) tuple'ı — [C], [C] ve [H, W] numpy dizileri
         """
-        # Gradyan hesaplaması için requires_grad aktifleştir
-        input_tensor = input_tensor.requires_grad_(True)
+        output = self._forward(input_tensor)
 
-        # Forward pass
-        self.model.eval()
-        output = self.model(input_tensor)
+        # Olasılıklar aynı çıktıdan — ikinci bir forward pass yok
+        logits = output.detach()
+        probs = F.softmax(logits, dim=1)
 
         # Hedef sınıfı belirle
         if target_class is None:
-            target_class = output.argmax(dim=1).item()
+            target_class = logits.argmax(dim=1).item()
+
+        if self._activation_output is not None:
+            # Hedef sınıfın skoruna göre gradyan
+            grad_outputs = torch.zeros_like(output)
+            grad_outputs[0, target_class] = 1.0
+            self._local.gradients = self._gradients(output, grad_outputs)
+
+        cam = self._compute_cam()
+        return logits[0].cpu().numpy(), probs[0].cpu().numpy(), cam
+
+    def predict_all(self, input_tensor: torch.Tensor) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Tek forward pass ile tahmin ve tüm sınıfların Grad-CAM ısı haritalarını üretir.
+
+        Sınıf başına ayrı backward yerine, birim vektörlerle batched bir
+        vector-Jacobian çarpımı (`is_grads_batched=True`) ile tüm sınıf
+        skorlarının hedef katmana göre gradyanları tek seferde alınır.
 
-        # Backward pass — hedef sınıfın skoruna göre
-        self.model.zero_grad()
-        target_score = output[0, target_class]
-        target_score.backward(retain_graph=True)
+        Args:
+            input_tensor: [1, 3, H, W] boyutunda giriş tensörü
 
+        Returns:
+            (logits, probabilities, heatmaps) tuple'ı — [C], [C] ve [C, 224, 224] numpy dizileri
+        """
+        output = self._forward(input_tensor)
+        logits = output.detach()
+        probs = F.softmax(logits, dim=1)
+
+        if self._activation_output is None:
+            # Hook çalışmadıysa boş haritalar döndür
+            empty = np.zeros((output.shape[1], 224, 224), dtype=np.float32)
+            return logits[0].cpu().numpy(), probs[0].cpu().numpy(), empty
+
+        # [C, 1, C] birim vektörler → her sınıf skoru için bir VJP
+        num_classes = output.shape[1]
+        grad_outputs = torch.eye(num_classes, dtype=output.dtype, device=output.device).unsqueeze(1)
+        gradients = self._gradients(output, grad_outputs, batched=True)
+
+        cams = _normalize_cams(_weighted_cams(self.activations, gradients[:, 0]))
+        return logits[0].cpu().numpy(), probs[0].cpu().numpy(), cams
+
+    def predict_batch(self, input_tensor: torch.Tensor) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        [N, 3, H, W] batch için tek forward/backward ile tahmin ve her görüntünün
+        kendi tahmin sınıfına ait Grad-CAM ısı haritasını üretir.
+
+        Eval modunda örnekler birbirinden bağımsız olduğundan, hedef skorların
+        toplamının gradyanı her örnek için kendi skorunun gradyanına eşittir.
+
+        Args:
+            input_tensor: [N, 3, H, W] boyutunda giriş tensörü
+
+        Returns:
+            (logits, probabilities, heatmaps) tuple'ı — [N, C], [N, C] ve [N, 224, 224] numpy dizileri
+        """
+        output = self._forward(input_tensor)
+        logits = output.detach()
+        probs = F.softmax(logits, dim=1)
+        targets = logits.argmax(dim=1)
+
+        if self._activation_output is None:
+            # Hook çalışmadıysa boş haritalar döndür
+            empty = np.zeros((output.shape[0], 224, 224), dtype=np.float32)
+            return logits.cpu().numpy(), probs.cpu().numpy(), empty
+
+        # Her örneğin kendi tahmin sınıfı skoru için birim vektör
+        grad_outputs = F.one_hot(targets, output.shape[1]).to(output.dtype)
+        self._local.gradients = self._gradients(output, grad_outputs)
+
+        cams = _normalize_cams(_weighted_cams(self.activations, self.gradients))
+        return logits.cpu().numpy(), probs.cpu().numpy(), cams
+
+    def generate(self, input_tensor: torch.Tensor, target_class: Optional[int] = None) -> np.ndarray:
+        """
+        Verilen giriş tensörü için Grad-CAM ısı haritası üretir.
+
+        Args:
+            input_tensor: [1, 3, H, W] boyutunda giriş tensörü
+            target_class: Hedef sınıf indeksi. None ise en yüksek
+                          olasılıklı sınıf kullanılır.
+
+        Returns:
+            [H, W] boyutunda 0-1 arasında normalize edilmiş ısı haritası (numpy)
+        """
+        _, _, cam = self.predict(input_tensor, target_class)
+        return cam
+
+    def _compute_cam(self) -> np.ndarray:
+        """Yakalanan aktivasyon ve gradyanlardan normalize ısı haritasını hesaplar."""
         # Grad-CAM hesapla
         if self.gradients is None or self.activations is None:
             # Hook'lar çalışmadıysa boş harita döndür
             return np.zeros((224, 224), dtype=np.float32)
 
-        # Global Average Pooling — gradyanlar üzerinde
-        weights = self.gradients.mean(dim=[2, 3] if self.gradients.dim() == 4 else [-1], keepdim=True)
-
-        # Ağırlıklı toplam — aktivasyonlar × ağırlıklar
-        if self.activations.dim() == 4:
-            # CNN tarzı çıktı: [B, C, H, W]
-            cam = (weights * self.activations).sum(dim=1, keepdim=True)
-        elif self.activations.dim() == 3:
-            # Transformer tarzı çıktı: [B, N, C]
-            cam = (weights * self.activations).sum(dim=-1, keepdim=True)
-            # Token dizisini 2D haritaya dönüştür
-            num_tokens = cam.shape[1]
-            h = w = int(num_tokens ** 0.5)
-            if h * w != num_tokens:
-                # CLS token varsa veya boyut uyuşmuyorsa en yakın kareyi al
-                h = w = int(np.ceil(num_tokens ** 0.5))
-                cam = cam[:, :h * w, :]
-            cam = cam.reshape(1, 1, h, w)
-
-        # ReLU — sadece pozitif katkılar
-        cam = F.relu(cam)
-
-        # Giriş boyutuna yeniden boyutlandır
-        cam = F.interpolate(cam, size=(224, 224), mode="bilinear", align_corners=False)
-
-        # 0-1 arasında normalize et
-        cam = cam.squeeze().cpu().numpy()
-        if cam.max() > 0:
-            cam = (cam - cam.min()) / (cam.max() - cam.min())
-
-        return cam
+        return _normalize_cam(_weighted_cams(self.activations, self.gradients))
 
     def remove_hooks(self) -> None:
-        """Kayıtlı hook'ları temizle (bellek sızıntısını önlemek için)."""
+        """Kayıtlı hook'u temizle (bellek sızıntısını önlemek için)."""
         self._forward_hook.remove()
-        self._backward_hook.remove()
+
+
+_GRADCAM_ATTR = "_persistent_gradcam"
+_gradcam_lock = threading.Lock()
+
+
+def get_gradcam(model: nn.Module, target_layer: nn.Module) -> GradCAM:
+    """
+    (model, hedef katman) çifti için kalıcı GradCAM nesnesini döndürür.
+
+    Nesne ilk çağrıda oluşturulup hedef katmanın üzerinde saklanır; sonraki
+    çağrılar hook kaydı/silme ve eval() tekrarı olmadan aynı nesneyi kullanır.
+    Katman serbest bırakıldığında nesne de onunla birlikte toplanır.
+
+    Args:
+        model: PyTorch modeli
+        target_layer: Grad-CAM hedef katmanı
+
+    Returns:
+        İş parçacığı güvenli, paylaşılabilir GradCAM nesnesi
+    """
+    with _gradcam_lock:
+        grad_cam = target_layer.__dict__.get(_GRADCAM_ATTR)
+        if grad_cam is None or grad_cam.model is not model:
+            if grad_cam is not None:
+                grad_cam.remove_hooks()
+            grad_cam = GradCAM(model, target_layer)
+            # nn.Module.__setattr__'ı atla — alt modül/parametre olarak kaydedilmesin
+            target_layer.__dict__[_GRADCAM_ATTR] = grad_cam
+        return grad_cam
+
+
+class HeadGradCAM:
+    """
+    Backbone'a geri yayılım yapmadan çalışan analitik Grad-CAM.
+
+    Hedef katman son özellik haritası olduğunda (EfficientNet-B4 için
+    `model.features[-1]`), sınıf skorunun gradyanı yalnızca global average
+    pooling ve doğrusal head'den geçer:
+
+        ∂y_c / ∂A_k(i, j) = W[c, k] / (h · w)
+
+    Dolayısıyla Grad-CAM kanal ağırlıkları doğrudan head ağırlık matrisinin
+    ilgili satırıdır. Isı haritası tek bir `torch.no_grad()` forward'ı ile
+    elde edilir; autograd grafiği hiç oluşturulmaz ve hook kaydı gerekmez.
+    Sabit 1/(h · w) ölçeği min-max normalizasyonunda yok olduğundan sonuç,
+    hook tabanlı `GradCAM` ile aynıdır.
+
+    Attributes:
+        features: [B, 3, H, W] → [B, C, h, w] özellik çıkarıcı modül
+        head: Havuzlanmış özelliklerden logit üreten nn.Linear katmanı
+    """
+
+    def __init__(self, features: nn.Module, head: nn.Linear) -> None:
+        """
+        Args:
+            features: Özellik çıkarıcı aşama (bkz. models.split_model)
+            head: Doğrusal sınıflandırıcı katman
+        """
+        self.features = features
+        self.head = head
+
+    @torch.no_grad()
+    def predict(
+        self,
+        input_tensor: torch.Tensor,
+        target_class: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Tek forward pass ile tahmin ve analitik Grad-CAM ısı haritası üretir.
+
+        Args:
+            input_tensor: [1, 3, H, W] boyutunda giriş tensörü
+            target_class: Hedef sınıf indeksi. None ise en yüksek
+                          olasılıklı sınıf kullanılır.
+
+        Returns:
+            (logits, probabilities, heatmap) tuple'ı — [C], [C] ve [224, 224] numpy dizileri
+        """
+        # Özellik haritası ve head — modelin kendi forward'ı ile birebir aynı
+        activations = self.features(input_tensor)                 # [1, K, h, w]
+        logits = self.head(activations.mean(dim=(2, 3)))          # [1, C]
+        probs = F.softmax(logits, dim=1)
+
+        # Hedef sınıfı belirle
+        if target_class is None:
+            target_class = logits.argmax(dim=1).item()
+
+        # Kanal ağırlıkları = head ağırlık satırı (kapalı form gradyan)
+        weights = self.head.weight[target_class].view(1, -1, 1, 1)
+        cam = (weights * activations).sum(dim=1, keepdim=True)
+
+        return logits[0].cpu().numpy(), probs[0].cpu().numpy(), _normalize_cam(cam)
+
+    @torch.no_grad()
+    def predict_all(self, input_tensor: torch.Tensor) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Tek forward pass ile tahmin ve tüm sınıfların analitik Grad-CAM haritalarını üretir.
+
+        Args:
+            input_tensor: [1, 3, H, W] boyutunda giriş tensörü
+
+        Returns:
+            (logits, probabilities, heatmaps) tuple'ı — [C], [C] ve [C, 224, 224] numpy dizileri
+        """
+        activations = self.features(input_tensor)                 # [1, K, h, w]
+        logits = self.head(activations.mean(dim=(2, 3)))          # [1, C]
+        probs = F.softmax(logits, dim=1)
+
+        # Tüm sınıfların haritaları: [C, K] × [K, h, w] → [C, h, w]
+        cams = torch.einsum("ck,khw->chw", self.head.weight, activations[0]).unsqueeze(1)
+
+        return logits[0].cpu().numpy(), probs[0].cpu().numpy(), _normalize_cams(cams)
+
+    @torch.no_grad()
+    def predict_batch(self, input_tensor: torch.Tensor) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        [N, 3, H, W] batch için tek forward ile tahmin ve her görüntünün kendi
+        tahmin sınıfına ait analitik Grad-CAM ısı haritasını üretir.
+
+        Args:
+            input_tensor: [N, 3, H, W] boyutunda giriş tensörü
+
+        Returns:
+            (logits, probabilities, heatmaps) tuple'ı — [N, C], [N, C] ve [N, 224, 224] numpy dizileri
+        """
+        activations = self.features(input_tensor)                 # [N, K, h, w]
+        logits = self.head(activations.mean(dim=(2, 3)))          # [N, C]
+        probs = F.softmax(logits, dim=1)
+
+        # Her örnek için kendi tahmin sınıfının head ağırlık satırı: [N, K]
+        weights = self.head.weight[logits.argmax(dim=1)]
+        cams = torch.einsum("nk,nkhw->nhw", weights, activations).unsqueeze(1)
+
+        return logits.cpu().numpy(), probs.cpu().numpy(), _normalize_cams(cams)
+
+    @torch.no_grad()
+    def predict_all_batch(
+        self,
+        input_tensor: torch.Tensor,
+        raw: bool = False,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        [N, 3, H, W] batch için tek forward ile tahmin ve her görüntünün tüm
+        sınıflara ait analitik Grad-CAM haritalarını üretir.
+
+        Args:
+            input_tensor: [N, 3, H, W] boyutunda giriş tensörü
+            raw: True ise haritalar yeniden boyutlandırılmadan ham ızgara olarak
+                 döndürülür (bkz. normalize_raw_cams)
+
+        Returns:
+            (logits, probabilities, heatmaps) tuple'ı — [N, C], [N, C] ve [N, C, 224, 224]
+            (raw=True ise [N, C, h, w]) numpy dizileri
+        """
+        activations = self.features(input_tensor)                 # [N, K, h, w]
+        logits = self.head(activations.mean(dim=(2, 3)))          # [N, C]
+        probs = F.softmax(logits, dim=1)
+
+        # [C, K] × [N, K, h, w] → [N, C, h, w]
+        cams = torch.einsum("ck,nkhw->nchw", self.head.weight, activations)
+
+        if raw:
+            return logits.cpu().numpy(), probs.cpu().numpy(), cams.float().cpu().numpy()
+        return logits.cpu().numpy(), probs.cpu().numpy(), _normalize_cam_grid(cams)
+
+
+class OnnxGradCAM:
+    """
+    ONNX Runtime arka ucu için Grad-CAM.
+
+    Dışa aktarılan ONNX grafiği logitlerle birlikte tüm sınıfların ham CAM
+    haritalarını (head ağırlıkları × özellik haritası) zaten üretir
+    (bkz. models.onnx_backend). Bu sınıf yalnızca ReLU/yeniden boyutlandırma/
+    normalizasyon adımlarını uygular ve HeadGradCAM ile aynı arayüzü sunar.
+
+    Attributes:
+        session: `run(input_tensor) -> (logits, cams)` metoduna sahip oturum
+    """
+
+    def __init__(self, session) -> None:
+        """
+        Args:
+            session: models.onnx_backend.OnnxSession nesnesi
+        """
+        self.session = session
+
+    def predict(
+        self,
+        input_tensor: torch.Tensor,
+        target_class: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Args:
+            input_tensor: [1, 3, H, W] boyutunda giriş tensörü
+            target_class: Hedef sınıf indeksi (None ise argmax)
+
+        Returns:
+            (logits, probabilities, heatmap) tuple'ı — [C], [C] ve [224, 224] numpy dizileri
+        """
+        logits, cams = self.session.run(input_tensor)
+        probs = F.softmax(logits, dim=1)
+        if target_class is None:
+            target_class = logits.argmax(dim=1).item()
+        cam = cams[:1, target_class:target_class + 1]
+        return logits[0].numpy(), probs[0].numpy(), _normalize_cam(cam)
+
+    def predict_all(self, input_tensor: torch.Tensor) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Args:
+            input_tensor: [1, 3, H, W] boyutunda giriş tensörü
+
+        Returns:
+            (logits, probabilities, heatmaps) tuple'ı — [C], [C] ve [C, 224, 224] numpy dizileri
+        """
+        logits, cams = self.session.run(input_tensor)
+        probs = F.softmax(logits, dim=1)
+        return logits[0].numpy(), probs[0].numpy(), _normalize_cams(cams[0].unsqueeze(1))
+
+    def predict_batch(self, input_tensor: torch.Tensor) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Args:
+            input_tensor: [N, 3, H, W] boyutunda giriş tensörü
+
+        Returns:
+            (logits, probabilities, heatmaps) tuple'ı — [N, C], [N, C] ve [N, 224, 224] numpy dizileri
+        """
+        logits, cams = self.session.run(input_tensor)
+        probs = F.softmax(logits, dim=1)
+        targets = logits.argmax(dim=1)
+        cams = cams[torch.arange(cams.shape[0]), targets].unsqueeze(1)
+        return logits.numpy(), probs.numpy(), _normalize_cams(cams)
+
+    def predict_all_batch(
+        self,
+        input_tensor: torch.Tensor,
+        raw: bool = False,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Args:
+            input_tensor: [N, 3, H, W] boyutunda giriş tensörü
+            raw: True ise ham CAM ızgaraları döndürülür (bkz. normalize_raw_cams)
+
+        Returns:
+            (logits, probabilities, heatmaps) tuple'ı — [N, C], [N, C] ve [N, C, 224, 224]
+            (raw=True ise [N, C, h, w]) numpy dizileri
+        """
+        logits, cams = self.session.run(input_tensor)
+        probs = F.softmax(logits, dim=1)
+        if raw:
+            return logits.numpy(), probs.numpy(), cams.float().numpy()
+        return logits.numpy(), probs.numpy(), _normalize_cam_grid(cams)
+
+
+def _resolve_head_split(
+    model: nn.Module,
+    target_layer: nn.Module,
+    head_split: Optional[Tuple[nn.Module, nn.Linear]],
+) -> Optional[Tuple[nn.Module, nn.Linear]]:
+    """
+    Analitik modda kullanılacak (features, head) çiftini döndürür.
+
+    Hedef katman hook kaydedilemeyen bir TorchScript modülü ise ve model
+    `features → GAP → head` zinciri ise (bkz. models.StagedClassifier)
+    `head_split` verilmese de analitik moda geçilir.
+
+    Raises:
+        TypeError: Hedef katman TorchScript modülü ama model bu zincire uymuyorsa
+    """
+    if head_split is not None or not isinstance(target_layer, torch.jit.ScriptModule):
+        return head_split
+    head = getattr(model, "head", None)
+    if getattr(model, "features", None) is target_layer and isinstance(head, nn.Linear):
+        return target_layer, head
+    raise TypeError(
+        "Hedef katman bir TorchScript modülü; hook tabanlı Grad-CAM kullanılamaz. "
+        "`head_split` (bkz. models.split_model) verin."
+    )
 
 
 def generate_gradcam(
@@ -131,7 +618,8 @@ def generate_gradcam(
     target_layer: nn.Module,
 ) -> np.ndarray:
     """
-    Model ve giriş tensörü için Grad-CAM ısı haritası üretir.
+    Model ve giriş tensörü için Grad-CAM ısı haritası üretir. Dışa aktarılmış
+    (TorchScript) modellerde analitik mod kullanılır.
 
     Args:
         model: PyTorch modeli (eval modunda)
@@ -142,19 +630,115 @@ def generate_gradcam(
     Returns:
         [224, 224] boyutunda 0-1 normalize ısı haritası
     """
-    grad_cam = GradCAM(model, target_layer)
-    try:
-        heatmap = grad_cam.generate(input_tensor, target_class)
-    finally:
-        # Hook'ları temizle
-        grad_cam.remove_hooks()
-    return heatmap
+    head_split = _resolve_head_split(model, target_layer, None)
+    if head_split is not None:
+        return HeadGradCAM(*head_split).predict(input_tensor, target_class)[2]
+
+    return get_gradcam(model, target_layer).generate(input_tensor, target_class)
+
+
+def predict_and_explain(
+    model: nn.Module,
+    input_tensor: torch.Tensor,
+    target_layer: nn.Module,
+    target_class: Optional[int] = None,
+    head_split: Optional[Tuple[nn.Module, nn.Linear]] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Tahmin (logit + softmax) ve Grad-CAM ısı haritasını tek forward pass ile üretir.
+
+    Ayrı bir `torch.no_grad()` çıkarımı ardından `generate_gradcam` çağırmak
+    yerine bu fonksiyon kullanılmalıdır; böylece her analizde bir tam
+    model forward'ı tasarruf edilir.
+
+    `head_split` verilirse (bkz. models.split_model) hızlı analitik mod
+    kullanılır: geri yayılım yapılmaz, autograd grafiği oluşturulmaz.
+    Dışa aktarılmış (TorchScript) modellerde bu mod kendiliğinden seçilir.
+
+    Args:
+        model: PyTorch modeli (eval modunda)
+        input_tensor: [1, 3, 224, 224] boyutunda giriş tensörü
+        target_layer: Grad-CAM hedef katmanı (hook tabanlı mod için)
+        target_class: Hedef sınıf indeksi (None ise argmax)
+        head_split: (features, head) tuple'ı — analitik mod için
+
+    Returns:
+        (logits, probabilities, heatmap) — [C], [C] ve [224, 224] numpy dizileri
+    """
+    head_split = _resolve_head_split(model, target_layer, head_split)
+    if head_split is not None:
+        return HeadGradCAM(*head_split).predict(input_tensor, target_class)
+
+    return get_gradcam(model, target_layer).predict(input_tensor, target_class)
+
+
+def predict_and_explain_all(
+    model: nn.Module,
+    input_tensor: torch.Tensor,
+    target_layer: nn.Module,
+    head_split: Optional[Tuple[nn.Module, nn.Linear]] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Tahmin ve modelin tüm sınıfları (CLASSES_V1 / CLASSES_V2 sırasıyla) için
+    Grad-CAM ısı haritalarını tek forward pass ile üretir. Arayüz, sınıflar
+    arasında geçiş yaparken modeli yeniden çalıştırmak zorunda kalmaz.
+
+    Args:
+        model: PyTorch modeli (eval modunda)
+        input_tensor: [1, 3, 224, 224] boyutunda giriş tensörü
+        target_layer: Grad-CAM hedef katmanı (hook tabanlı mod için)
+        head_split: (features, head) tuple'ı — analitik mod için
+
+    Returns:
+        (logits, probabilities, heatmaps) — [C], [C] ve [C, 224, 224] numpy dizileri
+    """
+    head_split = _resolve_head_split(model, target_layer, head_split)
+    if head_split is not None:
+        return HeadGradCAM(*head_split).predict_all(input_tensor)
+
+    return get_gradcam(model, target_layer).predict_all(input_tensor)
+
+
+def predict_and_explain_batch(
+    model: nn.Module,
+    input_tensor: torch.Tensor,
+    target_layer: nn.Module,
+    head_split: Optional[Tuple[nn.Module, nn.Linear]] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    [N, 3, 224, 224] batch için tahmin ve tahmin sınıfı Grad-CAM haritalarını
+    tek (batched) forward pass ile üretir.
+
+    Args:
+        model: PyTorch modeli (eval modunda)
+        input_tensor: [N, 3, 224, 224] boyutunda giriş tensörü
+        target_layer: Grad-CAM hedef katmanı (hook tabanlı mod için)
+        head_split: (features, head) tuple'ı — analitik mod için
+
+    Returns:
+        (logits, probabilities, heatmaps) — [N, C], [N, C] ve [N, 224, 224] numpy dizileri
+    """
+    head_split = _resolve_head_split(model, target_layer, head_split)
+    if head_split is not None:
+        return HeadGradCAM(*head_split).predict_batch(input_tensor)
+
+    return get_gradcam(model, target_layer).predict_batch(input_tensor)
+
+
+# Arayüzde seçilebilen renk haritaları
+COLORMAPS = {
+    "JET": cv2.COLORMAP_JET,
+    "TURBO": cv2.COLORMAP_TURBO,
+    "INFERNO": cv2.COLORMAP_INFERNO,
+    "VIRIDIS": cv2.COLORMAP_VIRIDIS,
+}
 
 
 def overlay_gradcam(
     original_image: np.ndarray,
     heatmap: np.ndarray,
     alpha: float = 0.5,
+    colormap: int = cv2.COLORMAP_JET,
 ) -> np.ndarray:
     """
     Grad-CAM ısı haritasını orijinal görüntü üzerine bindirir.
@@ -163,6 +747,7 @@ def overlay_gradcam(
         original_image: [H, W, 3] boyutunda uint8 RGB görüntü
         heatmap: [H, W] boyutunda 0-1 arasında normalize ısı haritası
         alpha: Bindirme oranı (0=sadece görüntü, 1=sadece ısı haritası)
+        colormap: OpenCV renk haritası (bkz. COLORMAPS)
 
     Returns:
         [H, W, 3] boyutunda bindirilmiş uint8 RGB görüntü
@@ -174,8 +759,8 @@ def overlay_gradcam(
     h, w = original_image.shape[:2]
     heatmap_resized = cv2.resize(heatmap_uint8, (w, h))
 
-    # JET colormap uygula (mavi→yeşil→kırmızı)
-    heatmap_colored = cv2.applyColorMap(heatmap_resized, cv2.COLORMAP_JET)
+    # Renk haritası uygula (varsayılan JET: mavi→yeşil→kırmızı)
+    heatmap_colored = cv2.applyColorMap(heatmap_resized, colormap)
 
     # BGR → RGB dönüşümü (OpenCV BGR formatında çalışır)
     heatmap_colored = cv2.cvtColor(heatmap_colored, cv2.COLOR_BGR2RGB)
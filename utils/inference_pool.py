@@ -0,0 +1,423 @@
+"""
+Retinal AMD — Süreç Dışı Çıkarım İşçi Havuzu
+==============================================
+Streamlit tüm oturumları tek bir Python sürecinde çalıştırır; ağır çıkarım
+ve Grad-CAM son işlemesi arayüz yeniden çalıştırmalarıyla GIL için yarışır.
+Bu modül, modeli her biri kendi belleğinde tutan N işçi süreç başlatır ve
+onlara multiprocessing kuyrukları üzerinden iş gönderir.
+
+- Her işçinin kendi iş kuyruğu ve sonuç kanalı vardır; işleri ana süreç
+  en az yüklü işçiye atar. Böylece ölen bir işçi diğerlerinin kuyruklarını
+  kilitleyemez ve hangi işin hangi işçide olduğu her an bilinir.
+- Her işçi kendi kuyruğunda kısa bir pencerede biriken işleri birleştirerek
+  mikro-batch oluşturur.
+- Isı haritası normalizasyonu dahil tüm ağır iş işçide yapılır; ana süreçte
+  yalnızca Future'ları tamamlayan hafif bir dağıtıcı iş parçacığı çalışır.
+- Ölen işçinin gönderdiği sonuçlar teslim edilir, kalan işleri hata ile
+  sonuçlanır ve işçi yeniden başlatılır.
+
+Havuz, MicroBatchScheduler ile aynı açıklayıcı arayüzünü sunar.
+Streamlit'e bağımlı değildir.
+"""
+
+import atexit
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import connection
+from typing import Any, Dict, Optional, Set, Tuple
+
+import numpy as np
+import torch
+
+from utils.inference_scheduler import (
+    FutureExplainer, select_maps,
+    DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS, DEFAULT_RESULT_TIMEOUT,
+)
+
+# İşçilerin modeli yükleyip hazır olması için beklenecek en uzun süre (sn)
+DEFAULT_READY_TIMEOUT = 300.0
+
+# Dağıtıcının sonuç kanallarını ve işçi süreçlerini bekleme aralığı (sn)
+_POLL_INTERVAL = 0.5
+
+
+def _build_explainer(model_type: str, backend: str, num_threads: int) -> Tuple[Any, bool, str]:
+    """İşçi süreçte açıklayıcıyı kurar: (açıklayıcı, demo_modu, mesaj)."""
+    from models.builders import build_explainer, build_model, build_onnx_session
+    from utils.gradcam import OnnxGradCAM
+
+    if backend == "onnx":
+        session = build_onnx_session(model_type, num_threads)
+        if session is None:
+            raise RuntimeError("ONNX artefaktı veya onnxruntime bulunamadı.")
+        return OnnxGradCAM(session), False, f"✅ ONNX Runtime oturumu yüklendi: `{session.path}`"
+
+    model, is_demo, message = build_model(model_type, "cpu")
+    return build_explainer(model, model_type), is_demo, message
+
+
+def _worker_main(
+    model_type: str,
+    backend: str,
+    jobs: "mp.Queue",
+    results: "connection.Connection",
+    max_batch_size: int,
+    max_wait_ms: float,
+    num_threads: int,
+) -> None:
+    """İşçi süreç giriş noktası: modeli yükler ve kendi kuyruğundaki işleri batch'ler halinde çalıştırır."""
+    pid = os.getpid()
+    torch.set_num_threads(num_threads)
+    try:
+        explainer, is_demo, message = _build_explainer(model_type, backend, num_threads)
+    except Exception as e:
+        results.send(("failed", pid, f"{type(e).__name__}: {e}"))
+        return
+    results.send(("ready", pid, is_demo, message))
+
+    stop = False
+    while not stop:
+        job = jobs.get()
+        if job is None:
+            break
+        batch = [job]
+        deadline = time.perf_counter() + max_wait_ms / 1000.0
+        while len(batch) < max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                job = jobs.get(timeout=remaining) if remaining > 0 else jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                stop = True
+                break
+            batch.append(job)
+
+        job_ids = [job_id for job_id, *_ in batch]
+        results.send(("taken", pid, job_ids))
+        try:
+            inputs = torch.from_numpy(np.stack([array for _, array, _, _ in batch]))
+            logits, probs, cams = explainer.predict_all_batch(inputs, raw=True)
+        except Exception as e:
+            for job_id in job_ids:
+                results.send(("error", pid, job_id, f"{type(e).__name__}: {e}"))
+            continue
+        for i, (job_id, _, all_classes, raw) in enumerate(batch):
+            try:
+                maps = select_maps(logits[i], cams[i], all_classes, raw)
+            except Exception as e:
+                results.send(("error", pid, job_id, f"{type(e).__name__}: {e}"))
+                continue
+            results.send(("done", pid, job_id, logits[i], probs[i], maps))
+
+
+class _Worker:
+    """Ana süreçte bir işçinin süreci, iş kuyruğu, sonuç kanalı ve atanmış işleri."""
+
+    def __init__(self, process: Any, jobs: "mp.Queue", conn: "connection.Connection") -> None:
+        self.process = process
+        self.jobs = jobs
+        self.conn = conn
+        self.pid: int = process.pid
+        self.ready = False
+        self.error: Optional[str] = None
+        self.assigned: Set[int] = set()     # işçiye gönderilmiş, sonucu gelmemiş işler
+        self.taken: Set[int] = set()        # işçinin kuyruktan aldığı (çalıştırdığı) işler
+
+    def close(self) -> None:
+        self.conn.close()
+        # Okuyucusu ölmüş kuyruğun besleyici iş parçacığı çıkışta beklenmesin
+        self.jobs.cancel_join_thread()
+        self.jobs.close()
+
+
+class InferenceWorkerPool(FutureExplainer):
+    """
+    Modeli tutan N işçi süreçten oluşan çıkarım havuzu.
+
+    Attributes:
+        model_type: Model tipi (bkz. models.MODEL_OPTIONS)
+        backend: Çıkarım arka ucu ("torch" veya "onnx")
+        num_workers: İşçi süreç sayısı
+        device: Girişlerin hazırlanacağı cihaz (işçiler CPU'da çalışır)
+        is_demo: İşçilerin demo modunda (rastgele ağırlıklarla) çalışıp çalışmadığı
+        message: Model yükleme mesajı (ilk işçiden)
+        result_timeout: Bir işin sonucunu bekleme süresi (sn)
+    """
+
+    def __init__(
+        self,
+        model_type: str,
+        backend: str = "torch",
+        num_workers: Optional[int] = None,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        threads_per_worker: Optional[int] = None,
+        start_method: str = "spawn",
+        ready_timeout: float = DEFAULT_READY_TIMEOUT,
+        result_timeout: Optional[float] = DEFAULT_RESULT_TIMEOUT,
+    ) -> None:
+        """
+        Args:
+            model_type: Model tipi
+            backend: Çıkarım arka ucu ("torch" veya "onnx")
+            num_workers: İşçi süreç sayısı (None → CPU çekirdek sayısı)
+            max_batch_size: İşçi başına tek forward pass'teki en fazla iş
+            max_wait_ms: İlk işten sonra batch'i doldurmak için beklenecek süre
+            threads_per_worker: İşçi başına torch/onnxruntime iş parçacığı
+                                (None → çekirdekler işçilere bölüştürülür)
+            start_method: multiprocessing başlatma yöntemi ("spawn" torch
+                          iş parçacıklarıyla güvenlidir)
+            ready_timeout: Tüm işçilerin hazır olması için beklenecek süre (sn)
+            result_timeout: predict_* çağrılarında sonucu bekleme süresi (sn)
+
+        Raises:
+            RuntimeError: İşçiler modeli yükleyemezse veya zaman aşımı olursa
+        """
+        cpu_count = os.cpu_count() or 1
+        self.model_type = model_type
+        self.backend = backend
+        self.num_workers = max(1, int(num_workers or cpu_count))
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.threads_per_worker = threads_per_worker or max(1, cpu_count // self.num_workers)
+        self.result_timeout = result_timeout
+        self.device = torch.device("cpu")
+        self.is_demo = False
+        self.message = ""
+
+        self._ctx = mp.get_context(start_method)
+        self._job_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._workers: Dict[int, _Worker] = {}
+        self._closed = False
+        self._dispatcher: Optional[threading.Thread] = None
+        self._metrics = {"requests": 0, "completed": 0, "errors": 0, "batches": 0, "restarts": 0}
+
+        for _ in range(self.num_workers):
+            self._spawn()
+        self._wait_ready(ready_timeout)
+        # Yorumlayıcı kapanırken multiprocessing işçileri sonlandırmadan önce
+        # havuz kapatılır; aksi halde dağıtıcı ölen işçileri yeniden başlatır
+        atexit.register(self.close)
+
+        self._dispatcher = threading.Thread(target=self._dispatch, name="inference-pool", daemon=True)
+        self._dispatcher.start()
+
+    # ── Süreç yönetimi ──
+    def _spawn(self) -> _Worker:
+        jobs = self._ctx.Queue()
+        reader, writer = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self.model_type, self.backend, jobs, writer,
+                  self.max_batch_size, self.max_wait_ms, self.threads_per_worker),
+            daemon=True,
+        )
+        process.start()
+        # Yazma ucu yalnızca işçide kalsın: işçi ölünce okuma ucu EOF görür
+        writer.close()
+        worker = _Worker(process, jobs, reader)
+        with self._lock:
+            self._workers[worker.pid] = worker
+        return worker
+
+    def _wait_ready(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        waiting = {w.conn: w for w in self._workers.values()}
+        while waiting:
+            ready = connection.wait(list(waiting), timeout=max(0.0, deadline - time.monotonic()))
+            if not ready:
+                self.close()
+                raise RuntimeError("Çıkarım işçileri zaman aşımı içinde hazır olmadı.")
+            for conn in ready:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    message = ("failed", waiting[conn].pid, "süreç beklenmedik şekilde sonlandı")
+                if message[0] == "failed":
+                    self.close()
+                    raise RuntimeError(f"Çıkarım işçisi başlatılamadı: {message[2]}")
+                if message[0] == "ready":
+                    waiting.pop(conn).ready = True
+                    self.is_demo = self.is_demo or message[2]
+                    self.message = self.message or message[3]
+
+    def _handle(self, worker: _Worker, message: tuple) -> None:
+        """İşçiden gelen tek mesajı işler."""
+        kind = message[0]
+        if kind == "ready":
+            worker.ready = True
+        elif kind == "failed":
+            worker.error = message[2]
+        elif kind == "taken":
+            with self._lock:
+                worker.taken.update(message[2])
+                self._metrics["batches"] += 1
+        elif kind in ("done", "error"):
+            job_id = message[2]
+            with self._lock:
+                worker.assigned.discard(job_id)
+                worker.taken.discard(job_id)
+                future = self._pending.pop(job_id, None)
+                self._metrics["completed" if kind == "done" else "errors"] += 1
+            if future is None or future.done():
+                return
+            if kind == "done":
+                future.set_result(tuple(message[3:6]))
+            else:
+                future.set_exception(RuntimeError(message[3]))
+
+    def _retire(self, worker: _Worker) -> None:
+        """
+        Ölen işçinin kanalında kalan sonuçları teslim eder, geri kalan
+        işlerini hata ile sonlandırır ve (daha önce hazır olmuşsa) yerine
+        yenisini başlatır.
+        """
+        try:
+            while worker.conn.poll():
+                self._handle(worker, worker.conn.recv())
+        except (EOFError, OSError):
+            pass
+        worker.process.join(timeout=1.0)
+        if worker.process.is_alive():
+            worker.process.terminate()
+
+        with self._lock:
+            self._workers.pop(worker.pid, None)
+            futures = [self._pending.pop(job_id) for job_id in worker.assigned if job_id in self._pending]
+            self._metrics["errors"] += len(futures)
+        reason = worker.error or f"Çıkarım işçisi (pid {worker.pid}) beklenmedik şekilde sonlandı."
+        for future in futures:
+            if not future.done():
+                future.set_exception(RuntimeError(reason))
+        worker.close()
+
+        # Yüklenirken çöken işçi yeniden başlatılmaz (sonsuz yeniden başlatma döngüsü olmasın)
+        if worker.ready and not self._closed:
+            with self._lock:
+                self._metrics["restarts"] += 1
+            self._spawn()
+
+    def _dispatch(self) -> None:
+        """Sonuç kanallarını ve işçi süreçlerini izleyip Future'ları tamamlayan dağıtıcı döngü."""
+        while not self._closed:
+            with self._lock:
+                workers = list(self._workers.values())
+            waitables: Dict[Any, _Worker] = {}
+            for worker in workers:
+                waitables[worker.conn] = worker
+                waitables[worker.process.sentinel] = worker
+            try:
+                ready = connection.wait(list(waitables), timeout=_POLL_INTERVAL)
+            except (OSError, ValueError):
+                continue
+
+            dead: Dict[int, _Worker] = {}
+            for obj in ready:
+                worker = waitables[obj]
+                if obj is not worker.conn:
+                    dead[worker.pid] = worker
+                    continue
+                try:
+                    self._handle(worker, worker.conn.recv())
+                except (EOFError, OSError):
+                    dead[worker.pid] = worker
+            if self._closed:
+                break
+            for worker in dead.values():
+                self._retire(worker)
+
+    # ── İstemci tarafı ──
+    def submit(self, tensor: torch.Tensor, all_classes: bool = True, raw: bool = False) -> Future:
+        """
+        Tek görüntülük işi en az yüklü işçiye gönderir.
+
+        Args:
+            tensor: [3, H, W] veya [1, 3, H, W] normalize giriş tensörü
+            all_classes: True ise tüm sınıfların, False ise yalnızca tahmin
+                         edilen sınıfın ısı haritası döndürülür
+            raw: True ise haritalar normalize edilmemiş ham ızgara olarak döner
+
+        Returns:
+            (logits [C], probabilities [C], heatmap(s)) tuple'ı ile tamamlanacak Future
+
+        Raises:
+            RuntimeError: Havuz kapatılmışsa veya çalışan işçi kalmamışsa
+        """
+        if self._closed:
+            raise RuntimeError("Çıkarım havuzu kapatılmış.")
+        if tensor.dim() == 4:
+            tensor = tensor[0]
+        array = tensor.detach().cpu().numpy().astype(np.float32, copy=False)
+
+        future: Future = Future()
+        future.set_running_or_notify_cancel()
+        job_id = next(self._job_ids)
+        with self._lock:
+            candidates = [w for w in self._workers.values() if w.ready] or list(self._workers.values())
+            if not candidates:
+                raise RuntimeError("Çıkarım havuzunda çalışan işçi kalmadı.")
+            worker = min(candidates, key=lambda w: len(w.assigned))
+            worker.assigned.add(job_id)
+            self._pending[job_id] = future
+            self._metrics["requests"] += 1
+            worker.jobs.put((job_id, array, all_classes, raw))
+        return future
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Havuz metriklerini döndürür.
+
+        Returns:
+            queue_depth (işçiye gönderilmiş ama henüz çalıştırılmamış iş), in_flight,
+            workers, requests, completed, errors, batches, restarts, avg_batch_size
+        """
+        with self._lock:
+            m = dict(self._metrics)
+            queued = sum(len(w.assigned - w.taken) for w in self._workers.values())
+            in_flight = sum(len(w.taken) for w in self._workers.values())
+            workers = len(self._workers)
+        return {
+            "queue_depth": queued,
+            "in_flight": in_flight,
+            "workers": workers,
+            **m,
+            "avg_batch_size": (m["completed"] + m["errors"]) / max(1, m["batches"]),
+        }
+
+    def close(self, timeout: float = 5.0) -> None:
+        """İşçileri durdurur; bekleyen işler hata ile sonuçlanır."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout)
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            if worker.ready:
+                worker.jobs.put(None)
+            else:
+                # Model yüklemesini bitirmemiş işçiyi beklemeye gerek yok
+                worker.process.terminate()
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.close()
+        with self._lock:
+            futures = list(self._pending.values())
+            self._pending.clear()
+        for future in futures:
+            if not future.done():
+                future.set_exception(RuntimeError("Çıkarım havuzu kapatıldı."))
@@ -0,0 +1,319 @@
+"""
+Retinal AMD — Mikro-Batch Çıkarım Zamanlayıcısı
+=================================================
+Tüm Streamlit oturumlarının paylaştığı süreç içi çıkarım servisi.
+Oturumlar isteklerini bir kuyruğa bırakır; tek bir işçi iş parçacığı kısa bir
+zaman penceresi içinde gelen istekleri toplayıp tek batch halinde modele
+verir ve her isteğin Future nesnesini sonuçla tamamlar.
+
+Böylece eşzamanlı klinisyenler aynı torch iş parçacıkları için yarışmaz,
+istekler birleştirilerek verim artar. Zamanlayıcı, açıklayıcıların
+(`predict_all` / `predict_batch`) arayüzünü sunduğundan onların yerine
+doğrudan kullanılabilir.
+Streamlit'e bağımlı değildir.
+"""
+
+import abc
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import torch
+
+from utils.gradcam import normalize_raw_cams
+
+# Tek forward pass'te işlenecek maksimum görüntü sayısı
+# (CPU'da bellek ve gecikme dengesi için)
+DEFAULT_MAX_BATCH_SIZE = 8
+# İlk istekten sonra batch'i doldurmak için beklenecek varsayılan süre (ms)
+DEFAULT_MAX_WAIT_MS = 10.0
+# predict_* çağrılarının bir sonucu en fazla bekleyeceği süre (sn)
+DEFAULT_RESULT_TIMEOUT = 120.0
+
+_STOP = object()
+
+
+class _Request(NamedTuple):
+    tensor: torch.Tensor            # [3, H, W]
+    all_classes: bool               # True: tüm sınıf haritaları, False: tahmin sınıfı haritası
+    raw: bool                       # True: normalize edilmemiş düşük çözünürlüklü ızgara
+    future: Future
+    enqueued_at: float
+
+
+def select_maps(logits: np.ndarray, cams: np.ndarray, all_classes: bool, raw: bool) -> np.ndarray:
+    """
+    Tek görüntünün ham CAM ızgaralarından isteğin istediği haritaları seçer.
+    Yalnızca seçilen haritalar normalize edilir; `raw` isteklerinde
+    yeniden boyutlandırma tamamen çağırana (ör. önbelleğe ham ızgara yazan) bırakılır.
+
+    Args:
+        logits: [C] logitler
+        cams: [C, h, w] ham CAM ızgaraları
+        all_classes: True ise tüm sınıfların, False ise tahmin sınıfının haritası
+        raw: True ise ızgaralar normalize edilmeden döndürülür
+
+    Returns:
+        [C, 224, 224] / [224, 224] ya da raw=True ise [C, h, w] / [h, w]
+    """
+    maps = cams if all_classes else cams[int(np.argmax(logits))]
+    return maps if raw else normalize_raw_cams(maps)
+
+
+class FutureExplainer(abc.ABC):
+    """
+    `submit(tensor, all_classes) -> Future` üzerine kurulu açıklayıcı arayüzü.
+    Alt sınıflar yalnızca `submit`'i uygular; `predict_all`, `predict_batch`
+    ve `predict_all_batch` HeadGradCAM ile aynı sözleşmeyi sunar.
+    Sonuç `result_timeout` saniye içinde gelmezse RuntimeError fırlatılır.
+    """
+
+    result_timeout: Optional[float] = DEFAULT_RESULT_TIMEOUT
+
+    @abc.abstractmethod
+    def submit(self, tensor: torch.Tensor, all_classes: bool = True, raw: bool = False) -> Future:
+        """
+        Tek görüntülük isteği kuyruğa ekler.
+
+        Args:
+            tensor: [3, H, W] veya [1, 3, H, W] normalize giriş tensörü
+            all_classes: True ise tüm sınıfların, False ise yalnızca tahmin
+                         edilen sınıfın ısı haritası döndürülür
+            raw: True ise haritalar normalize edilmemiş ham ızgara olarak döner
+
+        Returns:
+            (logits [C], probabilities [C], heatmap(s)) tuple'ı ile tamamlanacak Future
+        """
+
+    def predict_all(
+        self,
+        input_tensor: torch.Tensor,
+        raw: bool = False,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        HeadGradCAM.predict_all ile aynı arayüz; istek diğer oturumlarınkiyle birleştirilir.
+
+        Args:
+            input_tensor: [1, 3, H, W] boyutunda giriş tensörü
+            raw: True ise haritalar ham ızgara olarak döndürülür
+                 (bkz. utils.gradcam.normalize_raw_cams)
+
+        Returns:
+            (logits, probabilities, heatmaps) tuple'ı — [C], [C] ve [C, 224, 224]
+            (raw=True ise [C, h, w]) numpy dizileri
+        """
+        return self._result(self.submit(input_tensor, all_classes=True, raw=raw), self.result_timeout)
+
+    def _result(self, future: Future, timeout: Optional[float]) -> Any:
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise RuntimeError(f"Çıkarım sonucu {self.result_timeout:g} sn içinde alınamadı.") from None
+
+    def _gather(self, input_tensor: torch.Tensor, all_classes: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        futures = [self.submit(t, all_classes=all_classes) for t in input_tensor]
+        # Zaman aşımı tüm batch için ortak bir son tarihe göre uygulanır
+        deadline = None if self.result_timeout is None else time.monotonic() + self.result_timeout
+        results = [
+            self._result(f, None if deadline is None else max(0.0, deadline - time.monotonic()))
+            for f in futures
+        ]
+        return tuple(np.stack([r[i] for r in results]) for i in range(3))
+
+    def predict_batch(self, input_tensor: torch.Tensor) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        HeadGradCAM.predict_batch ile aynı arayüz; her görüntü ayrı istek
+        olarak kuyruğa girer ve diğer oturumların istekleriyle birleşebilir.
+
+        Args:
+            input_tensor: [N, 3, H, W] boyutunda giriş tensörü
+
+        Returns:
+            (logits, probabilities, heatmaps) tuple'ı — [N, C], [N, C] ve [N, 224, 224] numpy dizileri
+        """
+        return self._gather(input_tensor, all_classes=False)
+
+    def predict_all_batch(self, input_tensor: torch.Tensor) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        HeadGradCAM.predict_all_batch ile aynı arayüz.
+
+        Args:
+            input_tensor: [N, 3, H, W] boyutunda giriş tensörü
+
+        Returns:
+            (logits, probabilities, heatmaps) tuple'ı — [N, C], [N, C] ve [N, C, 224, 224] numpy dizileri
+        """
+        return self._gather(input_tensor, all_classes=True)
+
+
+class MicroBatchScheduler(FutureExplainer):
+    """
+    Kuyruk + işçi iş parçacığı ile dinamik mikro-batch çıkarım zamanlayıcısı.
+
+    İşçi, ilk isteği aldıktan sonra en fazla `max_wait_ms` boyunca veya
+    `max_batch_size` isteğe ulaşana kadar bekler, ardından toplanan
+    istekleri açıklayıcının `predict_all_batch` metoduyla tek forward pass'te
+    çalıştırır. Açıklayıcıya yalnızca işçi iş parçacığı eriştiğinden ek kilit
+    gerekmez.
+
+    Attributes:
+        explainer: `predict_all_batch` metoduna sahip açıklayıcı
+                   (HeadGradCAM, OnnxGradCAM — bkz. utils.gradcam)
+        device: Girişlerin taşınacağı hesaplama cihazı
+        max_batch_size: Tek forward pass'teki en fazla istek sayısı
+        max_wait_ms: İlk istekten sonra batch'i doldurmak için beklenecek süre
+        result_timeout: predict_* çağrılarında sonucu bekleme süresi (sn)
+    """
+
+    def __init__(
+        self,
+        explainer: Any,
+        device: torch.device,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        result_timeout: Optional[float] = DEFAULT_RESULT_TIMEOUT,
+    ) -> None:
+        self.explainer = explainer
+        self.device = device
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.result_timeout = result_timeout
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "requests": 0,
+            "served": 0,
+            "batches": 0,
+            "errors": 0,
+            "max_queue_depth": 0,
+            "last_batch_size": 0,
+            "total_wait_ms": 0.0,
+            "total_compute_ms": 0.0,
+        }
+        self._worker = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._worker.start()
+
+    # ── İstemci tarafı ──
+    def submit(self, tensor: torch.Tensor, all_classes: bool = True, raw: bool = False) -> Future:
+        """
+        Tek görüntülük isteği kuyruğa ekler.
+
+        Args:
+            tensor: [3, H, W] veya [1, 3, H, W] normalize giriş tensörü
+            all_classes: True ise tüm sınıfların, False ise yalnızca tahmin
+                         edilen sınıfın ısı haritası döndürülür
+            raw: True ise haritalar normalize edilmemiş ham ızgara olarak döner
+
+        Returns:
+            (logits [C], probabilities [C], heatmap(s)) tuple'ı ile tamamlanacak Future;
+            heatmap(s) all_classes'a göre [C, 224, 224] veya [224, 224]
+            (raw=True ise [C, h, w] veya [h, w])
+        """
+        if not self._worker.is_alive():
+            raise RuntimeError("Çıkarım zamanlayıcısı durdurulmuş.")
+        if tensor.dim() == 4:
+            tensor = tensor[0]
+        future: Future = Future()
+        self._queue.put(_Request(tensor, all_classes, raw, future, time.perf_counter()))
+        with self._metrics_lock:
+            self._metrics["requests"] += 1
+            self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], self._queue.qsize())
+        return future
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Kuyruk ve batch metriklerini döndürür.
+
+        Returns:
+            queue_depth, max_queue_depth, requests, batches, errors,
+            last_batch_size, avg_batch_size, avg_wait_ms, avg_compute_ms
+        """
+        with self._metrics_lock:
+            m = dict(self._metrics)
+        batches = max(1, m["batches"])
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": m["max_queue_depth"],
+            "requests": m["requests"],
+            "batches": m["batches"],
+            "errors": m["errors"],
+            "last_batch_size": m["last_batch_size"],
+            "avg_batch_size": m["served"] / batches,
+            "avg_wait_ms": m["total_wait_ms"] / max(1, m["served"]),
+            "avg_compute_ms": m["total_compute_ms"] / batches,
+        }
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """İşçiyi kuyruktaki istekler bittikten sonra durdurur."""
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+
+    # ── İşçi tarafı ──
+    def _collect(self, first: _Request) -> Tuple[List[_Request], bool]:
+        """İlk istekten itibaren pencere dolana kadar istek toplar."""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._collect(first)
+            # İptal edilmiş istekleri ayıkla
+            batch = [r for r in batch if r.future.set_running_or_notify_cancel()]
+            if batch:
+                self._execute(batch)
+
+        # Durdurma sonrası kuyrukta kalan istekler yanıtsız kalmasın
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP and item.future.set_running_or_notify_cancel():
+                item.future.set_exception(RuntimeError("Çıkarım zamanlayıcısı durdurulmuş."))
+
+    def _execute(self, batch: List[_Request]) -> None:
+        started = time.perf_counter()
+        try:
+            inputs = torch.stack([r.tensor for r in batch]).to(self.device)
+            logits, probs, cams = self.explainer.predict_all_batch(inputs, raw=True)
+        except Exception as e:
+            with self._metrics_lock:
+                self._metrics["errors"] += len(batch)
+            for r in batch:
+                r.future.set_exception(e)
+            return
+
+        finished = time.perf_counter()
+        with self._metrics_lock:
+            self._metrics["batches"] += 1
+            self._metrics["served"] += len(batch)
+            self._metrics["last_batch_size"] = len(batch)
+            self._metrics["total_wait_ms"] += sum((started - r.enqueued_at) * 1000 for r in batch)
+            self._metrics["total_compute_ms"] += (finished - started) * 1000
+
+        for i, r in enumerate(batch):
+            try:
+                maps = select_maps(logits[i], cams[i], r.all_classes, r.raw)
+            except Exception as e:
+                r.future.set_exception(e)
+                continue
+            r.future.set_result((logits[i], probs[i], maps))
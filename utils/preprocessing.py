@@ -5,11 +5,15 @@ Retinal OCT görüntülerini model girişine uygun tensörlere dönüştüren
 ön işleme pipeline'ı.
 """
 
+import io
+import math
+import cv2
 import torch
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 from torchvision import transforms
-from typing import Tuple
+from typing import BinaryIO, List, Optional, Sequence, Tuple, Union
 
 # ============================================================================
 # ImageNet normalizasyon değerleri (her iki model için ortak)
@@ -18,23 +22,284 @@ IMAGENET_MEAN = [0.485, 0.456, 0.406]
 IMAGENET_STD = [0.229, 0.224, 0.225]
 INPUT_SIZE = 224
 
+# Toplu ön işlemede kullanılan varsayılan iş parçacığı sayısı
+# (PIL resize/decode işlemleri GIL'i serbest bırakır)
+DEFAULT_NUM_WORKERS = 4
+
+# Dekompresyon bombalarına karşı çözülmeden önce uygulanan piksel sınırı
+# (~50 MP; en büyük 4k+ B-scan'ler bunun çok altında kalır)
+DEFAULT_MAX_PIXELS = 50_000_000
+
+# Düşük çözünürlüklü çözmede kısa kenar en az INPUT_SIZE * DECODE_OVERSAMPLE
+# tutulur; son antialias yeniden boyutlandırma ortak pipeline'da yapılır
+DECODE_OVERSAMPLE = 2
+
+# Alan ortalamasının anlamlı olduğu modlar; bunlarda küçültme RGB'ye
+# dönüştürmeden önce yapılır (gri tonlamada üç kat daha az piksel işlenir).
+# Palet ("P") ve ikili ("1") görüntüler önce dönüştürülmelidir.
+_REDUCIBLE_MODES = ("L", "LA", "RGB", "RGBA", "RGBX")
+
+
+# Modül düzeyinde tek sefer kurulan pipeline'lar — her çağrıda yeniden
+# Compose oluşturulmaz. Geometri (Resize → CenterCrop) görüntüleme dizisi,
+# model tensörü ve veritabanı küçük resmi için ortaktır.
+_GEOMETRY = transforms.Compose([
+    transforms.Resize(INPUT_SIZE),
+    transforms.CenterCrop(INPUT_SIZE),
+])
+_MEAN = torch.tensor(IMAGENET_MEAN).view(3, 1, 1)
+_STD = torch.tensor(IMAGENET_STD).view(3, 1, 1)
+
 
 def get_transforms() -> transforms.Compose:
     """
-    Model girişi için standart dönüşüm pipeline'ını döndürür.
-    Resize → CenterCrop → ToTensor → Normalize (ImageNet)
+    Model girişi için standart dönüşüm pipeline'ını döndürür (eğitim ve
+    değerlendirme betikleri için). Resize → CenterCrop → ToTensor → Normalize (ImageNet)
+
+    Geometri, uygulamanın kullandığı `_GEOMETRY` nesnesinin kendisidir;
+    sonuç prepare_image ile aynıdır.
 
     Returns:
         torchvision.transforms.Compose nesnesi
     """
     return transforms.Compose([
-        transforms.Resize(INPUT_SIZE),
-        transforms.CenterCrop(INPUT_SIZE),
+        _GEOMETRY,
         transforms.ToTensor(),
         transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD),
     ])
 
 
+def _downscale(image: Image.Image, min_side: int) -> Image.Image:
+    """
+    Kısa kenarı `min_side`'ın en az iki katıysa tam sayı faktörlü alan
+    ortalaması (kutu filtresi, cv2 INTER_AREA ile eşdeğer) ile küçültür.
+    Image.reduce piksel tamponunu numpy'a kopyalamadan çalışır.
+    """
+    factor = min(image.size) // min_side
+    if factor < 2:
+        return image
+    return image.reduce(factor)
+
+
+def decode_image(
+    source: Union[str, bytes, BinaryIO, Image.Image],
+    target_size: Optional[int] = INPUT_SIZE,
+    max_pixels: Optional[int] = DEFAULT_MAX_PIXELS,
+) -> Image.Image:
+    """
+    Görüntüyü bir kez, hedef boyuta yetecek en düşük çözünürlükte çözer ve
+    RGB'ye dönüştürür.
+
+    - Piksel sayısı yalnızca başlık okunarak denetlenir (dekompresyon bombası
+      koruması); sınırı aşan dosyalar çözülmeden reddedilir.
+    - JPEG'de draft modu ile DCT ölçekleme kullanılır (1/2, 1/4, 1/8
+      çözünürlükte çözme).
+    - Diğer formatlarda tam çözme sonrası tam sayı faktörlü alan ortalaması
+      ile küçültülür.
+
+    Kısa kenar `target_size * DECODE_OVERSAMPLE` değerinin altına indirilmez;
+    son yeniden boyutlandırma ortak geometri pipeline'ında yapılır.
+
+    Args:
+        source: Dosya yolu, ham baytlar, dosya benzeri nesne (örn. Streamlit
+                UploadedFile) veya PIL görüntüsü
+        target_size: Modelin giriş boyutu; None ise tam çözünürlükte çözülür
+        max_pixels: İzin verilen en fazla piksel sayısı; None ise sınır yok
+
+    Returns:
+        RGB modunda PIL görüntüsü
+
+    Raises:
+        ValueError: Görüntü piksel sınırını aşarsa (PIL'in kendi dekompresyon
+                    bombası hatası dahil)
+    """
+    try:
+        return _decode_image(source, target_size, max_pixels)
+    except Image.DecompressionBombError as e:
+        raise ValueError(f"Görüntü çok büyük: {e}") from e
+
+
+def _decode_image(
+    source: Union[str, bytes, BinaryIO, Image.Image],
+    target_size: Optional[int],
+    max_pixels: Optional[int],
+) -> Image.Image:
+    if isinstance(source, Image.Image):
+        image = source
+    else:
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        image = Image.open(source)
+
+    w, h = image.size
+    if max_pixels and w * h > max_pixels:
+        raise ValueError(
+            f"Görüntü çok büyük: {w}x{h} = {w * h:,} piksel (sınır: {max_pixels:,})"
+        )
+
+    min_side = target_size * DECODE_OVERSAMPLE if target_size else None
+    if min_side and image.format in ("JPEG", "MPO"):
+        # Başlık okundu, pikseller henüz çözülmedi — DCT ölçeklemeyi ayarla
+        scale = min_side / min(w, h)
+        if scale < 1:
+            image.draft("RGB", (math.ceil(w * scale), math.ceil(h * scale)))
+    image.load()
+
+    # Gri tonlamalı veya RGBA olabilir — mümkünse önce küçült, sonra dönüştür
+    if image.mode not in _REDUCIBLE_MODES:
+        image = image.convert("RGB")
+    if min_side:
+        image = _downscale(image, min_side)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return image
+
+
+def _geometry_array(image: Image.Image) -> np.ndarray:
+    """RGB görüntüye ortak geometriyi uygular: [224, 224, 3] uint8 dizi."""
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.array(_GEOMETRY(image))
+
+
+def to_model_tensor(array: np.ndarray) -> torch.Tensor:
+    """
+    [224, 224, 3] uint8 diziyi normalize model tensörüne dönüştürür
+    (ToTensor + Normalize ile aynı sonuç, ara PIL kopyası olmadan).
+
+    Args:
+        array: _geometry_array / prepare_image çıktısı görüntüleme dizisi
+
+    Returns:
+        [3, 224, 224] normalize edilmiş float tensör
+    """
+    tensor = torch.from_numpy(array).permute(2, 0, 1).float().div_(255)
+    return tensor.sub_(_MEAN).div_(_STD)
+
+
+# ============================================================================
+# Vektörel cv2/NumPy arka ucu
+# ============================================================================
+# "pil": torchvision Resize/CenterCrop (varsayılan, eğitimle birebir)
+# "cv2": cv2 yeniden boyutlandırma + NumPy ile tek adımda normalize edip
+#        önceden ayrılmış (pinned) batch tamponuna yazma
+PREPROCESS_BACKENDS = ("pil", "cv2")
+
+# (x / 255 - mean) / std  ==  x * _SCALE + _BIAS
+_SCALE = (1.0 / (255.0 * np.array(IMAGENET_STD, dtype=np.float32))).reshape(3, 1, 1)
+_BIAS = (-np.array(IMAGENET_MEAN, dtype=np.float32) / np.array(IMAGENET_STD, dtype=np.float32)).reshape(3, 1, 1)
+
+
+def _geometry_array_cv2(image: Image.Image) -> np.ndarray:
+    """
+    Resize (kısa kenar 224) → CenterCrop geometrisini cv2 ile uygular.
+    Küçültme iki adımdadır: tam sayı faktörlü INTER_AREA (cv2'nin hızlı
+    yolu, örtüşmeyi önler) ve ardından kalan küçük oran için INTER_LINEAR.
+    Çıktı boyutları ve kırpma ofsetleri torchvision ile aynıdır.
+    """
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    array = np.asarray(image)
+    h, w = array.shape[:2]
+
+    factor = min(h, w) // INPUT_SIZE
+    if factor >= 2:
+        array = cv2.resize(array, (w // factor, h // factor), interpolation=cv2.INTER_AREA)
+
+    short, long = (w, h) if w <= h else (h, w)
+    new_long = int(INPUT_SIZE * long / short)
+    new_w, new_h = (INPUT_SIZE, new_long) if w <= h else (new_long, INPUT_SIZE)
+    if (new_w, new_h) != array.shape[1::-1]:
+        array = cv2.resize(array, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    top = int(round((new_h - INPUT_SIZE) / 2.0))
+    left = int(round((new_w - INPUT_SIZE) / 2.0))
+    return np.ascontiguousarray(array[top:top + INPUT_SIZE, left:left + INPUT_SIZE])
+
+
+def normalize_into(array: np.ndarray, out: np.ndarray) -> None:
+    """
+    [224, 224, 3] uint8 diziyi HWC→CHW dönüşümü, ölçekleme ve ImageNet
+    normalizasyonu tek geçişte yaparak `out` dizisine yazar.
+
+    Args:
+        array: [224, 224, 3] uint8 görüntüleme dizisi
+        out: [3, 224, 224] float32 hedef (örn. batch tamponunun bir dilimi)
+    """
+    np.multiply(array.transpose(2, 0, 1), _SCALE, out=out, casting="unsafe")
+    np.add(out, _BIAS, out=out)
+
+
+class PinnedBatchBuffer:
+    """
+    Önceden ayrılmış [max_batch_size, 3, 224, 224] float32 batch tamponu.
+    CUDA varsa sayfa kilitli (pinned) bellekte tutulur; cihaza kopyalama
+    asenkron yapılabilir. Her `fill` çağrısı aynı belleği yeniden kullanır,
+    bu nedenle döndürülen tensör bir sonraki `fill`'e kadar geçerlidir.
+    """
+
+    def __init__(self, max_batch_size: int, pin_memory: Optional[bool] = None):
+        if pin_memory is None:
+            pin_memory = torch.cuda.is_available()
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.pinned = bool(pin_memory)
+        self.tensor = torch.empty(
+            (self.max_batch_size, 3, INPUT_SIZE, INPUT_SIZE), dtype=torch.float32, pin_memory=self.pinned,
+        )
+        self._array = self.tensor.numpy()
+
+    def _fill_slot(self, index: int, image: Image.Image) -> np.ndarray:
+        display_image = _geometry_array_cv2(image)
+        normalize_into(display_image, self._array[index])
+        return display_image
+
+    def fill(
+        self,
+        images: Sequence[Image.Image],
+        num_workers: int = DEFAULT_NUM_WORKERS,
+    ) -> Tuple[torch.Tensor, List[np.ndarray]]:
+        """
+        Görüntüleri (cv2 iş parçacıkları GIL'i bıraktığından paralel olarak)
+        tamponun ilk N dilimine yazar.
+
+        Args:
+            images: PIL formatında giriş görüntüleri (en fazla max_batch_size)
+            num_workers: Paralel ön işleme iş parçacığı sayısı
+
+        Returns:
+            ([N, 3, 224, 224] tampon görünümü, [224, 224, 3] uint8 görüntüleme dizileri) tuple'ı
+        """
+        if len(images) > self.max_batch_size:
+            raise ValueError(
+                f"Batch boyutu tampon kapasitesini aşıyor: {len(images)} > {self.max_batch_size}"
+            )
+        if num_workers > 1 and len(images) > 1:
+            with ThreadPoolExecutor(max_workers=num_workers) as pool:
+                display_images = list(pool.map(self._fill_slot, range(len(images)), images))
+        else:
+            display_images = [self._fill_slot(i, img) for i, img in enumerate(images)]
+        return self.tensor[:len(images)], display_images
+
+    def load_arrays(self, display_images: Sequence[np.ndarray]) -> torch.Tensor:
+        """
+        Önceden kırpılmış [224, 224, 3] uint8 dizileri normalize ederek
+        tamponun ilk N dilimine yazar.
+
+        Args:
+            display_images: prepare_display_image çıktısı diziler (en fazla max_batch_size)
+
+        Returns:
+            [N, 3, 224, 224] tampon görünümü
+        """
+        if len(display_images) > self.max_batch_size:
+            raise ValueError(
+                f"Batch boyutu tampon kapasitesini aşıyor: {len(display_images)} > {self.max_batch_size}"
+            )
+        for i, array in enumerate(display_images):
+            normalize_into(array, self._array[i])
+        return self.tensor[:len(display_images)]
+
+
 def preprocess_image(image: Image.Image, device: torch.device) -> torch.Tensor:
     """
     PIL görüntüsünü model girişine uygun tensöre dönüştürür.
@@ -46,35 +311,82 @@ def preprocess_image(image: Image.Image, device: torch.device) -> torch.Tensor:
     Returns:
         [1, 3, 224, 224] boyutunda normalize edilmiş tensör
     """
-    # Görüntüyü RGB'ye dönüştür (gri tonlamalı veya RGBA olabilir)
-    if image.mode != "RGB":
-        image = image.convert("RGB")
-
-    # Dönüşüm pipeline'ını uygula
-    transform = get_transforms()
-    tensor = transform(image)
+    tensor = to_model_tensor(_geometry_array(image))
 
     # Batch boyutu ekle ve cihaza taşı
-    tensor = tensor.unsqueeze(0).to(device)
+    return tensor.unsqueeze(0).to(device)
 
-    return tensor
 
-
-def prepare_display_image(image: Image.Image) -> np.ndarray:
+def prepare_display_image(image: Image.Image, backend: str = "pil") -> np.ndarray:
     """
     PIL görüntüsünü görselleştirme için numpy dizisine dönüştürür.
-    224x224 boyutuna yeniden boyutlandırır.
+    Modelin gördüğü alanla aynı geometri (Resize → CenterCrop) kullanılır;
+    böylece Grad-CAM bindirmesi görüntüyle hizalı kalır.
 
     Args:
         image: PIL formatında giriş görüntüsü
+        backend: Ön işleme arka ucu ("pil" veya "cv2")
 
     Returns:
         [224, 224, 3] boyutunda uint8 numpy dizisi
     """
-    if image.mode != "RGB":
-        image = image.convert("RGB")
+    if backend == "cv2":
+        return _geometry_array_cv2(image)
+    return _geometry_array(image)
+
+
+def prepare_image(image: Image.Image) -> Tuple[torch.Tensor, np.ndarray]:
+    """
+    Tek görüntü için batch boyutu olmayan model tensörü ve görüntüleme dizisi üretir.
+    Görüntü yalnızca bir kez yeniden boyutlandırılır; model tensörü,
+    görüntüleme dizisi ve veritabanı küçük resmi aynı ara diziden türetilir.
+
+    Args:
+        image: PIL formatında giriş görüntüsü
+
+    Returns:
+        ([3, 224, 224] normalize tensör, [224, 224, 3] uint8 dizi) tuple'ı
+    """
+    display_image = _geometry_array(image)
+    return to_model_tensor(display_image), display_image
+
+
+def preprocess_images(
+    images: Sequence[Image.Image],
+    device: torch.device,
+    num_workers: int = DEFAULT_NUM_WORKERS,
+    backend: str = "pil",
+    buffer: Optional[PinnedBatchBuffer] = None,
+) -> Tuple[torch.Tensor, List[np.ndarray]]:
+    """
+    Birden fazla PIL görüntüsünü paralel olarak ön işler ve tek bir batch
+    tensörüne yığar.
+
+    Args:
+        images: PIL formatında giriş görüntüleri
+        device: Hedef hesaplama cihazı (CPU/CUDA)
+        num_workers: Paralel ön işleme iş parçacığı sayısı
+        backend: Ön işleme arka ucu ("pil" veya "cv2", bkz. PREPROCESS_BACKENDS)
+        buffer: "cv2" arka ucunda yeniden kullanılacak batch tamponu
+                (verilmezse bu çağrı için bir tane ayrılır)
+
+    Returns:
+        ([N, 3, 224, 224] normalize tensör, [224, 224, 3] uint8 görüntüleme dizileri) tuple'ı
+    """
+    if backend == "cv2":
+        if buffer is None:
+            buffer = PinnedBatchBuffer(len(images))
+        batch, display_images = buffer.fill(images, num_workers)
+        return batch.to(device, non_blocking=buffer.pinned), display_images
+    if backend != "pil":
+        raise ValueError(f"Bilinmeyen ön işleme arka ucu: {backend}")
 
-    # Görüntüyü model giriş boyutuna yeniden boyutlandır
-    image = image.resize((INPUT_SIZE, INPUT_SIZE), Image.LANCZOS)
+    if num_workers > 1 and len(images) > 1:
+        with ThreadPoolExecutor(max_workers=num_workers) as pool:
+            prepared = list(pool.map(prepare_image, images))
+    else:
+        prepared = [prepare_image(img) for img in images]
 
-    return np.array(image)
+    tensors = [t for t, _ in prepared]
+    display_images = [d for _, d in prepared]
+    return torch.stack(tensors).to(device), display_images
@@ -0,0 +1,197 @@
+"""
+Retinal AMD — Veritabanı Sorgu Önbelleği
+==========================================
+Supabase okuma sorgularının sonuçlarını sorgu anahtarıyla saklayan,
+TTL'li ve etiketlerle geçersiz kılınan okuma önbelleği.
+
+Her kayıt, okunduğu andaki etiket sürümleriyle (ör. `"patients"`,
+`"analyses:<hasta_id>"`) birlikte tutulur. Yazma işlemleri ilgili etiketlerin
+sürümünü artırır; sürümü değişmiş kayıtlar bir sonraki okumada ıska sayılır.
+Sürümler sorgu başlamadan önce alındığından, sorgu sürerken yapılan bir
+yazma eski sonucun önbellekte kalmasına yol açmaz. TTL, uygulama dışından
+(başka süreçler, SQL konsolu) yapılan değişikliklerin en uzun ne kadar
+görünmeyeceğini sınırlar.
+
+Streamlit'e bağımlı değildir.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, NamedTuple, Optional, Tuple
+
+# Varsayılan süreler (saniye) ve kayıt sınırı
+DEFAULT_TTL_SECONDS = 60.0
+DEFAULT_SESSION_TTL_SECONDS = 15.0
+DEFAULT_MAX_ENTRIES = 2048
+
+# Önbellekte bulunmayan kayıt için işaretçi (None geçerli bir sorgu sonucudur)
+MISS = object()
+
+
+class TagVersions:
+    """
+    Etiket başına sürüm sayaçları. Oturumlar arasında paylaşıldığı için
+    iş parçacığı güvenlidir; hiç artırılmamış etiketin sürümü 0'dır.
+    """
+
+    def __init__(self) -> None:
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self, tags: Iterable[str]) -> Tuple[Tuple[str, int], ...]:
+        """
+        Etiketlerin güncel sürümlerini döndürür.
+
+        Args:
+            tags: Etiketler
+
+        Returns:
+            (etiket, sürüm) çiftlerinden oluşan tuple
+        """
+        with self._lock:
+            return tuple((tag, self._versions.get(tag, 0)) for tag in tags)
+
+    def is_current(self, snapshot: Tuple[Tuple[str, int], ...]) -> bool:
+        """Anlık görüntüdeki sürümlerin hâlâ güncel olup olmadığını döndürür."""
+        with self._lock:
+            return all(self._versions.get(tag, 0) == version for tag, version in snapshot)
+
+    def bump(self, tags: Iterable[str]) -> None:
+        """
+        Etiketlerin sürümünü artırır; bu etiketleri taşıyan tüm kayıtlar geçersiz olur.
+
+        Args:
+            tags: Geçersiz kılınacak etiketler
+        """
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+
+class _Entry(NamedTuple):
+    value: Any
+    expires_at: float
+    tags: Tuple[Tuple[str, int], ...]
+
+
+class QueryCache:
+    """
+    TTL'li, kayıt sayısıyla sınırlı LRU sorgu önbelleği. Kayıtlar okunurken
+    hem süreleri hem de etiket sürümleri (bkz. TagVersions) denetlenir.
+    Değerler yazılırken ve okunurken kopyalanır; çağıranın sonucu
+    değiştirmesi önbelleği bozmaz.
+
+    Attributes:
+        versions: Geçersiz kılma için kullanılan etiket sürümleri
+        ttl_seconds: Kayıt ömrü (0: önbellek kapalı)
+        max_entries: En fazla kayıt sayısı
+    """
+
+    def __init__(
+        self,
+        versions: TagVersions,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.versions = versions
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self.max_entries = max(0, int(max_entries))
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Geçerli kaydı döndürür; süresi dolmuş veya etiketi geçersiz kılınmış
+        kayıtlar silinir.
+
+        Args:
+            key: Sorgu anahtarı
+
+        Returns:
+            Kayıtlı değerin kopyası veya MISS
+        """
+        entry = self._lookup(key)
+        return MISS if entry is None else copy.deepcopy(entry.value)
+
+    def _lookup(self, key: Hashable) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic() or not self.versions.is_current(entry.tags):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, value: Any, snapshot: Tuple[Tuple[str, int], ...]) -> None:
+        """
+        Sorgu sonucunu önbelleğe yazar. Sorgu sürerken etiketlerden biri
+        geçersiz kılındıysa sonuç yazılmaz.
+
+        Args:
+            key: Sorgu anahtarı
+            value: Sorgu sonucu
+            snapshot: Sorgu başlamadan önce alınan etiket sürümleri
+                      (bkz. TagVersions.snapshot)
+        """
+        if self.ttl_seconds <= 0 or self.max_entries <= 0 or not self.versions.is_current(snapshot):
+            return
+        entry = _Entry(copy.deepcopy(value), time.monotonic() + self.ttl_seconds, snapshot)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Tüm kayıtları siler."""
+        with self._lock:
+            self._entries.clear()
+
+
+def cached_read(
+    key: Hashable,
+    tags: Iterable[str],
+    fetch: Callable[[], Any],
+    shared: QueryCache,
+    session: Optional[QueryCache] = None,
+    cacheable: Optional[Callable[[Any], bool]] = None,
+) -> Any:
+    """
+    Okuma sorgusunu önce oturum, sonra paylaşılan katmandan yanıtlar; ıskada
+    `fetch` çalıştırılır ve sonuç iki katmana da yazılır. `fetch`'in fırlattığı
+    hatalar önbelleğe alınmadan çağırana iletilir.
+
+    Args:
+        key: Sorgu anahtarı (sorgu adı + parametreler)
+        tags: Sonucu geçersiz kılacak etiketler
+        fetch: Sorguyu çalıştıran argümansız fonksiyon
+        shared: Oturumlar arasında paylaşılan katman
+        session: Oturuma özel katman (isteğe bağlı)
+        cacheable: Sonucun önbelleğe yazılıp yazılmayacağını belirleyen
+                   fonksiyon (ör. çok büyük sonuçları dışarıda bırakmak için)
+
+    Returns:
+        Sorgu sonucu
+    """
+    layers = [c for c in (session, shared) if c is not None]
+    for i, layer in enumerate(layers):
+        entry = layer._lookup(key)
+        if entry is not None:
+            # Paylaşılan katmandan gelen sonucu oturum katmanına da al
+            for upper in layers[:i]:
+                upper.put(key, entry.value, entry.tags)
+            return copy.deepcopy(entry.value)
+
+    snapshot = shared.versions.snapshot(tags)
+    value = fetch()
+    if cacheable is None or cacheable(value):
+        for layer in layers:
+            layer.put(key, value, snapshot)
+    return value
@@ -0,0 +1,227 @@
+"""
+Retinal AMD — Analiz Sonuç Önbelleği
+======================================
+Aynı taramanın tekrar yüklenmesinde (sekme yenileme, hasta değiştirip geri
+dönme, PDF'i yeniden oluşturma) ön işleme + çıkarım + Grad-CAM'i yeniden
+çalıştırmamak için içerik özetine (hash) dayalı sonuç önbelleği.
+
+- Bellek katmanı: toplam bayt bütçesiyle sınırlı LRU
+- Disk katmanı (isteğe bağlı): her kayıt için bir `.npz` dosyası; süreç
+  yeniden başlasa da sonuçlar korunur. Toplam boyut bayt bütçesini aşınca
+  en uzun süredir okunmamış dosyalar silinir.
+
+Streamlit'e bağımlı değildir.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Varsayılan bellek bütçesi (MB) — bir kayıt yaklaşık 150 KB tutar
+DEFAULT_MAX_MB = 256
+# Varsayılan disk katmanı bütçesi (MB)
+DEFAULT_DISK_MAX_MB = 1024
+
+# Önbellekte tutulan alanlar (hepsi numpy dizisi). Grad-CAM ham ızgara olarak
+# saklanır; ısı haritaları ve bindirme istek anında üretilir.
+CACHED_FIELDS = ("probabilities", "raw_cams", "display_image")
+
+
+def make_cache_key(data: bytes, model_key: str, model_version: str, backend: str = "torch") -> str:
+    """
+    Yüklenen dosyanın baytlarından ve modeli tanımlayan bilgilerden önbellek
+    anahtarı üretir. Ağırlıklar değiştiğinde sürüm de değişir; eski kayıtlar
+    kendiliğinden geçersiz kalır.
+
+    Args:
+        data: Yüklenen dosyanın ham baytları
+        model_key: Model anahtarı (örn. "efficientnet_b4")
+        model_version: Model ağırlık + artefakt sürümü (bkz. models.get_model_version)
+        backend: Çıkarım arka ucu ("torch" veya "onnx")
+
+    Returns:
+        SHA-256 hex özeti
+    """
+    h = hashlib.sha256(data)
+    h.update(f"|{model_key}|{model_version}|{backend}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _entry_nbytes(entry: Dict[str, np.ndarray]) -> int:
+    return sum(v.nbytes for v in entry.values())
+
+
+class ResultCache:
+    """
+    Bayt bütçeli LRU bellek önbelleği + isteğe bağlı, bayt bütçeli disk katmanı.
+    Streamlit oturumları arasında paylaşıldığı için iş parçacığı güvenlidir.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = DEFAULT_DISK_MAX_MB * 1024 * 1024,
+    ):
+        self.max_bytes = max(0, int(max_bytes))
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = max(0, int(disk_max_bytes))
+        self._entries: "OrderedDict[str, Dict[str, np.ndarray]]" = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_nbytes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_nbytes = sum(size for _, _, size in self._disk_files())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        """Bellek katmanındaki toplam bayt."""
+        return self._nbytes
+
+    def get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Kaydı önce bellekten, yoksa diskten okur (diskten okunan kayıt
+        belleğe alınır).
+
+        Args:
+            key: make_cache_key ile üretilmiş anahtar
+
+        Returns:
+            CACHED_FIELDS alanlarını içeren sözlük veya None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return dict(entry)
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._put_memory(key, entry)
+            return dict(entry)
+        return None
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """
+        Analiz sonucunu önbelleğe yazar.
+
+        Args:
+            key: make_cache_key ile üretilmiş anahtar
+            result: En az CACHED_FIELDS alanlarını içeren sonuç sözlüğü
+        """
+        entry = {f: np.ascontiguousarray(result[f]) for f in CACHED_FIELDS}
+        self._put_memory(key, entry)
+        self._write_disk(key, entry)
+
+    def clear(self) -> None:
+        """Bellek katmanını boşaltır (disk katmanına dokunmaz)."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    # ── Bellek katmanı ──
+    def _put_memory(self, key: str, entry: Dict[str, np.ndarray]) -> None:
+        size = _entry_nbytes(entry)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._nbytes -= _entry_nbytes(old)
+            self._entries[key] = entry
+            self._nbytes += size
+            # Bütçe aşıldıysa en eski kayıtları çıkar
+            while self._nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._nbytes -= _entry_nbytes(evicted)
+
+    # ── Disk katmanı ──
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.npz")
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                entry = {f: data[f] for f in CACHED_FIELDS}
+        except Exception:
+            # Bozuk/yarım kalmış dosya — önbellek ıskası say
+            return None
+        try:
+            # Değişiklik zamanı son erişim olarak kullanılır (LRU çıkarma için)
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def _disk_files(self) -> List[Tuple[str, float, int]]:
+        """Disk katmanındaki (yol, son erişim, boyut) üçlüleri."""
+        files = []
+        try:
+            names = os.listdir(self.disk_dir)
+        except OSError:
+            return files
+        for name in names:
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((path, stat.st_mtime, stat.st_size))
+        return files
+
+    def _evict_disk(self) -> None:
+        """
+        Disk katmanı bütçeyi aştıysa en uzun süredir okunmamış dosyaları siler.
+        Dizin başka süreçlerle paylaşılabileceği için boyut yeniden taranır.
+        """
+        files = sorted(self._disk_files(), key=lambda f: f[1])
+        total = sum(size for _, _, size in files)
+        for path, _, size in files:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._disk_nbytes = total
+
+    def _write_disk(self, key: str, entry: Dict[str, np.ndarray]) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        # Önce geçici dosyaya yaz, sonra atomik olarak yeniden adlandır
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **entry)
+            size = os.path.getsize(tmp_path)
+            if size > self.disk_max_bytes:
+                os.remove(tmp_path)
+                return
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._disk_lock:
+            self._disk_nbytes += size - old_size
+            if self._disk_nbytes > self.disk_max_bytes:
+                self._evict_disk()
@@ -3,6 +3,7 @@ Retinal AMD — UI Bileşenleri Modülü
 ===================================
 Tekrar kullanılabilir Streamlit arayüz bileşenleri:
 - Hasta seçici / oluşturucu (Sidebar)
+- Sayfalı listeler için sayfa gezgini
 - Hasta özet kartı
 - Analiz geçmişi listesi/tablosu
 - Trend grafiği
@@ -17,8 +18,9 @@ from datetime import datetime, timezone, timedelta
 from typing import Optional, Dict, List
 
 from utils.database import (
-    search_patients, add_patient,
-    get_patient_analyses, base64_to_image,
+    search_patients_page, add_patient,
+    get_patient_analyses_page, render_analysis_gradcam,
+    Cursor,
 )
 
 TZ_TR = timezone(timedelta(hours=3))
@@ -32,6 +34,52 @@ CLASS_COLORS = {
     "NORMAL": "#22c55e",
 }
 
+def page_cursor(key: str, scope: str = "") -> Optional[Cursor]:
+    """
+    Sayfalı bir listenin geçerli sayfa imlecini döndürür. Açılan sayfaların
+    imleçleri oturumda yığın olarak tutulur; `scope` (ör. arama metni)
+    değişince ilk sayfaya dönülür.
+
+    Args:
+        key: Listeye özgü oturum anahtarı
+        scope: Değiştiğinde sayfalamayı sıfırlayan değer
+
+    Returns:
+        Geçerli sayfanın imleci (None: ilk sayfa)
+    """
+    state = st.session_state.setdefault(f"pager_{key}", {"scope": scope, "stack": [None]})
+    if state["scope"] != scope:
+        state["scope"], state["stack"] = scope, [None]
+    return state["stack"][-1]
+
+
+def render_pager(key: str, next_cursor: Optional[Cursor]) -> None:
+    """
+    page_cursor ile açılmış liste için ◀ / ▶ sayfa düğmelerini çizer;
+    tek sayfalık listelerde hiçbir şey göstermez.
+
+    Args:
+        key: page_cursor'a verilen oturum anahtarı
+        next_cursor: Sorgunun döndürdüğü sonraki sayfa imleci
+    """
+    state = st.session_state[f"pager_{key}"]
+    page = len(state["stack"])
+    if page == 1 and next_cursor is None:
+        return
+
+    c_prev, c_page, c_next = st.columns([1, 2, 1])
+    with c_prev:
+        if st.button("◀", key=f"pager_{key}_prev", disabled=page == 1, use_container_width=True):
+            state["stack"].pop()
+            st.rerun()
+    with c_page:
+        st.caption(f"Sayfa {page}")
+    with c_next:
+        if st.button("▶", key=f"pager_{key}_next", disabled=next_cursor is None, use_container_width=True):
+            state["stack"].append(next_cursor)
+            st.rerun()
+
+
 def render_sidebar_patient_selector() -> Optional[Dict]:
     """
     Sidebar'da hasta arama ve ekleme işlemlerini yönetir.
@@ -44,7 +92,7 @@ def render_sidebar_patient_selector() -> Optional[Dict]:
     # ── TAB 1: ARA ──
     with tab_search:
         search_query = st.text_input("Hasta Ara", placeholder="Ad, Soyad, Dosya No...", label_visibility="collapsed")
-        patients = search_patients(search_query)
+        patients, next_cursor = search_patients_page(search_query, cursor=page_cursor("sidebar_selector", search_query))
         
         if not patients:
             st.info("Kayıt bulunamadı.")
@@ -53,6 +101,7 @@ def render_sidebar_patient_selector() -> Optional[Dict]:
         # Selectbox için seçenekler
         options = {f"{p['ad']} {p['soyad']} ({p['dosya_no']})": p for p in patients}
         selected_label = st.selectbox("Sonuçlar", options=list(options.keys()), label_visibility="collapsed")
+        render_pager("sidebar_selector", next_cursor)
         
         if selected_label:
             selected_patient = options[selected_label]
@@ -114,7 +163,7 @@ def render_patient_summary(patient: Dict):
 
 def render_analysis_history_list(patient_id: str):
     """Hastanın geçmiş analizlerini listeleyen bir bileşen."""
-    analyses = get_patient_analyses(patient_id)
+    analyses, next_cursor = get_patient_analyses_page(patient_id, cursor=page_cursor(f"history_{patient_id}"))
     
     if not analyses:
         st.info("Henüz analiz kaydı yok.")
@@ -151,7 +200,8 @@ def render_analysis_history_list(patient_id: str):
         
         if st.button(label, key=f"hist_btn_{a['id']}", use_container_width=True):
             st.session_state["selected_history_analysis"] = a
-            
+
+    render_pager(f"history_{patient_id}", next_cursor)
     return analyses
 
 
@@ -206,15 +256,15 @@ def render_comparison_view(current_analysis: Dict, past_analysis: Dict):
     # Sol: Mevcut / Yeni
     with col1:
         st.caption(f"YENİ: {current_analysis.get('analysis_date', 'Şimdi')[:16]}")
-        if current_analysis.get("gradcam_image_b64"):
-            img = base64_to_image(current_analysis["gradcam_image_b64"])
+        img = render_analysis_gradcam(current_analysis)
+        if img is not None:
             st.image(img, use_container_width=True, caption=f"{current_analysis['predicted_class']}")
             
     # Sağ: Referans / Eski
     with col2:
         st.caption(f"ESKİ: {past_analysis.get('analysis_date', '?')[:16]}")
-        if past_analysis.get("gradcam_image_b64"):
-            img = base64_to_image(past_analysis["gradcam_image_b64"])
+        img = render_analysis_gradcam(past_analysis)
+        if img is not None:
             st.image(img, use_container_width=True, caption=f"{past_analysis['predicted_class']}")
             
     # Değişim Yorumu
@@ -0,0 +1,180 @@
+"""
+Retinal AMD — OCT Hacim (Çok Kareli TIFF) Analiz Modülü
+=========================================================
+Bir OCT hacmindeki (49–128 B-scan) kareleri çok sayfalı TIFF dosyasından
+tembel (lazy) olarak okur, sınırlı boyutlu batch'ler halinde modele verir ve
+hacim düzeyinde olasılıkları ve en şüpheli B-scan'leri Grad-CAM'leriyle
+birlikte döndürür.
+
+Bellekte aynı anda en fazla bir batch kare ile en şüpheli `top_k` karenin
+görüntüleri tutulur; kullanım hacim derinliğinden bağımsızdır.
+Streamlit'e bağımlı değildir.
+"""
+
+import heapq
+import io
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterator, List, Sequence, Union
+
+import numpy as np
+import torch
+from PIL import Image
+
+from utils.preprocessing import (
+    DEFAULT_MAX_PIXELS, DEFAULT_NUM_WORKERS, PinnedBatchBuffer, decode_image, preprocess_images,
+)
+from utils.gradcam import overlay_gradcam
+from utils.inference_scheduler import DEFAULT_MAX_BATCH_SIZE
+
+# Varsayılan olarak raporlanan en şüpheli B-scan sayısı
+DEFAULT_TOP_K = 3
+
+VolumeSource = Union[str, bytes, BinaryIO]
+
+
+def _open(source: VolumeSource) -> Image.Image:
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    elif hasattr(source, "seek"):
+        source.seek(0)
+    return Image.open(source)
+
+
+def count_frames(source: VolumeSource) -> int:
+    """
+    Dosyadaki kare (B-scan) sayısını yalnızca başlıkları okuyarak döndürür.
+
+    Args:
+        source: Dosya yolu, ham baytlar veya dosya benzeri nesne
+
+    Returns:
+        Kare sayısı (tek kareli görüntüler için 1)
+    """
+    with _open(source) as image:
+        return getattr(image, "n_frames", 1)
+
+
+def iter_volume_frames(
+    source: VolumeSource,
+    max_pixels: int = DEFAULT_MAX_PIXELS,
+) -> Iterator[Image.Image]:
+    """
+    Çok sayfalı TIFF'in karelerini sırayla, her seferinde yalnızca bir kare
+    çözerek üretir. Her kare decode_image ile RGB'ye dönüştürülüp hedef
+    boyuta yetecek çözünürlüğe küçültülür.
+
+    Args:
+        source: Dosya yolu, ham baytlar veya dosya benzeri nesne
+        max_pixels: Kare başına izin verilen en fazla piksel sayısı
+
+    Yields:
+        RGB modunda PIL kareleri
+    """
+    with _open(source) as image:
+        for index in range(getattr(image, "n_frames", 1)):
+            image.seek(index)
+            w, h = image.size
+            if max_pixels and w * h > max_pixels:
+                raise ValueError(
+                    f"Kare {index} çok büyük: {w}x{h} = {w * h:,} piksel (sınır: {max_pixels:,})"
+                )
+            # convert yalnızca geçerli kareyi yükleyip yeni bir görüntü döndürür
+            yield decode_image(image.convert("RGB"), max_pixels=None)
+
+
+def _suspicion(probs: np.ndarray, class_names: Sequence[str]) -> float:
+    """Karenin şüphe skoru: NORMAL dışı sınıfların toplam olasılığı."""
+    if "NORMAL" in class_names:
+        return float(1.0 - probs[list(class_names).index("NORMAL")])
+    return float(probs.max())
+
+
+def analyze_volume(
+    explainer: Any,
+    source: VolumeSource,
+    device: torch.device,
+    class_names: List[str],
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    top_k: int = DEFAULT_TOP_K,
+    num_workers: int = DEFAULT_NUM_WORKERS,
+    preprocess_backend: str = "pil",
+) -> Dict[str, Any]:
+    """
+    OCT hacmini kare kare akıtarak analiz eder.
+
+    Hacim olasılıkları karelerin ortalamasıdır; tek karedeki odak bir lezyonu
+    kaçırmamak için sınıf başına en yüksek kare olasılığı da raporlanır.
+
+    Args:
+        explainer: `predict_batch` metoduna sahip açıklayıcı (bkz. utils.gradcam)
+        source: Çok sayfalı TIFF — dosya yolu, ham baytlar veya dosya benzeri nesne
+        device: Hedef hesaplama cihazı (CPU/CUDA)
+        class_names: Modelin sınıf isimleri (bkz. models.get_classes)
+        max_batch_size: Tek forward pass'teki maksimum kare sayısı
+        top_k: Grad-CAM'i ile birlikte saklanacak en şüpheli kare sayısı
+        num_workers: Paralel ön işleme iş parçacığı sayısı
+        preprocess_backend: Ön işleme arka ucu ("pil" veya "cv2")
+
+    Returns:
+        Sonuç sözlüğü: num_frames, predicted_class, confidence, probabilities,
+        max_probabilities, frame_probabilities ve top_frames (frame_index,
+        predicted_class, confidence, suspicion, display_image, heatmap,
+        overlaid_image)
+    """
+    max_batch_size = max(1, int(max_batch_size))
+    buffer = PinnedBatchBuffer(max_batch_size) if preprocess_backend == "cv2" else None
+
+    frame_probs: List[np.ndarray] = []
+    # (şüphe skoru, -kare indeksi, kayıt) — en küçük skor kökte, top_k ile sınırlı
+    top: List[Any] = []
+
+    frames = iter_volume_frames(source)
+    while True:
+        chunk = list(islice(frames, max_batch_size))
+        if not chunk:
+            break
+        batch, display_images = preprocess_images(chunk, device, num_workers, preprocess_backend, buffer)
+        _, probs, heatmaps = explainer.predict_batch(batch)
+
+        for p, cam, display_image in zip(probs, heatmaps, display_images):
+            index = len(frame_probs)
+            frame_probs.append(p)
+            score = _suspicion(p, class_names)
+            if len(top) < top_k or score > top[0][0]:
+                record = {"frame_index": index, "display_image": display_image, "heatmap": cam, "probs": p}
+                item = (score, -index, record)
+                if len(top) < top_k:
+                    heapq.heappush(top, item)
+                else:
+                    heapq.heapreplace(top, item)
+
+    if not frame_probs:
+        raise ValueError("Hacimde çözülebilir kare bulunamadı.")
+
+    stacked = np.stack(frame_probs)
+    mean_probs = stacked.mean(axis=0)
+    idx = int(np.argmax(mean_probs))
+
+    top_frames = []
+    for score, _, record in sorted(top, key=lambda item: (-item[0], -item[1])):
+        p = record["probs"]
+        frame_idx = int(np.argmax(p))
+        top_frames.append({
+            "frame_index": record["frame_index"],
+            "predicted_class": class_names[frame_idx],
+            "confidence": float(p[frame_idx]),
+            "suspicion": score,
+            "display_image": record["display_image"],
+            "heatmap": record["heatmap"],
+            "overlaid_image": overlay_gradcam(record["display_image"], record["heatmap"]),
+        })
+
+    return {
+        "num_frames": len(frame_probs),
+        "predicted_class": class_names[idx],
+        "confidence": float(mean_probs[idx]),
+        "probabilities": mean_probs.tolist(),
+        "max_probabilities": stacked.max(axis=0).tolist(),
+        "frame_probabilities": stacked.tolist(),
+        "top_frames": top_frames,
+    }